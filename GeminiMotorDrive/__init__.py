@@ -25,8 +25,32 @@ __version__ = "0.2"
 import math
 import copy
 import re
+import time
 
-from . import drivers, utilities
+from . import drivers, utilities, status
+from .compilers import move_sequence
+
+
+# The types of the drive parameters that GeminiG6 has properties for,
+# which are what get_parameters and set_parameters use for them.
+_PARAMETER_TYPES = {'DRIVE': bool, 'KDRIVE': bool, 'ERES': int,
+                    'DMEPIT': float, 'DMVLIM': float}
+
+# The move parameters read from the drive for estimating how long the
+# move will take when waiting for it to complete.
+_MOVE_PARAMETERS = {'A': float, 'AD': float, 'V': float, 'D': int,
+                    'ERES': int}
+
+# How long before the estimated end of a move to start polling for its
+# completion, as a fixed time in seconds plus a fraction of the move's
+# estimated duration (to cover the error in the estimate).
+_MOTION_LEAD_TIME = 0.02
+_MOTION_LEAD_FRACTION = 0.1
+
+# How long in seconds to keep polling for the completion of a move at
+# the shortest interval once it is overdue (or polling starts without an
+# estimate of when it ends) before backing off.
+_MOTION_OVERDUE_TIME = 0.5
 
 
 class GeminiError(IOError):
@@ -44,17 +68,20 @@ def get_driver(driver='ASCII_RS232', *args, **keywords):
     Gets and connects a particular driver in ``drivers`` to a Parker
     Motion Gemini GV-6 or GT-6 servo/stepper motor drive.
 
-    The only driver currently supported is the ``'ASCII_RS232'`` driver
-    which corresponds to ``drivers.ASCII_RS232``.
+    The drivers currently supported are the ``'ASCII_RS232'`` driver
+    which corresponds to ``drivers.ASCII_RS232``, the ``'ASCII_TCP'``
+    driver which corresponds to ``drivers.ASCII_TCP`` (drive behind a
+    serial-to-Ethernet terminal server), and the ``'BROKER'`` driver
+    which corresponds to ``broker.BrokerClient`` (talks to the drive
+    through a ``broker.DriveBroker`` in another process).
 
     Parameters
     ----------
     driver : str, optional
         The driver to communicate to the particular driver with, which
         includes the hardware connection and possibly the communications
-        protocol. The only driver currently supported is the
-        ``'ASCII_RS232'`` driver which corresponds to
-        ``drivers.ASCII_RS232``.
+        protocol. One of ``'ASCII_RS232'``, ``'ASCII_TCP'``, or
+        ``'BROKER'``.
     *args : additional positional arguments
         Additional positional arguments to pass onto the constructor for
         the driver.
@@ -76,15 +103,222 @@ def get_driver(driver='ASCII_RS232', *args, **keywords):
     --------
     drivers
     drivers.ASCII_RS232
+    drivers.ASCII_TCP
+    broker.BrokerClient
 
     """
     if driver.upper() == 'ASCII_RS232':
         return drivers.ASCII_RS232(*args, **keywords)
+    elif driver.upper() == 'ASCII_TCP':
+        return drivers.ASCII_TCP(*args, **keywords)
+    elif driver.upper() == 'BROKER':
+        # Imported here so that the broker module can be run with
+        # 'python -m' without it already having been imported.
+        from . import broker
+        return broker.BrokerClient(*args, **keywords)
     else:
         raise NotImplementedError('Driver not supported: '
                                       + str(driver))
 
 
+def _check_revision(response):
+    """ Checks that the drive is a Gemini GV-6 or GT-6.
+
+    Parameters
+    ----------
+    response : drivers.Response
+        The processed response to the immediate 'TREV' command.
+
+    Raises
+    ------
+    GeminiError
+        If the response is not from a Gemini GV-6 or GT-6.
+
+    """
+    # It should respond to the 'TREV' command with 'TREV' echoed and
+    # '*TREV-GV6-L3E_D1.50_F1.00' where everything after the 'GV6'
+    # (possibly replaced with a 'GT6') part is model dependent. The
+    # echo and lines are checked rather than the full response since
+    # the driver might not keep the latter.
+    if response[2] != '!TREV' or len(response[4]) == 0 \
+            or re.search('^\\*TREV-G[VT]{1}6', response[4][0]) is None:
+        raise GeminiError('Not a valid Gemini GV-6 or GT-6 device.')
+
+
+def _format_parameter(value, tp):
+    """ Formats a parameter value the way the drive expects it.
+
+    Parameters
+    ----------
+    value : bool, int, or float
+        Value of the parameter.
+    tp : type {bool, int, float}
+        The type of the parameter.
+
+    Returns
+    -------
+    value_str : str or None
+        `value` as a ``str`` or ``None`` if `tp` is not an allowed type
+        (``bool``, ``int``, ``float``).
+
+    """
+    # value must first be converted to the proper type before getting
+    # converted to str in the usual fasion. As bools need to be a '1' or
+    # a '0', it must be converted to int before going through str.
+    if tp == bool:
+        return str(int(bool(value)))
+    elif tp == int:
+        return str(int(value))
+    elif tp == float:
+        return str(float(value))
+    else:
+        return None
+
+
+def _parse_parameter(driver, response, name, tp):
+    """ Parses the value of a parameter from the response to its query.
+
+    Parameters
+    ----------
+    driver : driver
+        The driver the query was sent with.
+    response : drivers.Response
+        The processed response to querying the parameter.
+    name : str
+        Name of the parameter.
+    tp : type {bool, int, float}
+        The type of the parameter.
+
+    Returns
+    -------
+    value : bool, int, or float
+        The value of the parameter.
+
+    Raises
+    ------
+    CommandError
+        If the query returned an error.
+    ValueError
+        If the value returned to the drive cannot be converted to the
+        proper type.
+
+    """
+    # If the response has an error, there are no response lines, or the
+    # first response line isn't '*'+name; then there was an error and an
+    # exception needs to be thrown.
+    if driver.command_error(response) \
+            or len(response[4]) == 0 \
+            or not response[4][0].startswith('*' + name):
+        raise CommandError('Couldn''t retrieve parameter '
+                           + name)
+
+    # Extract the string representation of the value, which is after the
+    # '*'+name.
+    value_str = response[4][0][(len(name)+1):]
+
+    # Convert the value string to the appropriate type and return it.
+    if tp == bool:
+        return (value_str == '1')
+    elif tp == int:
+        return int(value_str)
+    elif tp == float:
+        return float(value_str)
+
+
+def _parse_program(driver, response):
+    """ Parses a program from the response to 'TPROG PROGn'.
+
+    Parameters
+    ----------
+    driver : driver
+        The driver the command was sent with.
+    response : drivers.Response
+        The processed response to the command.
+
+    Returns
+    -------
+    commands : list of str
+        ``list`` of ``str`` commands making up the program. The trailing
+        'END' is removed. Empty if there was an error.
+
+    """
+    # If there was an error, then return empty. Otherwise, return the
+    # response lines but strip the leading '*' first and the 'END' at
+    # the end of the list.
+    if driver.command_error(response) \
+            or len(response[4]) == 0:
+        return []
+    else:
+        if '*END' in response[4]:
+            response[4].remove('*END')
+        return [line[1:] for line in response[4]]
+
+
+def _program_profile_commands(n, stripped_commands, program_or_profile):
+    """ Makes the commands to set a program/profile on the drive.
+
+    Parameters
+    ----------
+    n : int
+        Which program or profile to set.
+    stripped_commands : list of str
+        The stripped commands making up the program or profile.
+    program_or_profile : {'program', 'profile'}
+        Whether it is a program or a profile. Anything other than these
+        two values implies the default.
+
+    Returns
+    -------
+    commands : list of str
+        The commands to send, which are `stripped_commands` wrapped
+        between the commands to delete and define it and 'END'.
+    eor : list
+        The End Of Response for each command.
+    cleanup_commands : list of str
+        The commands to send to end and delete the program or profile if
+        setting it fails.
+
+    """
+    # Construct the End Of Responses for each command that will be sent.
+    # They are '\n' for deletion and ending, but are '\n- ' for the
+    # rest.
+    eor = ['\n'] + (['\n- '] * (1 + len(stripped_commands))) + ['\n']
+
+    # The commands consist of a header that tells which program or
+    # profile to set, the stripped commands, followed by an 'END'.
+    if program_or_profile != 'profile':
+        name = 'PROG' + str(int(n))
+    else:
+        name = 'PROF' + str(int(n))
+    header = ['DEL ' + name, 'DEF ' + name]
+    return (header + stripped_commands + ['END'], eor,
+            ['END', 'DEL ' + name])
+
+
+def _parse_motion_commanded(driver, response):
+    """ Parses whether motion is commanded from the response to 'TAS'.
+
+    Parameters
+    ----------
+    driver : driver
+        The driver the command was sent with.
+    response : drivers.Response
+        The processed response to the command.
+
+    Returns
+    -------
+    motion_commanded : bool
+        The value of the first bit of the axis status, or ``False`` if
+        there was an error.
+
+    """
+    if driver.command_error(response) or len(response[4]) != 1 \
+            or response[4][0][0:4] != '*TAS':
+        return False
+    else:
+        return (response[4][0][4] == '1')
+
+
 class GeminiG6(object):
     """ Controller for a Parker Motion Gemini GV-6 or GT-6.
 
@@ -97,29 +331,77 @@ class GeminiG6(object):
     driver : driver
         Connected instance of a class in ``drivers``. Use ``get_driver``
         to load one. Is stored in the attribute ``driver``.
+    retry_policy : retry.RetryPolicy or None, optional
+        The policy on retrying the commands getting and setting
+        parameters, which bounds how long they take on a flaky link or
+        a drive that isn't responding. ``None`` means to use the
+        driver's. Is stored in the attribute ``retry_policy``.
+    parameter_cache : utilities.ParameterCache or None, optional
+        Cache of the parameter values so that reading them again doesn't
+        need a round trip to the drive. ``None`` means no caching. Is
+        stored in the attribute ``parameter_cache``.
+    program_index : utilities.ProgramIndex or None, optional
+        Host side index of the programs and profiles on the drive, so
+        that ``set_program_profile`` doesn't need to read back a program
+        to see whether it is already set. ``None`` means no index. Is
+        stored in the attribute ``program_index``.
+    drive_id : str or None, optional
+        The identity of the drive in `program_index`, which must be
+        unique among the drives sharing the index (such as its serial
+        number or the machine and axis it drives). Required if there is
+        a `program_index`. Is stored in the attribute ``drive_id``.
 
     Raises
     ------
     GeminiError
         If the attached device is not a Gemini GV-6 or GT-6.
+    ValueError
+        If there is a `program_index` but no `drive_id`.
 
     Attributes
     ----------
     driver : driver
         Driver for communicating to the drive.
+    retry_policy : retry.RetryPolicy or None
+        The policy on retrying the commands getting and setting
+        parameters.
+    parameter_cache : utilities.ParameterCache or None
+        Cache of the parameter values.
+    program_index : utilities.ProgramIndex or None
+        Host side index of the programs and profiles on the drive.
+    drive_id : str or None
+        The identity of the drive in ``program_index``.
     energized : bool
     denergize_on_kill : bool
     encoder_resolution : int
     electrical_pitch : float
     max_velocity : float
     motion_commanded : bool
+    axis_status : status.AxisStatus or None
+
+    Notes
+    -----
+    When caching parameters, the cache is written through when a
+    parameter is set, and is invalidated by ``kill``, ``reset``, and
+    running a program or profile. Changing parameters on the drive any
+    other way (such as with commands sent directly with the driver)
+    requires invalidating it with ``parameter_cache.invalidate``.
 
     See Also
     --------
     get_driver
+    utilities.ParameterCache
 
     """
-    def __init__(self, driver):
+    def __init__(self, driver, retry_policy=None, parameter_cache=None,
+                 program_index=None, drive_id=None):
+        # Drives that can't be told apart would share entries in the
+        # program index, so the drive must be identified explicitly.
+        # Identical drives have the same revision, so it can't be used.
+        if program_index is not None and drive_id is None:
+            raise ValueError('drive_id must be given with a '
+                             'program_index.')
+
         #: Driver for communicating to the drive.
         #:
         #: driver
@@ -132,21 +414,64 @@ class GeminiG6(object):
         #: get_driver
         self.driver = driver
 
+        #: The policy on retrying the commands getting and setting
+        #: parameters.
+        #:
+        #: retry.RetryPolicy or None
+        #:
+        #: ``None`` means to use the driver's. Only drivers that take a
+        #: `retry_policy` (``drivers.ASCII_RS232`` and
+        #: ``drivers.ASCII_TCP``) can be given one.
+        self.retry_policy = retry_policy
+
+        #: Cache of the parameter values.
+        #:
+        #: utilities.ParameterCache or None
+        #:
+        #: ``None`` means no caching.
+        self.parameter_cache = parameter_cache
+
+        #: Host side index of the programs and profiles on the drive.
+        #:
+        #: utilities.ProgramIndex or None
+        #:
+        #: ``None`` means no index.
+        self.program_index = program_index
+
         # Make sure that it is indeed a GV/T6, and throw an exception
-        # otherwise. It should respond to the 'TREV' command with 'TREV'
-        # echoed and '*TREV-GV6-L3E_D1.50_F1.00' where everything after
-        # the 'GV6' (possibly replaced with a 'GT6') part is model
-        # dependent.
-        response = self.driver.send_command('TREV', timeout=1.0,
-                                         immediate=True)
-        if re.search('^!TREV\r\\*TREV-G[VT]{1}6', response[1]) is None:
-            raise GeminiError('Not a valid Gemini GV-6 or GT-6 device.')
-
-    def _get_parameter(self, name, tp, timeout=1.0, max_retries=2):
+        # otherwise.
+        _check_revision(self.driver.send_command('TREV', timeout=1.0,
+                                                 immediate=True))
+
+        #: The identity of the drive in ``program_index``.
+        #:
+        #: str or None
+        #:
+        #: Must be set if ``program_index`` is.
+        self.drive_id = drive_id
+
+    def _retry_keywords(self):
+        """ Gets the keyword arguments giving the retry policy.
+
+        Returns
+        -------
+        keywords : dict
+            Keyword arguments to pass to the driver's ``send_command``,
+            which are empty if there is no retry policy so that drivers
+            that don't take one still work.
+
+        """
+        if self.retry_policy is None:
+            return dict()
+        return {'retry_policy': self.retry_policy}
+
+    def _get_parameter(self, name, tp, timeout=1.0, max_retries=2,
+                       deadline=None):
         """ Gets the specified drive parameter.
 
-        Gets a parameter from the drive. Only supports ``bool``,
-        ``int``, and ``float`` parameters.
+        Gets a parameter from the drive, or from ``parameter_cache``
+        if it holds the value. Only supports ``bool``, ``int``, and
+        ``float`` parameters.
 
         Parameters
         ----------
@@ -162,6 +487,10 @@ class GeminiG6(object):
         max_retries : int, optional
             Maximum number of retries to do per command in the case of
             errors.
+        deadline : float or None, optional
+            Optional overall deadline on the ``time.monotonic`` clock
+            for the whole operation including all retries. ``None``
+            means no overall deadline.
 
         Returns
         -------
@@ -189,41 +518,32 @@ class GeminiG6(object):
             raise TypeError('Only supports bool, int, and float; not '
                       + str(tp))
 
+        # Use the cached value if there is one.
+        if self.parameter_cache is not None:
+            value = self.parameter_cache.lookup(name)
+            if value is not None:
+                return value
+
         # Sending a command of name queries the state for that
         # parameter. The response will have name preceeded by an '*' and
         # then followed by a number which will have to be converted.
         response = self.driver.send_command(name, timeout=timeout,
                                             immediate=True,
-                                            max_retries=max_retries)
-
-        # If the response has an error, there are no response lines, or
-        # the first response line isn't '*'+name; then there was an
-        # error and an exception needs to be thrown.
-        if self.driver.command_error(response) \
-                or len(response[4]) == 0 \
-                or not response[4][0].startswith('*' + name):
-            raise CommandError('Couldn''t retrieve parameter '
-                               + name)
-
-        # Extract the string representation of the value, which is after
-        # the '*'+name.
-        value_str = response[4][0][(len(name)+1):]
-
-        # Convert the value string to the appropriate type and return
-        # it. Throw an error if it is not supported.
-        if tp == bool:
-            return (value_str == '1')
-        elif tp == int:
-            return int(value_str)
-        elif tp == float:
-            return float(value_str)
+                                            max_retries=max_retries,
+                                            deadline=deadline,
+                                            **self._retry_keywords())
+        value = _parse_parameter(self.driver, response, name, tp)
+        if self.parameter_cache is not None:
+            self.parameter_cache.store(name, value)
+        return value
 
     def _set_parameter(self, name, value, tp, timeout=1.0,
-                       max_retries=2):
+                       max_retries=2, deadline=None):
         """ Sets the specified drive parameter.
 
-        Sets a parameter on the drive. Only supports ``bool``,
-        ``int``, and ``float`` parameters.
+        Sets a parameter on the drive, and writes it through to
+        ``parameter_cache``. Only supports ``bool``, ``int``, and
+        ``float`` parameters.
 
         Parameters
         ----------
@@ -241,6 +561,10 @@ class GeminiG6(object):
         max_retries : int, optional
             Maximum number of retries to do per command in the case of
             errors.
+        deadline : float or None, optional
+            Optional overall deadline on the ``time.monotonic`` clock
+            for the whole operation including all retries. ``None``
+            means no overall deadline.
 
         Returns
         -------
@@ -253,31 +577,256 @@ class GeminiG6(object):
         _get_parameter : Get a parameter.
 
         """
-        # Return False if tp isn't one of the valid types.
-        if tp not in (bool, int, float):
+        # Convert value to the string that the drive will expect, and
+        # return False if tp isn't one of the valid types.
+        value_str = _format_parameter(value, tp)
+        if value_str is None:
             return False
 
-        # Convert value to the string that the drive will expect. value
-        # must first be converted to the proper type before getting
-        # converted to str in the usual fasion. As bools need to be a
-        # '1' or a '0', it must be converted to int before going through
-        # str.
-        if tp == bool:
-            value_str = str(int(bool(value)))
-        elif tp == int:
-            value_str = str(int(value))
-        elif tp == float:
-            value_str = str(float(value))
-
         # Immediately set the named parameter of the drive. The command
         # is just the parameter name followed by the value string.
         response = self.driver.send_command(name+value_str, \
-            timeout=timeout, immediate=True, max_retries=max_retries)
+            timeout=timeout, immediate=True, max_retries=max_retries, \
+            deadline=deadline, **self._retry_keywords())
+
+        # Write the value through to the cache, or drop it from the
+        # cache if setting it failed since the drive's value is then
+        # unknown. Then return whether the setting was successful or
+        # not.
+        success = not self.driver.command_error(response)
+        if self.parameter_cache is not None:
+            if success:
+                self.parameter_cache.store(name, tp(value))
+            else:
+                self.parameter_cache.invalidate(name)
+        return success
 
-        # Return whether the setting was successful or not.
-        return not self.driver.command_error(response)
+    def _invalidate_cache(self):
+        """ Invalidates the whole parameter cache if there is one.
+        """
+        if self.parameter_cache is not None:
+            self.parameter_cache.invalidate()
+
+    def get_parameters(self, names, timeout=1.0, max_retries=2,
+                       deadline=None, check_echo=None):
+        """ Gets several drive parameters at once.
+
+        Queries all the parameters not held by ``parameter_cache`` in a
+        single sequence of immediate commands sent back to back (one
+        ``send_commands`` call, sharing one retry budget and deadline),
+        and then parses all the responses in one pass. Only supports
+        ``bool``, ``int``, and ``float`` parameters.
+
+        Parameters
+        ----------
+        names : dict or iterable of str
+            The parameters to get. Either a ``dict`` of their names
+            (the command to set each one without the value) and types
+            (``bool``, ``int``, or ``float``), or an iterable of the
+            names of the parameters that there are properties for
+            ('DRIVE', 'KDRIVE', 'ERES', 'DMEPIT', and 'DMVLIM').
+        timeout : number, optional
+            Optional timeout in seconds to use when reading each
+            response. A negative value or ``None`` indicates that the
+            an infinite timeout should be used.
+        max_retries : int, optional
+            Maximum number of retries to do per command in the case of
+            errors.
+        deadline : float or None, optional
+            Optional overall deadline on the ``time.monotonic`` clock
+            for the whole operation including all retries. ``None``
+            means no overall deadline.
+        check_echo : bool or None, optional
+            Whether to check the echo of each query while writing it,
+            overriding the driver's echo checking. ``False`` is much
+            faster when the driver writes a character at a time, and a
+            garbled query still shows up as an error and is retried.
+            ``None`` means the driver's echo checking. Only drivers that
+            take a `check_echo` (``drivers.ASCII_RS232`` and
+            ``drivers.ASCII_TCP``) can be given one.
+
+        Returns
+        -------
+        values : dict
+            The value of each parameter by name.
+
+        Raises
+        ------
+        KeyError
+            If a name is given without a type and isn't one of the
+            parameters there are properties for.
+        TypeError
+            If a type is not an allowed type (``bool``, ``int``,
+            ``float``).
+        CommandError
+            If the command to retrieve a parameter returned an error.
+        ValueError
+            If the value returned to the drive cannot be converted to
+            the proper type.
+
+        See Also
+        --------
+        set_parameters : Set several parameters at once.
+
+        Examples
+        --------
+
+        Get what is needed to convert between physical and motor units.
+
+        >>> from GeminiMotorDrive import GeminiG6, get_driver
+        >>> g = GeminiG6(get_driver(port='/dev/ttyS1'))
+        >>> g.get_parameters(['ERES', 'DMEPIT'])
+        {'ERES': 4000, 'DMEPIT': 42.0}
+
+        """
+        # Get the types of the parameters, raising a TypeError if one
+        # isn't one of the valid types.
+        if isinstance(names, dict):
+            types = dict(names)
+        else:
+            types = dict([(name, _PARAMETER_TYPES[name])
+                          for name in names])
+        for name, tp in types.items():
+            if tp not in (bool, int, float):
+                raise TypeError('Only supports bool, int, and float; '
+                                'not ' + str(tp))
+
+        # Take what values can be taken from the cache, and query the
+        # rest all in one go.
+        values = dict()
+        to_query = []
+        for name in types:
+            value = None
+            if self.parameter_cache is not None:
+                value = self.parameter_cache.lookup(name)
+            if value is None:
+                to_query.append(name)
+            else:
+                values[name] = value
+        if len(to_query) == 0:
+            return values
+        keywords = self._retry_keywords()
+        if check_echo is not None:
+            keywords['check_echo'] = check_echo
+        responses = self.driver.send_commands(
+            ['!' + name for name in to_query], timeout=timeout,
+            max_retries=max_retries, deadline=deadline, **keywords)
+
+        # Parse the responses, raising a CommandError for the first
+        # parameter that failed or didn't get queried because an
+        # earlier one failed.
+        for i, name in enumerate(to_query):
+            if i >= len(responses):
+                raise CommandError('Couldn''t retrieve parameter '
+                                   + name)
+            values[name] = _parse_parameter(self.driver, responses[i],
+                                            name, types[name])
+            if self.parameter_cache is not None:
+                self.parameter_cache.store(name, values[name])
+        return dict([(name, values[name]) for name in types])
+
+    def set_parameters(self, values, types=None, timeout=1.0,
+                       max_retries=2, deadline=None, check_echo=None):
+        """ Sets several drive parameters at once.
+
+        Sets all the parameters in a single sequence of immediate
+        commands sent back to back (one ``send_commands`` call, sharing
+        one retry budget and deadline), stopping at the first one that
+        fails, and writes them through to ``parameter_cache``. Only
+        supports ``bool``, ``int``, and ``float`` parameters.
+
+        Parameters
+        ----------
+        values : dict
+            The value to set each parameter to by name (the command to
+            set it without the value).
+        types : dict or None, optional
+            The type (``bool``, ``int``, or ``float``) of each parameter
+            by name. Parameters not in it must be among the ones there
+            are properties for ('DRIVE', 'KDRIVE', 'ERES', 'DMEPIT', and
+            'DMVLIM').
+        timeout : number, optional
+            Optional timeout in seconds to use when reading each
+            response. A negative value or ``None`` indicates that the
+            an infinite timeout should be used.
+        max_retries : int, optional
+            Maximum number of retries to do per command in the case of
+            errors.
+        deadline : float or None, optional
+            Optional overall deadline on the ``time.monotonic`` clock
+            for the whole operation including all retries. ``None``
+            means no overall deadline.
+        check_echo : bool or None, optional
+            Whether to check the echo of each command while writing it,
+            overriding the driver's echo checking. ``None`` means the
+            driver's echo checking. Only drivers that take a
+            `check_echo` (``drivers.ASCII_RS232`` and
+            ``drivers.ASCII_TCP``) can be given one.
+
+        Returns
+        -------
+        success : bool
+            Whether all the parameters were set successfully (``True``)
+            or not (``False``, meaning one had an error and the ones
+            after it weren't set).
+
+        Raises
+        ------
+        KeyError
+            If a parameter has no type given and isn't one of the
+            parameters there are properties for.
+
+        Notes
+        -----
+        Unlike setting ``encoder_resolution`` or ``electrical_pitch``,
+        the drive is not reset afterwards.
+
+        See Also
+        --------
+        get_parameters : Get several parameters at once.
+
+        """
+        # Get the types of the parameters and format the commands,
+        # returning False if a type isn't one of the valid types.
+        names = list(values)
+        all_types = dict()
+        for name in names:
+            if types is not None and name in types:
+                all_types[name] = types[name]
+            else:
+                all_types[name] = _PARAMETER_TYPES[name]
+        commands = []
+        for name in names:
+            value_str = _format_parameter(values[name], all_types[name])
+            if value_str is None:
+                return False
+            commands.append('!' + name + value_str)
+        if len(commands) == 0:
+            return True
+
+        keywords = self._retry_keywords()
+        if check_echo is not None:
+            keywords['check_echo'] = check_echo
+        responses = self.driver.send_commands(
+            commands, timeout=timeout, max_retries=max_retries,
+            deadline=deadline, **keywords)
+
+        # Write the values that were set through to the cache and drop
+        # the rest from it since their values on the drive are then
+        # unknown. Then return whether they were all set or not.
+        success = [i < len(responses)
+                   and not self.driver.command_error(responses[i])
+                   for i in range(len(names))]
+        if self.parameter_cache is not None:
+            for i, name in enumerate(names):
+                if success[i]:
+                    self.parameter_cache.store(
+                        name, all_types[name](values[name]))
+                else:
+                    self.parameter_cache.invalidate(name)
+        return all(success)
 
-    def pause(self, max_retries=0):
+    def pause(self, max_retries=0, deadline=None):
         """ Pauses the drive (execution of commands).
 
         Causes the drive to pause execution of commands till it is
@@ -289,6 +838,10 @@ class GeminiG6(object):
         max_retries : int, optional
             Maximum number of retries to do to pause the drive in the
             case of errors.
+        deadline : float or None, optional
+            Optional overall deadline on the ``time.monotonic`` clock
+            for the whole operation including all retries. ``None``
+            means no overall deadline.
 
         Returns
         -------
@@ -308,9 +861,10 @@ class GeminiG6(object):
         """
         return (not self.driver.command_error(
                 self.driver.send_command('PS', timeout=1.0,
-                immediate=True, max_retries=max_retries)))
+                immediate=True, max_retries=max_retries,
+                deadline=deadline)))
 
-    def unpause(self, max_retries=0):
+    def unpause(self, max_retries=0, deadline=None):
         """ Unpauses the drive.
 
         Unpauses the drive. Commands queued while it is paused will then
@@ -321,6 +875,10 @@ class GeminiG6(object):
         max_retries : int, optional
             Maximum number of retries to do to unpause the drive in the
             case of errors.
+        deadline : float or None, optional
+            Optional overall deadline on the ``time.monotonic`` clock
+            for the whole operation including all retries. ``None``
+            means no overall deadline.
 
         Returns
         -------
@@ -340,9 +898,10 @@ class GeminiG6(object):
         """
         return (not self.driver.command_error(
                 self.driver.send_command('C',
-                timeout=1.0, immediate=True, max_retries=max_retries)))
+                timeout=1.0, immediate=True, max_retries=max_retries,
+                deadline=deadline)))
 
-    def stop(self, max_retries=0):
+    def stop(self, max_retries=0, deadline=None):
         """ Stops motion.
 
         The drive stops the motor.
@@ -352,6 +911,10 @@ class GeminiG6(object):
         max_retries : int, optional
             Maximum number of retries to do to kill the drive in the
             case of errors.
+        deadline : float or None, optional
+            Optional overall deadline on the ``time.monotonic`` clock
+            for the whole operation including all retries. ``None``
+            means no overall deadline.
 
         Returns
         -------
@@ -367,9 +930,10 @@ class GeminiG6(object):
         """
         return (not self.driver.command_error(
                 self.driver.send_command('S1',
-                timeout=1.0, immediate=True, max_retries=max_retries)))
+                timeout=1.0, immediate=True, max_retries=max_retries,
+                deadline=deadline)))
 
-    def kill(self, max_retries=0):
+    def kill(self, max_retries=0, deadline=None):
         """ Kills the drive.
 
         The drive stops the motor and any running program. The motor
@@ -381,6 +945,10 @@ class GeminiG6(object):
         max_retries : int, optional
             Maximum number of retries to do to kill the drive in the
             case of errors.
+        deadline : float or None, optional
+            Optional overall deadline on the ``time.monotonic`` clock
+            for the whole operation including all retries. ``None``
+            means no overall deadline.
 
         Returns
         -------
@@ -399,11 +967,13 @@ class GeminiG6(object):
             after the drive is killed or not.
 
         """
+        self._invalidate_cache()
         return (not self.driver.command_error(
                 self.driver.send_command('K',
-                timeout=1.0, immediate=True, max_retries=max_retries)))
+                timeout=1.0, immediate=True, max_retries=max_retries,
+                deadline=deadline)))
 
-    def reset(self, max_retries=0):
+    def reset(self, max_retries=0, deadline=None):
         """ Resets the drive.
 
         Resets the drive, which is equivalent to a power cycling.
@@ -413,6 +983,10 @@ class GeminiG6(object):
         max_retries : int, optional
             Maximum number of retries to do to reset the drive in the
             case of errors.
+        deadline : float or None, optional
+            Optional overall deadline on the ``time.monotonic`` clock
+            for the whole operation including all retries. ``None``
+            means no overall deadline.
 
         Returns
         -------
@@ -426,11 +1000,14 @@ class GeminiG6(object):
         The command sent to the drive is '!RESET'.
 
         """
+        self._invalidate_cache()
         return (not self.driver.command_error(
                 self.driver.send_command('RESET',
-                timeout=10.0, immediate=True, max_retries=max_retries)))
+                timeout=10.0, immediate=True, max_retries=max_retries,
+                deadline=deadline)))
 
-    def get_program(self, n, timeout=2.0, max_retries=2):
+    def get_program(self, n, timeout=2.0, max_retries=2,
+                    deadline=None):
         """ Get a program from the drive.
 
         Gets program 'n' from the drive and returns its commands.
@@ -439,13 +1016,20 @@ class GeminiG6(object):
         ----------
         n : int
             Which program to get.
-        timeout : number, optional
+        timeout : number or 'auto', optional
             Optional timeout in seconds to use when reading the
             response. A negative value or ``None`` indicates that the
             an infinite timeout should be used.
+            ``'auto'`` takes it from the round trip times measured so
+            far for reading programs, if the driver supports it (see
+            ``drivers.ASCII_RS232.timeout_estimator``).
         max_retries : int, optional
             Maximum number of retries to do per command in the case of
             errors.
+        deadline : float or None, optional
+            Optional overall deadline on the ``time.monotonic`` clock
+            for the whole operation including all retries. ``None``
+            means no overall deadline.
 
         Returns
         -------
@@ -466,22 +1050,12 @@ class GeminiG6(object):
         # Send the 'TPROG PROGn' command to read the program.
         response = self.driver.send_command( \
             'TPROG PROG' + str(int(n)), timeout=timeout, \
-            immediate=True, max_retries=max_retries)
-
-        # If there was an error, then return empty. Otherwise, return
-        # the response lines but strip the leading '*' first and the
-        # 'END' at the end of the list.
-        if self.driver.command_error(response) \
-                or len(response[4]) == 0:
-            return []
-        else:
-            if '*END' in response[4]:
-                response[4].remove('*END')
-            return [line[1:] for line in response[4]]
+            immediate=True, max_retries=max_retries, deadline=deadline)
+        return _parse_program(self.driver, response)
 
     def set_program_profile(self, n, commands,
                             program_or_profile='program',
-                            timeout=1.0, max_retries=0):
+                            timeout=1.0, max_retries=0, deadline=None):
         """ Sets a program/profile on the drive.
 
         Sets program or profile 'n' on the drive to the sequence of
@@ -490,6 +1064,14 @@ class GeminiG6(object):
         whether the program or profile was successfully set or not (if
         the existing one is identical, it is considered a success).
 
+        If there is a ``program_index``, the program or profile is taken
+        to be identical without reading it back if the index has the
+        same hash for it, which also works for profiles, and to be
+        different without reading it back if the index has a different
+        hash for it. It is only read back if the index has no entry for
+        it or the entry is stale. The index is updated with what the
+        drive ends up with.
+
         Parameters
         ----------
         n : int
@@ -500,13 +1082,20 @@ class GeminiG6(object):
         program_or_profile : {'program', 'profile'}, optional
             Whether to read a program or a profile. Anything other than
             these two values implies the default.
-        timeout : number, optional
+        timeout : number or 'auto', optional
             Optional timeout in seconds to use when reading the
             response. A negative value or ``None`` indicates that the
-            an infinite timeout should be used.
+            an infinite timeout should be used. ``'auto'`` takes it from
+            the round trip times measured so far for each command, if
+            the driver supports it (see
+            ``drivers.ASCII_RS232.timeout_estimator``).
         max_retries : int, optional
             Maximum number of retries to do per command in the case of
             errors.
+        deadline : float or None, optional
+            Optional overall deadline on the ``time.monotonic`` clock
+            for the whole operation including all retries. ``None``
+            means no overall deadline.
 
         Returns
         -------
@@ -515,6 +1104,11 @@ class GeminiG6(object):
             (an identical program already existing on the drive is
             considered a success).
 
+        Raises
+        ------
+        ValueError
+            If there is a ``program_index`` but no ``drive_id``.
+
         Notes
         -----
         'commands' gets wrapped between ['DEL PROGn', 'DEF PROGn'] and
@@ -526,62 +1120,73 @@ class GeminiG6(object):
         run_program_profile : Runs a program or profile.
 
         """
-        # Grab the n'th program on the drive and strip commands. If we
-        # are doing a profile, None will be used as a placeholder.
-        if program_or_profile != 'profile':
+        # Strip the commands, and if the index says the program or
+        # profile is already set to them, nothing needs to be done. If
+        # it has a (fresh) entry with a different hash, the program is
+        # known to be different and doesn't need to be read back.
+        stripped_commands = utilities.strip_commands(commands)
+        known = None
+        if self.program_index is not None:
+            if self.drive_id is None:
+                raise ValueError('drive_id must be set to use the '
+                                 'program_index.')
+            if program_or_profile != 'profile':
+                name = 'PROG' + str(int(n))
+            else:
+                name = 'PROF' + str(int(n))
+            digest = utilities.program_hash(stripped_commands)
+            known = self.program_index.lookup(self.drive_id, name)
+            if known == digest:
+                return True
+
+        # Grab the n'th program on the drive unless it is already known
+        # to be different. If we are doing a profile, None will be used
+        # as a placeholder.
+        if program_or_profile != 'profile' and known is None:
             current_program = self.get_program(n, timeout=timeout, \
-                max_retries=max_retries+2)
+                max_retries=max_retries+2, deadline=deadline)
         else:
             current_program = None
-        stripped_commands = utilities.strip_commands(commands)
 
         # If the two are identical and we are doing a program, then
         # nothing needs to be done and the program is already set
         # (return True). Otherwise, it needs to be overwritten. If there
         # were no errors on the last command, then it was written
         # successfully. Otherwise, the program or profile needs to be
-        # terminated and then deleted.
+        # terminated and then deleted. The index is updated with the
+        # hash if it is set, and the entry is dropped otherwise since
+        # what is on the drive is then unknown.
 
         if current_program is not None \
                 and current_program == stripped_commands:
+            if self.program_index is not None:
+                self.program_index.store(self.drive_id, name, digest)
             return True
         else:
-            # Construct the End Of Responses for each command that will
-            # be sent. They are '\n' for deletion and ending, but are
-            # '\n- ' for the rest.
-            eor = ['\n'] + (['\n- '] * (1 + len(stripped_commands))) \
-                + ['\n']
-
-            # The commands consist of a header that tells which program
-            # or profile to set, the stripped commands, followed by an
-            # 'END'.
-            if program_or_profile != 'profile':
-                header = ['DEL PROG'+str(int(n)),
-                          'DEF PROG'+str(int(n))]
-            else:
-                header = ['DEL PROF'+str(int(n)),
-                          'DEF PROF'+str(int(n))]
-            responses = self.driver.send_commands(\
-                header + stripped_commands + ['END'], \
-                timeout=timeout, max_retries=max_retries, eor=eor)
+            cmds, eor, cleanup_cmds = _program_profile_commands(n, \
+                stripped_commands, program_or_profile)
+            responses = self.driver.send_commands(cmds, \
+                timeout=timeout, max_retries=max_retries, eor=eor, \
+                deadline=deadline)
 
             # Check to see if it was set successfully. If it was (the
             # last command had no errors), return True. Otherwise, the
             # program or profile needs to be ended and deleted before
             # returning False.
             if not self.driver.command_error(responses[-1]):
+                if self.program_index is not None:
+                    self.program_index.store(self.drive_id, name, digest)
                 return True
             else:
-                if program_or_profile != 'profile':
-                    cmds = ['END', 'DEL PROG'+str(int(n))]
-                else:
-                    cmds = ['END', 'DEL PROF'+str(int(n))]
-                self.driver.send_commands(cmds, timeout=timeout,
-                                           max_retries=max_retries+2)
+                if self.program_index is not None:
+                    self.program_index.invalidate(self.drive_id, name)
+                self.driver.send_commands(cleanup_cmds, timeout=timeout,
+                                           max_retries=max_retries+2,
+                                           deadline=deadline)
                 return False
 
     def run_program_profile(self, n, program_or_profile='program',
-                            timeout=10.0):
+                            timeout=10.0, deadline=None):
         """ Runs a program/profile on the drive.
 
         Runs program or profile 'n' on the drive, grabs its output, and
@@ -601,21 +1206,31 @@ class GeminiG6(object):
         program_or_profile : {'program', 'profile'}, optional
             Whether to read a program or a profile. Anything other than
             these two values implies the default.
-        timeout : number, optional
+        timeout : number or 'auto', optional
             Optional timeout in seconds to use when reading the
             response for running a program (set to 1.0 for a profile
             regardless of what is given). A negative value or ``None``
             indicates that the an infinite timeout should be used.
+            ``'auto'`` takes it from the round trip times measured so
+            far for running programs, if the driver supports it (see
+            ``drivers.ASCII_RS232.timeout_estimator``), which is only
+            suitable if the programs run take similar times.
+        deadline : float or None, optional
+            Optional overall deadline on the ``time.monotonic`` clock
+            for the whole operation. ``None`` means no overall
+            deadline.
 
         Returns
         -------
-        output : list
-            A 5-element ``list``. The elements, in order, are the
-            sanitized command (``str``), the full response (``str``),
-            the echoed command (``str``), any error response (``None``
-            if none, or the ``str`` of the error), and the lines of the
-            response that are not the echo or error line (``list`` of
-            ``str`` with newlines stripped).
+        output : drivers.Response
+            The processed response, which has the sanitized command
+            (``command``), the full response (``raw``, ``None`` if not
+            kept), the echoed command (``echo``), any error response
+            (``error``, ``None`` if none), the lines of the response
+            that are not the echo or error line (``lines``, with
+            newlines stripped), and whether there was an error
+            (``ok``). It can also be indexed like the 5-element
+            ``list`` of them (in that order) that was used before.
 
         Notes
         -----
@@ -631,12 +1246,16 @@ class GeminiG6(object):
         set_program_profile : Sets a program or profile.
 
         """
+        # The program or profile can change parameters.
+        self._invalidate_cache()
         if program_or_profile != 'profile':
             return self.driver.send_command('RUN PROG' + str(int(n)), \
-                timeout=timeout, immediate=True, eor='*END\n')
+                timeout=timeout, immediate=True, eor='*END\n', \
+                deadline=deadline)
         else:
             return self.driver.send_command( \
-                'PRUN PROF' + str(int(n)), timeout=1.0, immediate=True)
+                'PRUN PROF' + str(int(n)), timeout=1.0, immediate=True, \
+                deadline=deadline)
 
     @property
     def energized(self):
@@ -759,9 +1378,472 @@ class GeminiG6(object):
         It is the value of the first bit of the 'TAS' command.
 
         """
-        rsp = self.driver.send_command('TAS', immediate=True)
-        if self.driver.command_error(rsp) or len(rsp[4]) != 1 \
-                or rsp[4][0][0:4] != '*TAS':
+        return _parse_motion_commanded(self.driver,
+            self.driver.send_command('TAS', immediate=True))
+
+    def wait_for_motion_complete(self, timeout=None, move=None,
+                                 expected=None, started=None,
+                                 min_interval=0.002, max_interval=0.02,
+                                 deadline=None):
+        """ Waits for the motion to complete.
+
+        Waits till motion is no longer commanded (see
+        ``motion_commanded``) while using the link as little as
+        possible. If the move's expected duration is known (given
+        directly or calculated from the move with
+        ``compilers.move_sequence.move_time``), nothing is sent till
+        shortly before it should end. Then 'TAS' is polled with the
+        interval halving as the expected end approaches (down to
+        `min_interval`), and doubling again (up to `max_interval`) once
+        it has been overdue for a while. Without an expected duration,
+        polling starts right away at `min_interval` and backs off the
+        same way once it has gone on for a while.
+
+        Parameters
+        ----------
+        timeout : float or None, optional
+            Timeout in seconds. ``None`` means to wait forever.
+        move : dict, 'drive', or None, optional
+            The move being waited for, with its acceleration ('A'),
+            deceleration ('AD', with 0 meaning the acceleration), and
+            velocity ('V') in motor units, distance ('D') in encoder
+            counts, and optionally the encoder resolution ('ERES', read
+            from the drive if missing). ``'drive'`` means to read them
+            all from the drive. Not used if `expected` is given.
+        expected : float or None, optional
+            Expected duration of the move in seconds.
+        started : float or None, optional
+            Time on the ``time.monotonic`` clock the move started at.
+            ``None`` means now.
+        min_interval : float, optional
+            Shortest time in seconds between polls.
+        max_interval : float, optional
+            Longest time in seconds between polls.
+        deadline : float or None, optional
+            Optional overall deadline on the ``time.monotonic`` clock to
+            use in addition to `timeout`. ``None`` means no overall
+            deadline.
+
+        Returns
+        -------
+        complete : bool
+            Whether the motion completed (``True``) or the timeout or
+            deadline passed first (``False``).
+
+        Notes
+        -----
+        The expected duration calculated from a move takes 'D' to be a
+        distance, so it doesn't work for moves in absolute mode.
+
+        See Also
+        --------
+        motion_commanded
+        compilers.move_sequence.move_time
+
+        Examples
+        --------
+
+        Do a move and wait for it to complete.
+
+        >>> from GeminiMotorDrive import GeminiG6, get_driver
+        >>> g = GeminiG6(get_driver(port='/dev/ttyS1'))
+        >>> move = {'A': 100.0, 'AD': 0.0, 'V': 5.0, 'D': 20000}
+        >>> g.driver.send_commands(['A100', 'AD0', 'V5', 'D20000',
+        ...                         'GO'])
+        >>> g.wait_for_motion_complete(timeout=10.0, move=move)
+        True
+
+        """
+        if started is None:
+            started = time.monotonic()
+        if timeout is not None and timeout >= 0:
+            timeout_deadline = time.monotonic() + timeout
+            if deadline is None or timeout_deadline < deadline:
+                deadline = timeout_deadline
+
+        # Work out when the move is expected to end, reading the move
+        # parameters from the drive if need be, and sleep till shortly
+        # before then.
+        if expected is None and move is not None:
+            if move == 'drive':
+                move = self.get_parameters(_MOVE_PARAMETERS,
+                                           deadline=deadline)
+            elif 'ERES' not in move:
+                move = dict(move)
+                move['ERES'] = self._get_parameter('ERES', int,
+                                                   deadline=deadline)
+            expected = move_sequence.move_time(move, move['ERES'])
+        if expected is not None:
+            end = started + expected
+            wake = end - _MOTION_LEAD_TIME \
+                - _MOTION_LEAD_FRACTION * expected
+            if deadline is not None:
+                wake = min(wake, deadline)
+            delay = wake - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+        else:
+            end = None
+
+        # Poll till motion is no longer commanded or the deadline
+        # passes. An error getting the status doesn't count as the
+        # motion being complete. Once the move is overdue, polling stays
+        # at the shortest interval for a while (so the completion is
+        # caught quickly) before backing off.
+        if end is None:
+            end = time.monotonic()
+        interval = min_interval
+        while True:
+            response = self.driver.send_command('TAS', immediate=True,
+                                                deadline=deadline)
+            axis_status = status.parse_status(self.driver, response)
+            if axis_status is not None and not axis_status.moving:
+                return True
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                return False
+            if now < end:
+                delay = max(min_interval, 0.5 * (end - now))
+            elif now < end + _MOTION_OVERDUE_TIME:
+                delay = min_interval
+            else:
+                delay = interval
+                interval = min(max_interval, 2 * interval)
+            if deadline is not None:
+                delay = min(delay, deadline - now)
+            time.sleep(delay)
+
+    @property
+    def axis_status(self):
+        """ The full axis status.
+
+        ``status.AxisStatus`` or ``None``
+
+        ``None`` if there was an error. Can't be set.
+
+        Notes
+        -----
+        This uses the 'TAS' command.
+
+        See Also
+        --------
+        status.StatusMonitor : Monitor it for changes.
+
+        """
+        return status.parse_status(self.driver,
+            self.driver.send_command('TAS', immediate=True))
+
+
+class AsyncGeminiG6(object):
+    """ asyncio controller for a Parker Motion Gemini GV-6 or GT-6.
+
+    The ``asyncio`` counterpart to ``GeminiG6``, which every method
+    that talks to the drive is a coroutine version of. The parameters
+    that are properties in ``GeminiG6`` are read and set with
+    ``get_...`` and ``set_...`` coroutines instead.
+
+    Instances should be made with the ``create`` coroutine, which
+    checks the drive like the ``GeminiG6`` constructor does.
+
+    Parameters
+    ----------
+    driver : driver
+        Connected instance of ``drivers.AsyncASCII_RS232`` (or another
+        driver with coroutine ``send_command`` and ``send_commands``
+        methods). Is stored in the attribute ``driver``.
+
+    Attributes
+    ----------
+    driver : driver
+        Driver for communicating to the drive.
+
+    See Also
+    --------
+    GeminiG6
+    drivers.AsyncASCII_RS232
+
+    Examples
+    --------
+
+    Energizing two drives at once.
+
+    >>> import asyncio
+    >>> import GeminiMotorDrive
+    >>> from GeminiMotorDrive.drivers import AsyncASCII_RS232
+    >>> async def energize(port):
+    ...     async with AsyncASCII_RS232(port) as ar:
+    ...         gem = await GeminiMotorDrive.AsyncGeminiG6.create(ar)
+    ...         await gem.set_energized(True)
+    ...         return await gem.get_energized()
+    >>> asyncio.get_event_loop().run_until_complete(asyncio.gather(
+    ...     energize('/dev/ttyS1'), energize('/dev/ttyS2')))
+    [True, True]
+
+    """
+    def __init__(self, driver):
+        #: Driver for communicating to the drive.
+        #:
+        #: driver
+        #:
+        #: A connected ``GeminiMotorDriver.drivers.AsyncASCII_RS232``.
+        self.driver = driver
+
+    @classmethod
+    async def create(cls, driver):
+        """ Makes a controller after checking the drive.
+
+        Parameters
+        ----------
+        driver : driver
+            Connected instance of ``drivers.AsyncASCII_RS232``.
+
+        Returns
+        -------
+        gemini : AsyncGeminiG6
+            The controller.
+
+        Raises
+        ------
+        GeminiError
+            If the attached device is not a Gemini GV-6 or GT-6.
+
+        """
+        gemini = cls(driver)
+        _check_revision(await driver.send_command('TREV', timeout=1.0,
+                                                  immediate=True))
+        return gemini
+
+    async def _get_parameter(self, name, tp, timeout=1.0, max_retries=2,
+                             deadline=None):
+        """ Gets the specified drive parameter.
+
+        Coroutine version of ``GeminiG6._get_parameter``.
+
+        """
+        if tp not in (bool, int, float):
+            raise TypeError('Only supports bool, int, and float; not '
+                      + str(tp))
+        response = await self.driver.send_command(name, timeout=timeout,
+                                                  immediate=True,
+                                                  max_retries=max_retries,
+                                                  deadline=deadline)
+        return _parse_parameter(self.driver, response, name, tp)
+
+    async def _set_parameter(self, name, value, tp, timeout=1.0,
+                             max_retries=2, deadline=None):
+        """ Sets the specified drive parameter.
+
+        Coroutine version of ``GeminiG6._set_parameter``.
+
+        """
+        value_str = _format_parameter(value, tp)
+        if value_str is None:
             return False
+        response = await self.driver.send_command(name+value_str, \
+            timeout=timeout, immediate=True, max_retries=max_retries, \
+            deadline=deadline)
+        return not self.driver.command_error(response)
+
+    async def _simple_command(self, command, timeout, max_retries,
+                              deadline):
+        """ Sends an immediate command and returns whether it worked.
+        """
+        return (not self.driver.command_error(
+                await self.driver.send_command(command, timeout=timeout,
+                immediate=True, max_retries=max_retries,
+                deadline=deadline)))
+
+    async def pause(self, max_retries=0, deadline=None):
+        """ Pauses the drive (execution of commands).
+
+        Coroutine version of ``GeminiG6.pause``.
+
+        """
+        return await self._simple_command('PS', 1.0, max_retries,
+                                          deadline)
+
+    async def unpause(self, max_retries=0, deadline=None):
+        """ Unpauses the drive.
+
+        Coroutine version of ``GeminiG6.unpause``.
+
+        """
+        return await self._simple_command('C', 1.0, max_retries,
+                                          deadline)
+
+    async def stop(self, max_retries=0, deadline=None):
+        """ Stops motion.
+
+        Coroutine version of ``GeminiG6.stop``.
+
+        """
+        return await self._simple_command('S1', 1.0, max_retries,
+                                          deadline)
+
+    async def kill(self, max_retries=0, deadline=None):
+        """ Kills the drive.
+
+        Coroutine version of ``GeminiG6.kill``.
+
+        """
+        return await self._simple_command('K', 1.0, max_retries,
+                                          deadline)
+
+    async def reset(self, max_retries=0, deadline=None):
+        """ Resets the drive.
+
+        Coroutine version of ``GeminiG6.reset``.
+
+        """
+        return await self._simple_command('RESET', 10.0, max_retries,
+                                          deadline)
+
+    async def get_program(self, n, timeout=2.0, max_retries=2,
+                          deadline=None):
+        """ Get a program from the drive.
+
+        Coroutine version of ``GeminiG6.get_program``.
+
+        """
+        response = await self.driver.send_command( \
+            'TPROG PROG' + str(int(n)), timeout=timeout, \
+            immediate=True, max_retries=max_retries, deadline=deadline)
+        return _parse_program(self.driver, response)
+
+    async def set_program_profile(self, n, commands,
+                                  program_or_profile='program',
+                                  timeout=1.0, max_retries=0,
+                                  deadline=None):
+        """ Sets a program/profile on the drive.
+
+        Coroutine version of ``GeminiG6.set_program_profile``.
+
+        """
+        if program_or_profile != 'profile':
+            current_program = await self.get_program(n, \
+                timeout=timeout, max_retries=max_retries+2, \
+                deadline=deadline)
+        else:
+            current_program = None
+        stripped_commands = utilities.strip_commands(commands)
+        if current_program is not None \
+                and current_program == stripped_commands:
+            return True
+        cmds, eor, cleanup_cmds = _program_profile_commands(n, \
+            stripped_commands, program_or_profile)
+        responses = await self.driver.send_commands(cmds, \
+            timeout=timeout, max_retries=max_retries, eor=eor, \
+            deadline=deadline)
+        if not self.driver.command_error(responses[-1]):
+            return True
+        await self.driver.send_commands(cleanup_cmds, timeout=timeout,
+                                        max_retries=max_retries+2,
+                                        deadline=deadline)
+        return False
+
+    async def run_program_profile(self, n, program_or_profile='program',
+                                  timeout=10.0, deadline=None):
+        """ Runs a program/profile on the drive.
+
+        Coroutine version of ``GeminiG6.run_program_profile``.
+
+        """
+        if program_or_profile != 'profile':
+            return await self.driver.send_command( \
+                'RUN PROG' + str(int(n)), timeout=timeout, \
+                immediate=True, eor='*END\n', deadline=deadline)
         else:
-            return (rsp[4][0][4] == '1')
+            return await self.driver.send_command( \
+                'PRUN PROF' + str(int(n)), timeout=1.0, immediate=True, \
+                deadline=deadline)
+
+    async def get_energized(self):
+        """ Gets the energized state of the motor.
+
+        See ``GeminiG6.energized``.
+
+        """
+        return await self._get_parameter('DRIVE', bool)
+
+    async def set_energized(self, value):
+        """ Energizes or de-energizes the motor.
+
+        See ``GeminiG6.energized``.
+
+        """
+        return await self._set_parameter('DRIVE', value, bool)
+
+    async def get_denergize_on_kill(self):
+        """ Gets whether the motor de-energizes when the drive is killed.
+
+        See ``GeminiG6.denergize_on_kill``.
+
+        """
+        return await self._get_parameter('KDRIVE', bool)
+
+    async def set_denergize_on_kill(self, value):
+        """ Sets whether the motor de-energizes when the drive is killed.
+
+        See ``GeminiG6.denergize_on_kill``.
+
+        """
+        return await self._set_parameter('KDRIVE', value, bool)
+
+    async def get_encoder_resolution(self):
+        """ Gets the encoder/resolver resolution.
+
+        See ``GeminiG6.encoder_resolution``.
+
+        """
+        return await self._get_parameter('ERES', int)
+
+    async def set_encoder_resolution(self, value):
+        """ Sets the encoder/resolver resolution and resets the drive.
+
+        See ``GeminiG6.encoder_resolution``.
+
+        """
+        await self._set_parameter('ERES', value, int)
+        await self.reset()
+
+    async def get_electrical_pitch(self):
+        """ Gets the motor's electrical pitch.
+
+        See ``GeminiG6.electrical_pitch``.
+
+        """
+        return await self._get_parameter('DMEPIT', float)
+
+    async def set_electrical_pitch(self, value):
+        """ Sets the motor's electrical pitch and resets the drive.
+
+        See ``GeminiG6.electrical_pitch``.
+
+        """
+        await self._set_parameter('DMEPIT', value, float)
+        await self.reset()
+
+    async def get_max_velocity(self):
+        """ Gets the motor's velocity limit.
+
+        See ``GeminiG6.max_velocity``.
+
+        """
+        return await self._get_parameter('DMVLIM', float)
+
+    async def set_max_velocity(self, value):
+        """ Sets the motor's velocity limit.
+
+        See ``GeminiG6.max_velocity``.
+
+        """
+        return await self._set_parameter('DMVLIM', value, float)
+
+    async def get_motion_commanded(self):
+        """ Gets whether motion is commanded or not.
+
+        See ``GeminiG6.motion_commanded``.
+
+        """
+        return _parse_motion_commanded(self.driver,
+            await self.driver.send_command('TAS', immediate=True))
@@ -0,0 +1,592 @@
+# Copyright 2014-2016 Freja Nordsiek
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Module for sharing a drive between processes.
+
+A ``DriveBroker`` owns the connection to a drive and serves commands to
+any number of ``BrokerClient`` drivers in other processes over a Unix
+domain socket. The broker can be run as a daemon with::
+
+    python -m GeminiMotorDrive.broker PORT SOCKET
+
+"""
+
+import os
+import json
+import time
+import queue
+import socket
+import argparse
+import itertools
+import threading
+import concurrent.futures
+
+import serial
+
+from .drivers import ASCII_RS232, Response, _command_error
+
+
+# Priorities of the requests in the queue, with lower ones going first.
+# Immediate commands go before everything else, and stopping the broker
+# goes before even those.
+_PRIORITY_STOP = -1
+_PRIORITY_IMMEDIATE = 0
+_PRIORITY_NORMAL = 1
+
+# The methods of the driver that clients can call.
+_METHODS = ('send_command', 'send_commands')
+
+
+def _encode_eor(eor, per_command):
+    """ Encodes an End Of Response for sending as JSON.
+
+    A ``list`` of EOR (one per command) and an iterable of allowed EOR
+    would both become JSON arrays, so whether it is per command or not
+    is sent along with it.
+
+    """
+    if per_command:
+        return [_encode_eor(e, False) for e in eor]
+    if isinstance(eor, str):
+        return eor
+    return list(eor)
+
+
+def _decode_eor(eor, per_command):
+    """ Decodes an End Of Response encoded with ``_encode_eor``.
+    """
+    if per_command:
+        return [_decode_eor(e, False) for e in eor]
+    if isinstance(eor, str):
+        return eor
+    return tuple(eor)
+
+
+class _Client(object):
+    """ A client connected to the broker.
+    """
+    def __init__(self, sock):
+        self.sock = sock
+        self.lock = threading.Lock()
+
+    def send(self, message):
+        """ Sends a message, ignoring a client that went away.
+        """
+        data = json.dumps(message).encode('utf-8') + b'\n'
+        try:
+            with self.lock:
+                self.sock.sendall(data)
+        except OSError:
+            pass
+
+
+class DriveBroker(object):
+    """ Serves a drive to other processes over a Unix domain socket.
+
+    Owns the connection to a drive (so its communications settings are
+    only configured once) and serves ``send_command`` and
+    ``send_commands`` calls from any number of ``BrokerClient`` drivers
+    connected to the socket at `path`. Clients can pipeline requests
+    (send more before the earlier ones are answered). All requests go
+    into a single queue that is worked through one at a time in the
+    order they arrived, except that immediate commands jump ahead of the
+    rest.
+
+    The broker is started with ``start`` and stopped with ``close``, or
+    used as a context manager which does both.
+
+    Parameters
+    ----------
+    driver : driver
+        Connected driver for the drive, such as a
+        ``drivers.ASCII_RS232``. It is not closed by the broker.
+    path : str
+        Path of the Unix domain socket to serve on. A stale socket left
+        behind at `path` is removed.
+
+    Raises
+    ------
+    OSError
+        If another broker is already serving on `path` or the socket
+        can't be made.
+
+    See Also
+    --------
+    BrokerClient
+
+    Examples
+    --------
+
+    >>> from GeminiMotorDrive import drivers
+    >>> from GeminiMotorDrive.broker import DriveBroker
+    >>> with drivers.ASCII_RS232('/dev/ttyS1') as ar:
+    ...     with DriveBroker(ar, '/tmp/gemini.sock') as broker:
+    ...         broker.wait()
+
+    """
+    def __init__(self, driver, path):
+        self.driver = driver
+        self.path = path
+
+        # Remove a stale socket, but not one that a broker is still
+        # serving on.
+        if os.path.exists(path):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(path)
+            except OSError:
+                os.unlink(path)
+            else:
+                raise OSError('A broker is already serving on '
+                              + path + '.')
+            finally:
+                probe.close()
+        self._server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._server.bind(path)
+        self._server.listen(16)
+
+        # Requests are put in a priority queue as (priority, sequence
+        # number, client, request) so that requests of the same
+        # priority stay in order.
+        self._queue = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._clients = set()
+        self._clients_lock = threading.Lock()
+        self._threads = []
+        self._running = False
+        self.requests = 0
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def start(self):
+        """ Starts serving in background threads.
+        """
+        if self._running:
+            return
+        self._running = True
+        for target, name in ((self._accept, 'DriveBrokerAccept'),
+                             (self._work, 'DriveBrokerWorker')):
+            thread = threading.Thread(target=target, name=name)
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def wait(self):
+        """ Waits till the broker is closed (from another thread).
+        """
+        for thread in list(self._threads):
+            thread.join()
+
+    def close(self):
+        """ Stops serving and disconnects all clients.
+
+        Requests still in the queue are not done.
+
+        """
+        if not self._running:
+            return
+        self._running = False
+        self._queue.put((_PRIORITY_STOP, -1, None, None))
+        try:
+            self._server.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._server.close()
+        with self._clients_lock:
+            clients = list(self._clients)
+        for client in clients:
+            try:
+                client.sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        for thread in self._threads:
+            if thread is not threading.current_thread():
+                thread.join()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def _accept(self):
+        """ Accepts clients till closed.
+        """
+        while self._running:
+            try:
+                sock = self._server.accept()[0]
+            except OSError:
+                break
+            client = _Client(sock)
+            with self._clients_lock:
+                self._clients.add(client)
+            thread = threading.Thread(target=self._read, args=(client, ),
+                                      name='DriveBrokerClient')
+            thread.daemon = True
+            thread.start()
+
+    def _read(self, client):
+        """ Reads the requests of a client and queues them.
+
+        Each request is a line of JSON.
+
+        """
+        try:
+            for line in client.sock.makefile('rb'):
+                try:
+                    request = json.loads(line.decode('utf-8'))
+                    params = request.get('params', {})
+                    if request['method'] == 'send_command' \
+                            and (params.get('immediate', False)
+                                 or params['command'].lstrip()
+                                 .startswith('!')):
+                        priority = _PRIORITY_IMMEDIATE
+                    else:
+                        priority = _PRIORITY_NORMAL
+                except (ValueError, KeyError, TypeError,
+                        AttributeError):
+                    client.send({'id': None,
+                                 'error': 'Malformed request.'})
+                    continue
+                self._queue.put((priority, next(self._sequence), client,
+                                 request))
+        except OSError:
+            pass
+        finally:
+            with self._clients_lock:
+                self._clients.discard(client)
+            client.sock.close()
+
+    def _work(self):
+        """ Does the queued requests one at a time till closed.
+        """
+        while True:
+            priority, sequence, client, request = self._queue.get()
+            if priority == _PRIORITY_STOP:
+                break
+            self.requests += 1
+            client.send(self._execute(request))
+
+    def _execute(self, request):
+        """ Executes a request on the driver.
+
+        Returns the reply.
+
+        """
+        method = request.get('method')
+        reply = {'id': request.get('id')}
+        if method not in _METHODS:
+            reply['error'] = 'Unknown method: ' + str(method)
+            return reply
+        params = dict(request.get('params', {}))
+
+        # The EOR and the deadline need to be decoded, the latter being
+        # sent as the time remaining since the clocks of different
+        # processes can't be compared.
+        if 'eor' in params:
+            params['eor'] = _decode_eor(params['eor'],
+                                        params.pop('eor_per_command',
+                                                   False))
+        remaining = params.pop('remaining', None)
+        if remaining is not None:
+            params['deadline'] = time.monotonic() + remaining
+        # The responses are sent as lists of their elements.
+        try:
+            result = getattr(self.driver, method)(**params)
+        except Exception as exc:
+            reply['error'] = str(exc)
+        else:
+            if method == 'send_command':
+                reply['result'] = list(result)
+            else:
+                reply['result'] = [list(r) for r in result]
+        return reply
+
+
+class BrokerClient(object):
+    """ Driver talking to a drive through a ``DriveBroker``.
+
+    Drop in replacement for ``drivers.ASCII_RS232`` that sends the
+    commands to a ``DriveBroker`` in another process instead of to the
+    drive directly, which makes connecting and closing nearly free. It
+    can be used by ``GeminiMotorDrive.GeminiG6`` and is what
+    ``GeminiMotorDrive.get_driver`` gives for the ``'BROKER'`` driver.
+
+    ``submit_command`` and ``submit_commands`` send requests without
+    waiting for the answers and return futures for them, so many
+    requests can be in flight at once (including from several threads).
+    ``send_command`` and ``send_commands`` are blocking versions with
+    the same arguments and output as the ones of
+    ``drivers.ASCII_RS232``.
+
+    Parameters
+    ----------
+    path : str
+        Path of the Unix domain socket the broker is serving on.
+
+    Raises
+    ------
+    OSError
+        If the broker can't be connected to.
+
+    See Also
+    --------
+    DriveBroker
+    drivers.ASCII_RS232
+
+    """
+    def __init__(self, path):
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.connect(path)
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._pending = dict()
+        self._closed = False
+
+        # Replies are read by a background thread that hands each one
+        # to the future of its request.
+        self._thread = threading.Thread(target=self._read,
+                                        name='BrokerClient')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def closed(self):
+        """ Whether the client has been closed.
+
+        ``bool``
+
+        """
+        return self._closed
+
+    def close(self):
+        """ Disconnects from the broker.
+
+        Requests not answered yet fail with ``serial.SerialException``.
+
+        """
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._thread.join()
+        self._sock.close()
+
+    def _read(self):
+        """ Reads replies till disconnected.
+        """
+        try:
+            for line in self._sock.makefile('rb'):
+                reply = json.loads(line.decode('utf-8'))
+                with self._lock:
+                    future, single = self._pending.pop(reply.get('id'),
+                                                       (None, False))
+                if future is None:
+                    continue
+                if 'error' in reply:
+                    future.set_exception(serial.SerialException(
+                        reply['error']))
+                elif single:
+                    future.set_result(Response(*reply['result']))
+                else:
+                    future.set_result([Response(*r)
+                                       for r in reply['result']])
+        except (OSError, ValueError):
+            pass
+        finally:
+            self._closed = True
+            with self._lock:
+                pending = list(self._pending.values())
+                self._pending.clear()
+            for future, single in pending:
+                future.set_exception(serial.SerialException(
+                    'Disconnected from the broker.'))
+
+    def _submit(self, method, params, deadline):
+        """ Sends a request and returns the future for its reply.
+        """
+        if deadline is not None:
+            params['remaining'] = deadline - time.monotonic()
+        future = concurrent.futures.Future()
+        with self._lock:
+            if self._closed:
+                raise serial.SerialException(
+                    'Disconnected from the broker.')
+            request_id = next(self._ids)
+            self._pending[request_id] = (future,
+                                         method == 'send_command')
+            self._sock.sendall(json.dumps({'id': request_id,
+                                           'method': method,
+                                           'params': params})
+                               .encode('utf-8') + b'\n')
+        return future
+
+    def submit_command(self, command, immediate=False, timeout=1.0,
+                       max_retries=0, eor=('\n', '\n- '),
+                       deadline=None):
+        """ Submits a single command to be sent to the drive.
+
+        Takes the same arguments as ``drivers.ASCII_RS232.send_command``
+        but returns right away with a future for the output.
+
+        Returns
+        -------
+        future : concurrent.futures.Future
+            Future for the processed response, which is the
+            ``drivers.Response`` described in
+            ``drivers.ASCII_RS232.send_command``.
+
+        Raises
+        ------
+        serial.SerialException
+            If disconnected from the broker.
+
+        See Also
+        --------
+        drivers.ASCII_RS232.send_command
+
+        """
+        return self._submit('send_command',
+                            {'command': command, 'immediate': immediate,
+                             'timeout': timeout,
+                             'max_retries': max_retries,
+                             'eor': _encode_eor(eor, False)}, deadline)
+
+    def submit_commands(self, commands, timeout=1.0, max_retries=1,
+                        eor=('\n', '\n- '), deadline=None):
+        """ Submits a sequence of commands to be sent to the drive.
+
+        Takes the same arguments as
+        ``drivers.ASCII_RS232.send_commands`` but returns right away
+        with a future for the output. No other commands are sent to the
+        drive in the middle of the sequence.
+
+        Returns
+        -------
+        future : concurrent.futures.Future
+            Future for the ``list`` of processed responses.
+
+        Raises
+        ------
+        serial.SerialException
+            If disconnected from the broker.
+
+        See Also
+        --------
+        drivers.ASCII_RS232.send_commands
+
+        """
+        per_command = isinstance(eor, list)
+        return self._submit('send_commands',
+                            {'commands': list(commands),
+                             'timeout': timeout,
+                             'max_retries': max_retries,
+                             'eor': _encode_eor(eor, per_command),
+                             'eor_per_command': per_command}, deadline)
+
+    def send_command(self, command, immediate=False, timeout=1.0,
+                     max_retries=0, eor=('\n', '\n- '), deadline=None):
+        """ Sends a single command to the drive and returns output.
+
+        Blocking version of ``submit_command``. Takes the same arguments
+        as and returns the same output as
+        ``drivers.ASCII_RS232.send_command``.
+
+        See Also
+        --------
+        drivers.ASCII_RS232.send_command
+
+        """
+        return self.submit_command(command, immediate=immediate,
+                                   timeout=timeout,
+                                   max_retries=max_retries, eor=eor,
+                                   deadline=deadline).result()
+
+    def send_commands(self, commands, timeout=1.0, max_retries=1,
+                      eor=('\n', '\n- '), deadline=None):
+        """ Send a sequence of commands to the drive and collect output.
+
+        Blocking version of ``submit_commands``. Takes the same
+        arguments as and returns the same output as
+        ``drivers.ASCII_RS232.send_commands``.
+
+        See Also
+        --------
+        drivers.ASCII_RS232.send_commands
+
+        """
+        return self.submit_commands(commands, timeout=timeout,
+                                    max_retries=max_retries, eor=eor,
+                                    deadline=deadline).result()
+
+    def command_error(self, response):
+        """ Checks whether a command produced an error.
+
+        See ``drivers.ASCII_RS232.command_error``.
+
+        Parameters
+        ----------
+        response : drivers.Response or list
+            The processed response for the command that was executed.
+
+        Returns
+        -------
+        error : bool
+            ``True`` if there was an error and ``False`` otherwise.
+
+        """
+        return _command_error(response)
+
+
+def main(argv=None):
+    """ Runs a broker for a drive on a serial port till interrupted.
+
+    Parameters
+    ----------
+    argv : list of str or None, optional
+        The command line arguments. ``None`` means ``sys.argv[1:]``.
+
+    """
+    parser = argparse.ArgumentParser(
+        prog='python -m GeminiMotorDrive.broker',
+        description='Serve a Parker Motion Gemini drive to other '
+        'processes over a Unix domain socket.')
+    parser.add_argument('port', help='serial port the drive is on')
+    parser.add_argument('path', help='path of the socket to serve on')
+    parser.add_argument('--baudrate', type=int, default=9600,
+                        help='baud rate to switch to (default 9600)')
+    parser.add_argument('--bulk-write', action='store_true',
+                        help='write commands to the drive in bulk')
+    args = parser.parse_args(argv)
+    with ASCII_RS232(args.port, baudrate=args.baudrate,
+                     bulk_write=args.bulk_write) as driver:
+        with DriveBroker(driver, args.path) as broker:
+            try:
+                broker.wait()
+            except KeyboardInterrupt:
+                pass
+
+
+if __name__ == '__main__':
+    main()
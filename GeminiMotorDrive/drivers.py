@@ -19,119 +19,3087 @@ import sys
 import io
 import time
 import threading
+import asyncio
 
 import serial
 
+from .transports import SocketTransport
+from .instrumentation import DriverStats, command_name
+from .utilities import TimeoutEstimator
+from .retry import RetryPolicy, HALF_OPEN
 
-class ASCII_RS232(object):
+
+# The default baud rate of the drives, which is what is used to
+# initially connect to them.
+_DEFAULT_BAUDRATE = 9600
+
+# The communications settings used while connected, which make the
+# drive echo commands, use error level 4, put no characters before each
+# response, use carriage returns for newlines in responses, terminate
+# responses with a '\n', and not give prompts (there are separate
+# prompts depending on whether the previous command had an error or
+# not). The echo command must be first as it is the one command that
+# echo checking cannot be done on since echo may not be enabled yet.
+_COMMS_SETTINGS = ('ECHO1', 'ERRLVL4', 'BOT0,0,0', 'EOT10,0,0',
+                   'EOL13,0,0', 'ERRBAD0,0,0,0', 'ERROK0,0,0,0')
+
+# The default values of the communications settings (from the manual),
+# which they are returned to when disconnecting.
+_DEFAULT_COMMS_SETTINGS = ('ECHO1', 'ERRLVL4', 'BOT0,0,0', 'EOT13,0,0',
+                           'EOL13,10,0', 'ERRBAD13,10,63,32',
+                           'ERROK13,10,62,32')
+
+# Default number of consecutive clean commands after which adaptive echo
+# checking stops checking the echo before entering each command.
+_ADAPTIVE_THRESHOLD = 20
+
+# The pause in seconds between commands when doing fixed pacing.
+_FIXED_PACING_GAP = 0.25
+
+# Interval in seconds at which ports that can't be waited on by the
+# event loop are polled by the asyncio driver.
+_POLL_INTERVAL = 0.001
+
+# Read timeout in seconds used by the background reader thread, which
+# bounds how long it takes to notice that it has been stopped.
+_READER_TIMEOUT = 0.05
+
+# Time in seconds to wait for the drive to start responding to a
+# communications settings command, and the time in seconds without any
+# more data arriving after which its response is taken to be complete.
+_CONFIRM_TIMEOUT = 0.25
+_QUIET_TIME = 0.02
+
+# Time in seconds to wait for the drive to answer the query used to
+# confirm that it has processed all the commands sent before it.
+_SYNC_TIMEOUT = 2.0
+
+# Time in seconds to give the drive to switch to a new baud rate, which
+# is also the timeout used when verifying communications at the new
+# rate.
+_BAUDRATE_SETTLE_TIME = 0.25
+
+
+def _get_deadline(timeout, deadline=None):
+    """ Gets the deadline for a timeout.
+
+    Converts a timeout to a deadline on the ``time.monotonic`` clock and
+    combines it with another deadline, taking whichever is earlier.
+
+    Parameters
+    ----------
+    timeout : number or None
+        Timeout in seconds. A negative value or ``None`` indicates an
+        infinite timeout.
+    deadline : float or None, optional
+        Another deadline on the ``time.monotonic`` clock, or ``None``
+        for no deadline.
+
+    Returns
+    -------
+    deadline : float or None
+        The earliest of the two deadlines, or ``None`` if there is no
+        deadline at all.
+
+    """
+    if timeout is not None and timeout >= 0:
+        timeout_deadline = time.monotonic() + timeout
+        if deadline is None or timeout_deadline < deadline:
+            return timeout_deadline
+    return deadline
+
+
+def _deadline_passed(deadline):
+    """ Checks whether a deadline has passed.
+
+    Parameters
+    ----------
+    deadline : float or None
+        Deadline on the ``time.monotonic`` clock, or ``None`` for no
+        deadline.
+
+    Returns
+    -------
+    passed : bool
+        Whether `deadline` has passed or not.
+
+    """
+    return deadline is not None and time.monotonic() >= deadline
+
+
+def _sleep(duration, deadline=None):
+    """ Sleeps for a duration but not past a deadline.
+
+    Parameters
+    ----------
+    duration : float
+        Number of seconds to sleep.
+    deadline : float or None, optional
+        Deadline on the ``time.monotonic`` clock to not sleep past, or
+        ``None`` for no deadline.
+
+    """
+    if deadline is not None:
+        duration = min(duration, deadline - time.monotonic())
+    if duration > 0:
+        time.sleep(duration)
+
+
+async def _sleep_async(duration, deadline=None):
+    """ Sleeps for a duration but not past a deadline without blocking.
+
+    Coroutine version of ``_sleep``.
+
+    Parameters
+    ----------
+    duration : float
+        Number of seconds to sleep.
+    deadline : float or None, optional
+        Deadline on the ``time.monotonic`` clock to not sleep past, or
+        ``None`` for no deadline.
+
+    """
+    if deadline is not None:
+        duration = min(duration, deadline - time.monotonic())
+    if duration > 0:
+        await asyncio.sleep(duration)
+
+
+def _command_error(response):
+    """ Checks whether a command produced an error.
+
+    See ``ASCII_RS232.command_error``.
+
+    Parameters
+    ----------
+    response : Response or list
+        The processed response for the command that was executed.
+
+    Returns
+    -------
+    error : bool
+        ``True`` if there was an error and ``False`` otherwise.
+
+    """
+    # A Response already knows, and otherwise it is a 5-element list
+    # that has to be checked.
+    if isinstance(response, Response):
+        return not response.ok
+    return not _response_ok(response[0], response[2], response[3])
+
+
+def _response_ok(command, echo, error):
+    """ Checks whether a command's response shows it went fine.
+
+    Parameters
+    ----------
+    command : str
+        The sanitized command.
+    echo : str or None
+        The echoed command.
+    error : str or None
+        The error returned by the drive, if any.
+
+    Returns
+    -------
+    ok : bool
+        ``True`` if there was no error and ``False`` otherwise.
+
+    """
+    # The command should be echoed back accurately (might be preceeded
+    # by a '- ' if it is part of a program definition) and no errors
+    # should be returned, if it has no errors.
+    return (error is None
+            and (echo == command or echo == '- ' + command))
+
+
+class Response(object):
+    """ Processed response of the drive to a command.
+
+    The response to a command is broken down into the echoed command
+    (drive echoes it back), any error returned by the drive (leading '*'
+    is stripped), and the different lines of the response. Whether the
+    command went fine is worked out once when it is made and kept in
+    ``ok``.
+
+    It uses ``__slots__`` to keep it small. For compatibility, it also
+    acts like the 5-element ``list`` ``[command, raw, echo, error,
+    lines]`` that was used before, and compares equal to one with the
+    same elements.
+
+    Parameters
+    ----------
+    command : str
+        The sanitized command.
+    raw : str or None
+        The full response from the drive, or ``None`` if it wasn't
+        kept.
+    echo : str or None
+        The echoed command, or ``None`` if there wasn't one.
+    error : str or None
+        The error returned by the drive, or ``None`` if there wasn't
+        one.
+    lines : list of str
+        The lines of the response that are not the echo or error line,
+        with newlines stripped.
+
+    Attributes
+    ----------
+    command : str
+    raw : str or None
+    echo : str or None
+    error : str or None
+    lines : list of str
+    ok : bool
+        Whether the command was echoed back accurately and the drive
+        didn't return an error.
+
+    See Also
+    --------
+    ASCII_RS232.send_command
+
+    """
+    __slots__ = ('command', 'raw', 'echo', 'error', 'lines', 'ok')
+
+    def __init__(self, command, raw, echo, error, lines):
+        self.command = command
+        self.raw = raw
+        self.echo = echo
+        self.error = error
+        self.lines = lines
+        self.ok = _response_ok(command, echo, error)
+
+    def __repr__(self):
+        return 'Response(' + ', '.join([repr(v) for v in self]) + ')'
+
+    def __len__(self):
+        return 5
+
+    def __getitem__(self, index):
+        return (self.command, self.raw, self.echo, self.error,
+                self.lines)[index]
+
+    def __iter__(self):
+        return iter((self.command, self.raw, self.echo, self.error,
+                     self.lines))
+
+    def __eq__(self, other):
+        if isinstance(other, (Response, list, tuple)):
+            return list(self) == list(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    __hash__ = None
+
+
+def _common_prefix_length(command, start, run):
+    """ Gets how much of a run of echo matches a command.
+
+    Parameters
+    ----------
+    command : bytes
+        The command.
+    start : int
+        The position in `command` the run starts at.
+    run : bytes
+        The run of echo.
+
+    Returns
+    -------
+    length : int
+        The length of the longest start of `run` that matches `command`
+        from `start` on.
+
+    """
+    if command.startswith(run, start):
+        return len(run)
+    # Binary search for the length, which keeps the comparisons in C.
+    low = 0
+    high = len(run)
+    while high - low > 1:
+        middle = (low + high) // 2
+        if command.startswith(run[:middle], start):
+            low = middle
+        else:
+            high = middle
+    return low
+
+
+class EchoReconciler(object):
+    """ Streaming reconciler of a command with the drive's echo of it.
+
+    When echo checking, the echo of a command being written to the drive
+    is compared to the command to find out what the drive actually has
+    in its command buffer and what needs to be written next to get it
+    right. The echo is fed in as it arrives. Each byte is only looked at
+    once and in constant time, so the cost is linear in the amount of
+    echo no matter how noisy the line is or how long the command is.
+
+    Each backspace (``b'\\x08'``) in the echo deletes itself and the
+    character before it (if any). The confirmed prefix is the part of
+    the echo, after processing backspaces, that matches the beginning
+    of the command.
+
+    Parameters
+    ----------
+    command : bytes
+        The command being written (sanitized, without the carriage
+        return that enters it).
+
+    Attributes
+    ----------
+    command : bytes
+    echo : bytes
+    confirmed : int
+    done : bool
+
+    Examples
+    --------
+
+    A mistake in the echo gets fixed with a backspace.
+
+    >>> from GeminiMotorDrive.drivers import EchoReconciler
+    >>> r = EchoReconciler(b'DRIVE1')
+    >>> r.feed(b'DRIX')
+    >>> r.confirmed
+    3
+    >>> r.next_byte()
+    b'\\x08'
+    >>> r.feed(b'\\x08')
+    >>> r.next_byte()
+    b'V'
+    >>> r.feed(b'VE1')
+    >>> r.done
+    True
+
+    """
+    def __init__(self, command):
+        self._command = bytes(command)
+        self._echo = bytearray()
+        self._confirmed = 0
+
+    def __len__(self):
+        return len(self._echo)
+
+    @property
+    def command(self):
+        """ The command being written.
+
+        ``bytes``
+
+        """
+        return self._command
+
+    @property
+    def echo(self):
+        """ The echo so far with backspaces processed.
+
+        ``bytes``
+
+        """
+        return bytes(self._echo)
+
+    @property
+    def confirmed(self):
+        """ The length of the confirmed prefix of the echo.
+
+        ``int``
+
+        """
+        return self._confirmed
+
+    @property
+    def done(self):
+        """ Whether the echo is exactly the command.
+
+        ``bool``
+
+        """
+        return (self._confirmed == len(self._command)
+                and len(self._echo) == self._confirmed)
+
+    def matches(self, length):
+        """ Checks whether the echo is exactly the start of the command.
+
+        Parameters
+        ----------
+        length : int
+            The length of the start of the command.
+
+        Returns
+        -------
+        match : bool
+            Whether the echo is the first `length` bytes of the command.
+
+        """
+        return len(self._echo) == length and self._confirmed == length
+
+    def feed(self, data):
+        """ Adds newly arrived echo.
+
+        Parameters
+        ----------
+        data : bytes
+            The echo that just arrived.
+
+        """
+        echo = self._echo
+
+        # Fast path for the common case of no backspaces.
+        if b'\x08' not in data:
+            if self._confirmed == len(echo):
+                self._confirmed += _common_prefix_length(
+                    self._command, self._confirmed, data)
+            echo += data
+            return
+
+        command = self._command
+        confirmed = self._confirmed
+
+        # Otherwise, the data is split into the runs between
+        # backspaces, each of which is added in one go, with each
+        # backspace removing the last byte (and shortening the confirmed
+        # prefix if the byte was part of it). A run extends the
+        # confirmed prefix only if everything before it is confirmed, in
+        # which case the matching part of it is found with C speed bytes
+        # comparisons.
+        for i, run in enumerate(data.split(b'\x08')):
+            if i > 0 and len(echo) != 0:
+                if confirmed == len(echo):
+                    confirmed -= 1
+                del echo[-1]
+            if len(run) != 0:
+                if confirmed == len(echo):
+                    confirmed += _common_prefix_length(command,
+                                                       confirmed, run)
+                echo += run
+        self._confirmed = confirmed
+
+    def next_byte(self):
+        """ Gets the next byte to write to the drive.
+
+        Returns
+        -------
+        b : bytes or None
+            The next byte of the command if the whole echo is confirmed,
+            a backspace if there is a mistake to remove, or ``None`` if
+            the echo is already the command.
+
+        """
+        if self._confirmed == len(self._echo):
+            if self._confirmed == len(self._command):
+                return None
+            return self._command[self._confirmed:(self._confirmed + 1)]
+        return b'\x08'
+
+
+class _EORScanner(object):
+    """ Incremental scanner for the End Of Response of a response.
+
+    Scans a growing response buffer for the first occurrence of any of
+    the allowed End Of Response (EOR) strings, only looking at the part
+    of the buffer that could not have been checked already.
+
+    Parameters
+    ----------
+    eor : iterable of bytes
+        The allowed EOR strings. If several are found at the same
+        position, the earliest one in `eor` is used.
+
+    """
+    def __init__(self, eor):
+        self._eor = tuple(eor)
+        self._max_len = max([len(x) for x in self._eor])
+        self._scanned = 0
+
+    def scan(self, buf):
+        """ Scans the newly arrived part of the buffer for the EOR.
+
+        Parameters
+        ----------
+        buf : bytes or bytearray
+            The whole response buffer so far, which must only grow
+            between calls.
+
+        Returns
+        -------
+        end : int
+            The index just past the end of the first EOR in `buf`, or
+            ``-1`` if none has been found yet.
+
+        """
+        # An EOR that straddles the previously scanned part and the new
+        # part can start up to one byte less than the longest EOR before
+        # the end of the previously scanned part.
+        start = max(0, self._scanned - self._max_len + 1)
+        self._scanned = len(buf)
+
+        # Find the match that starts first, with ties going to the
+        # earliest EOR given.
+        best = -1
+        end = -1
+        for x in self._eor:
+            index = buf.find(x, start)
+            if index != -1 and (best == -1 or index < best):
+                best = index
+                end = index + len(x)
+        return end
+
+
+class _RingBuffer(object):
+    """ Fixed size FIFO byte buffer that drops the oldest bytes.
+
+    Parameters
+    ----------
+    size : int
+        The maximum number of bytes held.
+
+    Attributes
+    ----------
+    dropped : int
+        The total number of bytes dropped because the buffer was full.
+
+    """
+    def __init__(self, size):
+        self._buf = bytearray(max(1, int(size)))
+        self._start = 0
+        self._length = 0
+        self.dropped = 0
+
+    def __len__(self):
+        return self._length
+
+    def write(self, data):
+        """ Adds bytes to the buffer, dropping the oldest if full.
+
+        Parameters
+        ----------
+        data : bytes
+            The bytes to add.
+
+        """
+        size = len(self._buf)
+        # If there is more data than fits, only the end of it is kept.
+        if len(data) > size:
+            self.dropped += len(data) - size
+            data = data[-size:]
+        # Drop the oldest bytes to make room.
+        overflow = self._length + len(data) - size
+        if overflow > 0:
+            self.dropped += overflow
+            self._start = (self._start + overflow) % size
+            self._length -= overflow
+        # Copy the data in, wrapping around the end if need be.
+        end = (self._start + self._length) % size
+        n = min(len(data), size - end)
+        self._buf[end:(end + n)] = data[:n]
+        self._buf[:(len(data) - n)] = data[n:]
+        self._length += len(data)
+
+    def read(self):
+        """ Removes and returns everything in the buffer.
+
+        Returns
+        -------
+        data : bytes
+            Everything in the buffer, oldest first.
+
+        """
+        end = self._start + self._length
+        if end <= len(self._buf):
+            data = bytes(self._buf[self._start:end])
+        else:
+            data = bytes(self._buf[self._start:]) \
+                + bytes(self._buf[:(end - len(self._buf))])
+        self._start = 0
+        self._length = 0
+        return data
+
+
+class _BackgroundReader(object):
+    """ Thread that continuously reads a serial port.
+
+    Drains the port into a bounded ring buffer as data arrives. When a
+    caller is waiting for a response, the arriving data is instead
+    framed into the response using its End Of Response scanner, and the
+    caller is woken up once the whole response is there. Data that
+    arrives when nobody is waiting for it (unsolicited output) is kept
+    in a second bounded ring buffer instead of being thrown away.
+
+    The thread only holds references to this object and the port, not
+    the driver, so that the driver can still be garbage collected. The
+    driver puts its taps in ``taps`` so that the thread can give them
+    what it reads.
+
+    Parameters
+    ----------
+    ser : serial.Serial
+        The open port to read.
+    size : int
+        The size of each ring buffer in bytes.
+
+    """
+    def __init__(self, ser, size):
+        self._ser = ser
+        self._rx = _RingBuffer(size)
+        self._unsolicited = _RingBuffer(size)
+        self._cond = threading.Condition()
+        self._scanner = None
+        self._frame = None
+        self._frame_end = -1
+        self._running = False
+        self._thread = None
+        self.taps = ()
+
+    def start(self):
+        """ Starts the reading thread.
+        """
+        self._ser.timeout = _READER_TIMEOUT
+        self._running = True
+        self._thread = threading.Thread(target=self._run,
+                                        name='GeminiReader')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """ Stops the reading thread and waits for it to finish.
+        """
+        self._running = False
+        if self._thread is not None \
+                and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        """ Reads the port till stopped.
+        """
+        while self._running:
+            try:
+                data = self._ser.read(1)
+                if len(data) != 0:
+                    n = self._ser.inWaiting()
+                    if n > 0:
+                        data += self._ser.read(n)
+            except (serial.SerialException, OSError, TypeError):
+                # The port was closed or failed out from under us.
+                break
+            if len(data) == 0:
+                continue
+            if self.taps:
+                now = time.monotonic()
+                for tap in self.taps:
+                    tap.on_read(now, data)
+            with self._cond:
+                # Frame it into the response being waited for if there
+                # is one and it isn't complete yet. Otherwise, put it in
+                # the ring buffer.
+                if self._scanner is not None and self._frame_end == -1:
+                    self._frame += data
+                    self._frame_end = self._scanner.scan(self._frame)
+                    if self._frame_end != -1:
+                        self._cond.notify_all()
+                else:
+                    self._rx.write(data)
+                    self._cond.notify_all()
+        self._running = False
+
+    def read_chunk(self, deadline=None):
+        """ Reads whatever the drive has sent so far.
+
+        Waits till at least one byte is in the ring buffer or `deadline`
+        has passed, and then takes everything in it.
+
+        Parameters
+        ----------
+        deadline : float or None, optional
+            Time on the ``time.monotonic`` clock to give up waiting at.
+            ``None`` means to wait forever.
+
+        Returns
+        -------
+        data : bytes
+            The bytes read, which are empty if the deadline passed
+            without anything arriving.
+
+        """
+        with self._cond:
+            while len(self._rx) == 0 and self._running \
+                    and not _deadline_passed(deadline):
+                if deadline is None:
+                    self._cond.wait()
+                else:
+                    self._cond.wait(deadline - time.monotonic())
+            return self._rx.read()
+
+    def read_response(self, scanner, deadline=None, idle=None,
+                      overall=None):
+        """ Reads a response from the drive.
+
+        Parameters
+        ----------
+        scanner : _EORScanner
+            The scanner for the End Of Response of the response.
+        deadline : float or None, optional
+            Time on the ``time.monotonic`` clock to give up waiting at.
+            ``None`` means to wait forever.
+        idle : float or None, optional
+            If given, the timeout in seconds that `deadline` came from,
+            which is restarted (up to `overall`) whenever it passes with
+            more of the response having arrived since it was last
+            started.
+        overall : float or None, optional
+            Time on the ``time.monotonic`` clock that `deadline` can't
+            be pushed past when restarting `idle`.
+
+        Returns
+        -------
+        response : bytearray
+            The response up to and including the End Of Response, or
+            everything received before the deadline if it wasn't found.
+
+        """
+        with self._cond:
+            # Start the frame with whatever has already arrived and
+            # register the scanner so the thread frames the rest.
+            self._frame = bytearray(self._rx.read())
+            self._frame_end = scanner.scan(self._frame)
+            self._scanner = scanner
+            seen = len(self._frame)
+            while self._frame_end == -1 and self._running:
+                if _deadline_passed(deadline):
+                    if idle is None or len(self._frame) == seen:
+                        break
+                    seen = len(self._frame)
+                    deadline = _get_deadline(idle, overall)
+                    continue
+                if deadline is None:
+                    self._cond.wait()
+                else:
+                    self._cond.wait(deadline - time.monotonic())
+            frame = self._frame
+            end = self._frame_end
+            self._scanner = None
+            self._frame = None
+
+            # Anything after the EOR is put back into the ring buffer,
+            # which is empty since the thread was putting everything
+            # into the frame.
+            if end != -1:
+                self._rx.write(bytes(frame[end:]))
+                del frame[end:]
+            return frame
+
+    def discard(self):
+        """ Moves everything in the ring buffer to the unsolicited data.
+        """
+        with self._cond:
+            self._unsolicited.write(self._rx.read())
+
+    def read_unsolicited(self):
+        """ Takes all the unsolicited data.
+
+        Returns
+        -------
+        data : bytes
+            The unsolicited data received since the last call.
+        dropped : int
+            The number of bytes dropped since the last call because
+            the buffers were full.
+
+        """
+        with self._cond:
+            dropped = self._rx.dropped + self._unsolicited.dropped
+            self._rx.dropped = 0
+            self._unsolicited.dropped = 0
+            return self._unsolicited.read(), dropped
+
+
+class _ASCIIDriver(object):
+    """ Base class for the ASCII protocol drivers.
+
+    Holds the parts of talking to a Parker Motion Gemini drive in ASCII
+    mode that don't depend on how the bytes get to and from the drive:
+    the echo, writing, and pacing options, sanitizing commands, and
+    processing responses.
+
+    Parameters
+    ----------
+    check_echo : bool
+        Whether the echoing of the commands as they are being written
+        to the drive should be used to correct mistakes in what the
+        drive is seeing or not as the default.
+    bulk_write : bool
+        Whether commands should be written to the drive in bulk.
+    chunk_size : int or None
+        Maximum number of characters to write at once when doing bulk
+        writes. ``None`` means the whole command is written at once.
+    pacing : {'response', 'fixed'}
+        How commands are paced.
+    min_gap : float or None
+        Minimum time in seconds between receiving the response to a
+        command and sending the next command. ``None`` means to use the
+        default for the `pacing`.
+    retry_delay : float
+        Time in seconds to wait before retrying a command that had an
+        error.
+    keep_raw : bool, optional
+        Whether to keep the full response from the drive in the
+        ``Response`` after it has been processed or not.
+
+    Raises
+    ------
+    ValueError
+        If `pacing` is not one of the allowed values.
+
+    """
+    def __init__(self, check_echo, bulk_write, chunk_size, pacing,
+                 min_gap, retry_delay, keep_raw=True):
+        # Set private variables holding the echo and writing
+        # parameters. A chunk size that is None or not positive means
+        # the whole command is written at once.
+        self._check_echo = check_echo
+        self._bulk_write = bulk_write
+        if chunk_size is None or chunk_size <= 0:
+            self._chunk_size = None
+        else:
+            self._chunk_size = int(chunk_size)
+
+        # Set the pacing parameters. Fixed pacing is the same as
+        # response pacing with a non-zero minimum gap. The time the last
+        # response was received is kept to enforce the gap.
+        if pacing not in ('response', 'fixed'):
+            raise ValueError("pacing must be 'response' or 'fixed'.")
+        if min_gap is None:
+            if pacing == 'fixed':
+                min_gap = _FIXED_PACING_GAP
+            else:
+                min_gap = 0.0
+        self._min_gap = max(0.0, min_gap)
+        self._retry_delay = max(0.0, retry_delay)
+        self._last_response_time = None
+        self._keep_raw = keep_raw
+
+        # The time it takes to transmit a single character (8 data bits
+        # plus a start and stop bit) is needed to know how long to wait
+        # for the echo of a bulk write.
+        self._char_time = 10.0 / _DEFAULT_BAUDRATE
+
+    def _get_chunk_size(self, c):
+        """ Gets the number of characters to write at once in bulk.
+
+        Parameters
+        ----------
+        c : bytes
+            The sanitized command to be written.
+
+        Returns
+        -------
+        chunk_size : int
+            The number of characters to write at once.
+
+        """
+        if self._chunk_size is None:
+            return max(1, len(c))
+        else:
+            return self._chunk_size
+
+    def _get_pacing_delay(self):
+        """ Gets how long to wait before sending the next command.
+
+        Returns
+        -------
+        delay : float
+            Time in seconds remaining till the minimum gap since the
+            last response has passed.
+
+        """
+        if self._min_gap > 0 and self._last_response_time is not None:
+            return (self._last_response_time + self._min_gap
+                    - time.monotonic())
+        else:
+            return 0.0
+
+    def _empty_response(self, command, immediate=False):
+        """ Makes the response for a command that was never sent.
+
+        Parameters
+        ----------
+        command : str
+            The command.
+        immediate : bool, optional
+            Whether the command was to be executed immediately or not.
+
+        Returns
+        -------
+        output : Response
+            The processed response with an empty response from the
+            drive, which is an error. See ``send_command``.
+
+        """
+        c = self._sanitize_command(command, immediate=immediate)
+        if sys.hexversion >= 0x03000000:
+            c = c.decode(errors='replace')
+        return self._make_response(c, '')
+
+    def _make_response(self, command, response):
+        """ Makes the processed response to a command.
+
+        Parameters
+        ----------
+        command : str
+            The sanitized command.
+        response : str
+            The response returned by the drive.
+
+        Returns
+        -------
+        output : Response
+            The processed response, without the full response from the
+            drive if it isn't being kept.
+
+        """
+        processed = self._process_response(response)
+        if not self._keep_raw:
+            processed[0] = None
+        return Response(command, *processed)
+
+    def _sanitize_command(self, command, immediate=False):
+        """ Sanitizes a command.
+
+        Takes a single given `command` and sanitizes it (strips out
+        comments, extra whitespace, and newlines). If `immediate` is
+        set, the command is made to start with an ``'!'``.
+
+        Parameters
+        ----------
+        command : str
+            The command to sanitize.
+        immediate : bool, optional
+            Whether to make it so the command is executed immediately or
+            not.
+
+        Returns
+        -------
+        sanitized_command : bytes
+            The sanitized command.
+
+        """
+        # Convert to bytes and then strip comments, whitespace, and
+        # newlines.
+        if sys.hexversion >= 0x03000000:
+            c = bytes(command, encoding='ASCII')
+        else:
+            c = command
+        c = c.split(b';')[0].strip()
+
+        # If the command is supposed to be immediate, insure that it
+        # starts with an '!'.
+        if immediate and not c.startswith(b'!'):
+            c = b'!' + c
+        return c
+
+
+    def _process_response(self, response):
+        """ Processes a response from the drive.
+
+        Processes the response returned from the drive. It is broken
+        down into the echoed command (drive echoes it back), any error
+        returned by the drive (leading '*' is stripped), and the
+        different lines of the response.
+
+        Parameters
+        ----------
+        response : str
+            The response returned by the drive.
+
+        Returns
+        -------
+        processed_response : list
+            A 4-element ``list``. The elements, in order, are `response`
+            (``str``), the echoed command (``str``), any error response
+            (``None`` if none, or the ``str`` of the error), and the
+            lines of the response that are not the echo or error line
+            (``list`` of ``str`` with newlines stripped).
+
+        """
+        # Strip the trailing newline and split the response into lines
+        # by carriage returns.
+        rsp_lines = response.rstrip('\r\n').split('\r')
+
+        # If we have at least one line, the first one is the echoed
+        # command. If available, it needs to be grabbed and that line
+        # removed from rsp_lines since it is just the echoing, not the
+        # actual response to the command. None will be used to denote a
+        # non-existent echo.
+        if len(rsp_lines) > 0:
+            echoed_command = rsp_lines[0]
+            del rsp_lines[0]
+        else:
+            echoed_command = None
+
+        # If the next line is one of the different possible error
+        # strings, then there was an error that must be grabbed (leading
+        # '*' is stripped). If there was an error, remove that line from
+        # the response. None will be used to denote the lack of an error.
+        if len(rsp_lines) > 0 and \
+                rsp_lines[0] in ('*INVALID_ADDRESS', '*INVALID_DATA', \
+                '*INVALID_DATA_HIGH', '*INVALID_DATA_LOW', \
+                '*UNDEFINED_LABEL'):
+            err = rsp_lines[0][1:]
+            del rsp_lines[0]
+        else:
+            err = None
+
+        return [response, echoed_command, err, rsp_lines]
+
+
+    def command_error(self, response):
+        """ Checks whether a command produced an error.
+
+        Checks whether a command procuded an error based on its
+        processed response. The two types of errors are an error
+        returned by the drive and the command that the drive received
+        being different than the one that was sent (error in
+        transmission).
+
+        Parameters
+        ----------
+        response : Response or list
+            The processed response for the command that was executed.
+
+        Returns
+        -------
+        error : bool
+            ``True`` if there was an error and ``False`` otherwise.
+
+        """
+        return _command_error(response)
+
+
+class ASCII_RS232(_ASCIIDriver):
     """ ASCII RS232 comm.  driver for a Parker Motion Gemini drive.
 
     Communications driver to talk to a Parker Motion Gemini drive in
-    ASCII mode over RS232.
+    ASCII mode over RS232.
+
+    Parameters
+    ----------
+    port : serial port string or serial port like object
+        The serial port (RS232) that the Gemini drive is connected to.
+        It can also be any URL supported by ``serial.serial_for_url``
+        such as ``'loop://'``, or an already open ``serial.Serial`` or
+        object that acts like one (such as a
+        ``simulator.SimulatedSerial``), in which case `writeTimeout` and
+        `interCharTimeout` are not used and it is left open when the
+        driver is closed.
+    check_echo : bool or 'adaptive', optional
+        Whether the echoing of the commands as they are being written
+        to the drive should be used to correct mistakes in what the
+        drive is seeing or not as the default. ``'adaptive'`` does so
+        till `adaptive_threshold` commands in a row have gone through
+        without any mistakes or errors, after which commands are written
+        and entered in one go with their echo only checked afterwards
+        along with the response (a mistake then shows up as an error,
+        and the command is sent again with checking). As soon as there
+        is a mistake or an error, it goes back to checking the echo as
+        the command is being written.
+    writeTimout : float, optional
+        The write timeout for the RS232 port. See ``serial.Serial``.
+    interCharTimeout : float or None, optional
+        The inter-character timeout for writing on the RS232 port.
+        ``None`` disables. See ``serial.Serial``.
+    bulk_write : bool, optional
+        Whether commands should be written to the drive in bulk (whole
+        command or `chunk_size` characters per write) as opposed to a
+        single character at a time with pauses in between as the
+        default. When echo checking, the echo of each bulk write is
+        checked in one pass and the slower character by character
+        correction is only done if the echo differs.
+    chunk_size : int or None, optional
+        Maximum number of characters to write at once when doing bulk
+        writes. ``None`` means the whole command is written at once.
+    baudrate : int, optional
+        The baud rate to switch the drive and port to after connecting
+        at the drive's default of 9600 (or the baud rate of the port if
+        an already open one was given). The switch is verified with the
+        'TREV' command, and if the verification fails, the drive and
+        port are returned to the rate they connected at (the drive is
+        only told to switch back if it can't be talked to at that rate
+        already).
+    pacing : {'response', 'fixed'}, optional
+        How commands are paced. With ``'response'``, the next command is
+        sent as soon as the response to the previous one has been
+        received (but no sooner than `min_gap` after it). With
+        ``'fixed'``, there is always a fixed pause of `min_gap` between
+        commands.
+    min_gap : float or None, optional
+        Minimum time in seconds between receiving the response to a
+        command and sending the next command. ``None`` means to use the
+        default for the `pacing`, which is 0 for ``'response'`` and
+        0.25 for ``'fixed'``.
+    retry_delay : float, optional
+        Time in seconds to wait before the first retry of a command
+        that had an error, when `retry_policy` isn't given.
+    retry_policy : retry.RetryPolicy or None, optional
+        The policy on retrying commands (backoff between retries, retry
+        budget, and circuit breaker) used when ``send_command`` and
+        friends aren't given one. ``None`` means a
+        ``retry.RetryPolicy`` with defaults apart from starting the
+        backoff at `retry_delay`.
+    background_reader : bool, optional
+        Whether to continuously read the port from a background thread
+        instead of only while waiting for a command's echo or response.
+        Responses are then already in memory when they are waited for,
+        and output from the drive outside of a command's response (such
+        as that of a running program) is kept and can be gotten with
+        ``read_unsolicited`` instead of being thrown away.
+    buffer_size : int, optional
+        Size in bytes of the ring buffers used by the background reader.
+        The oldest bytes are dropped when they fill up.
+    restore_on_close : bool, optional
+        Whether to return the drive's communications settings to their
+        defaults when closing or not. Not doing so makes closing faster,
+        but leaves the drive in the settings used by this driver.
+    instrument : bool, optional
+        Whether to keep statistics on the commands sent (latency
+        histograms and counters), which can be gotten with ``stats``.
+        Costs next to nothing when disabled.
+    taps : iterable of taps.Tap or None, optional
+        Taps to give every write, read, and framed response to,
+        starting with connecting. More can be added with ``add_tap``.
+    adaptive_threshold : int, optional
+        The number of commands in a row without any mistakes in their
+        echo or errors after which adaptive echo checking stops
+        checking the echo before entering each command.
+    keep_raw : bool, optional
+        Whether to keep the full response from the drive in each
+        ``Response`` (its ``raw``) after it has been processed or not.
+        Not keeping it saves memory when doing many commands.
+    lock : lock or None, optional
+        Lock held while talking to the drive, which can be shared with
+        other things that need to talk to the drive without being
+        interrupted. ``None`` means to make a ``threading.RLock``. Is
+        stored in the attribute ``lock``.
+
+    Attributes
+    ----------
+    baudrate : int
+    closed : bool
+    lock : lock
+        Lock held while talking to the drive.
+    retry_policy : retry.RetryPolicy
+    timeout_estimator : utilities.TimeoutEstimator
+
+    Raises
+    ------
+    serial.SerialException
+        If `port` does not correspond to an available RS232 port or
+        can't be opened, or the drive can't be talked to at either
+        `baudrate` or the rate it connected at.
+    ValueError
+        If `pacing` or `check_echo` is not one of the allowed values.
+
+    Notes
+    -----
+    The ASCII communications settings of the Gemini drive are changed
+    while this object is connected and are returned to the default
+    values when this object is closed (unless `restore_on_close` is
+    ``False``). Thus, the values of the communications settings before
+    this object is created are lost. This includes the baud rate, which
+    is returned to the rate it connected at (9600 unless an already
+    open port was given).
+
+    Each communications settings command is confirmed by waiting for
+    the drive to respond to it, and then a 'TREV' query is used to
+    confirm the drive has processed all of them, rather than waiting a
+    fixed amount of time.
+
+    The round trip time of every command (from entering it till its
+    whole response arrived) is measured and kept track of for each
+    command name (keyword) by a ``utilities.TimeoutEstimator``
+    (``timeout_estimator``), which is what the timeouts are taken from
+    when ``send_command`` and friends are given a `timeout` of
+    ``'auto'``.
+
+    The driver should be closed with ``close`` when done with, or used
+    as a context manager which does that. It is closed when deleted as
+    a last resort.
+
+    The driver can be used from several threads (such as with a
+    ``status.StatusMonitor``) as ``lock`` is held for each command
+    including its retries, and for the whole sequence in
+    ``send_commands``. It is only held for each command in
+    ``iter_commands``, so other threads can get commands in between.
+
+    See Also
+    --------
+    serial.Serial
+    serial.serial_for_url
+
+    Examples
+    --------
+
+    Energizing the motor.
+
+    >>> from GeminiMotorDrive.drivers import ASCII_RS232
+    >>> with ASCII_RS232('/dev/ttyS1') as ar:
+    ...     ar.send_command('DRIVE1')
+    Response('DRIVE1', 'DRIVE1\\r\\r\\n', 'DRIVE1', None, [])
+
+    """
+    def __init__(self, port, check_echo=True, writeTimeout=1.0,
+                 interCharTimeout=0.002, bulk_write=False,
+                 chunk_size=None, baudrate=_DEFAULT_BAUDRATE,
+                 pacing='response', min_gap=None, retry_delay=0.25,
+                 background_reader=False, buffer_size=4096,
+                 restore_on_close=True, instrument=False, taps=None,
+                 keep_raw=True, adaptive_threshold=_ADAPTIVE_THRESHOLD,
+                 retry_policy=None, lock=None):
+        # The driver counts as closed till the port is open so that
+        # __del__ does nothing if opening it fails.
+        self._closed = True
+        if lock is None:
+            lock = threading.RLock()
+        self.lock = lock
+
+        # Adaptive echo checking is echo checking that gets skipped once
+        # the number of clean commands in a row reaches the threshold.
+        if isinstance(check_echo, str):
+            if check_echo != 'adaptive':
+                raise ValueError("check_echo must be a bool or "
+                                 "'adaptive'.")
+            self._adaptive = True
+            check_echo = True
+        else:
+            self._adaptive = False
+        self._adaptive_threshold = adaptive_threshold
+        self._clean_commands = 0
+        self._echo_clean = True
+        self._echo_done = True
+        _ASCIIDriver.__init__(self, check_echo, bulk_write, chunk_size,
+                              pacing, min_gap, retry_delay, keep_raw)
+        self._reader = None
+        self._restore_on_close = restore_on_close
+        self._timeout_estimator = TimeoutEstimator()
+        if retry_policy is None:
+            retry_policy = RetryPolicy(delay=retry_delay)
+        self._retry_policy = retry_policy
+
+        # The statistics are only kept if instrumenting, and are
+        # otherwise None so that each place they would be updated costs
+        # a single check.
+        if instrument:
+            self._stats = DriverStats()
+        else:
+            self._stats = None
+
+        # The taps are kept in a tuple that is replaced rather than
+        # changed, so that it can be gone through without a lock and
+        # checking for there being none costs a single check.
+        if taps is None:
+            self._taps = ()
+        else:
+            self._taps = tuple(taps)
+
+        # Initialize the serial port to connect to the Gemini drive
+        # unless an already open one was given. The only timeout being
+        # explicitly set right now is the write timeout. Read timeouts
+        # are set before each read from the time remaining till the
+        # deadline. A port that was given belongs to the caller, and so
+        # isn't closed when the driver is.
+        if hasattr(port, 'read') and hasattr(port, 'write'):
+            self._ser = port
+            self._ser.timeout = None
+            self._owns_port = False
+        else:
+            self._owns_port = True
+            self._ser = serial.serial_for_url(port,
+                                  baudrate=_DEFAULT_BAUDRATE,
+                                  bytesize=serial.EIGHTBITS,
+                                  parity=serial.PARITY_NONE,
+                                  stopbits=serial.STOPBITS_ONE,
+                                  timeout=None,
+                                  writeTimeout=writeTimeout,
+                                  interCharTimeout=interCharTimeout,
+                                  xonxoff=True, rtscts=False,
+                                  dsrdtr=False)
+        self._closed = False
+
+        # The drive is taken to be at the port's baud rate (the drive's
+        # default unless an already open port was given), which it is
+        # returned to when closing.
+        self._line_baudrate = self._ser.baudrate
+        self._char_time = 10.0 / self._line_baudrate
+
+        # Start the background reader if one is being used, in which
+        # case the reader thread owns the port's read timeout.
+        if background_reader:
+            self._reader = _BackgroundReader(self._ser, buffer_size)
+            self._reader.taps = self._taps
+            self._reader.start()
+
+        # Change the communications parameters to the ones used while
+        # connected. The echo command is the one command that echo
+        # checking cannot be done on since echo may not be enabled yet.
+        self._set_comms_settings(_COMMS_SETTINGS, check_first_echo=False)
+
+        # Switch to the requested baud rate if it isn't the one already
+        # being used, falling back to that one if the drive can't be
+        # talked to at the new rate. If it can't be talked to at either,
+        # the driver is useless.
+        if baudrate != self._line_baudrate \
+                and not self._change_baudrate(baudrate) \
+                and not self._restore_baudrate(baudrate):
+            self._closed = True
+            if self._reader is not None:
+                self._reader.stop()
+            if self._owns_port:
+                self._ser.close()
+            raise serial.SerialException('Could not talk to the drive '
+                                         'at ' + str(baudrate) + ' or '
+                                         + str(self._line_baudrate)
+                                         + ' baud.')
+
+    def __del__(self):
+        """ Closes the driver if it hasn't been already.
+        """
+        self.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def closed(self):
+        """ Whether the driver has been closed.
+
+        ``bool``
+
+        Can't be set.
+
+        """
+        return self._closed
+
+    def close(self):
+        """ Closes the driver.
+
+        Returns the drive's communications settings to their defaults
+        (unless `restore_on_close` was ``False``), which includes the
+        baud rate, and then closes the port. If the connection has been
+        lost, the settings can't be restored but the port is still
+        closed. Does nothing if the driver is already closed.
+
+        """
+        if self._closed:
+            return
+        with self.lock:
+            self._close()
+
+    def _close(self):
+        """ Does the work of ``close`` while holding the lock.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            if self._restore_on_close:
+                # Return all communications parameters to their default
+                # values (from the manual).
+                self._set_comms_settings(_DEFAULT_COMMS_SETTINGS)
+                # Return the baud rate to the default last so that the
+                # other commands get sent at the faster rate.
+                if self._ser.baudrate != self._line_baudrate:
+                    self._change_baudrate(self._line_baudrate,
+                                          verify=False)
+        except serial.SerialException:
+            # The connection is gone (a terminal server dropped it or
+            # the port went away), so there is nothing left to restore.
+            pass
+        finally:
+            # Stop the background reader and close the port if it is
+            # ours.
+            if self._reader is not None:
+                self._reader.stop()
+            if self._owns_port:
+                self._ser.close()
+
+    def _set_comms_settings(self, commands, check_first_echo=True):
+        """ Sets communications settings and confirms they took.
+
+        Sends each command and waits for the drive to respond to it
+        before sending the next, so that the response to one doesn't get
+        mixed up with the echo of the next. Then confirms that the drive
+        has processed all of them with ``_sync``. All the responses are
+        discarded.
+
+        Parameters
+        ----------
+        commands : iterable of str
+            The communications settings commands, which are sent as
+            immediate commands.
+        check_first_echo : bool, optional
+            Whether the first command can be echo checked or not, which
+            it can't be if it is the one turning echo on.
+
+        Returns
+        -------
+        confirmed : bool
+            Whether the drive confirmed processing the commands.
+
+        """
+        for i, command in enumerate(commands):
+            if i == 0 and not check_first_echo:
+                check_echo = False
+            else:
+                check_echo = None
+            self._send_command(command, immediate=True,
+                               check_echo=check_echo)
+            self._wait_quiet(_get_deadline(_CONFIRM_TIMEOUT))
+        # Wait for the rest of the answer to the sync query to arrive
+        # and discard it so it can't get mixed up with the next echo.
+        confirmed = self._sync()
+        self._wait_quiet(_get_deadline(_QUIET_TIME))
+        return confirmed
+
+    def _wait_quiet(self, deadline):
+        """ Discards a response whose end isn't known.
+
+        Waits for the drive to start sending something (or `deadline`
+        to pass) and then discards everything it sends till no more has
+        arrived for ``_QUIET_TIME``.
+
+        Parameters
+        ----------
+        deadline : float or None
+            Time on the ``time.monotonic`` clock to give up waiting for
+            the drive to start sending at.
+
+        """
+        quiet = max(_QUIET_TIME, 5*self._char_time)
+        data = self._read_chunk(deadline)
+        while len(data) != 0:
+            data = self._read_chunk(_get_deadline(quiet))
+
+    def _sync(self, timeout=_SYNC_TIMEOUT):
+        """ Confirms the drive has processed everything sent so far.
+
+        Sends the 'TREV' query and waits for its answer. The drive
+        processes commands in order, so once the answer arrives every
+        command sent before it has been processed. The answer is
+        recognized by its line ending, whatever the response
+        terminators are set to.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Time in seconds to wait for the answer.
+
+        Returns
+        -------
+        synced : bool
+            Whether the answer arrived.
+
+        """
+        deadline = _get_deadline(timeout)
+        self._send_command('TREV', immediate=True, deadline=deadline)
+        buf = bytearray()
+        start = -1
+        while True:
+            chunk = self._read_chunk(deadline)
+            if len(chunk) == 0:
+                return False
+            buf += chunk
+            if start == -1:
+                start = buf.find(b'*TREV-G')
+            if start != -1 and (buf.find(b'\r', start) != -1
+                                or buf.find(b'\n', start) != -1):
+                return True
+
+    @property
+    def baudrate(self):
+        """ The baud rate being used to talk to the drive.
+
+        ``int``
+
+        Can't be set.
+
+        """
+        return self._ser.baudrate
+
+    def _change_baudrate(self, baudrate, verify=True):
+        """ Changes the baud rate of the drive and the port.
+
+        Tells the drive to change to `baudrate`, switches the port to
+        it, and then optionally verifies that the drive can be talked to
+        at the new rate with the 'TREV' command.
+
+        Parameters
+        ----------
+        baudrate : int
+            The baud rate to change to.
+        verify : bool, optional
+            Whether to verify the drive can be talked to at the new rate
+            or not.
+
+        Returns
+        -------
+        success : bool
+            Whether the drive could be talked to at the new rate or not.
+            Always ``True`` if not verifying.
+
+        Notes
+        -----
+        The command sent to the drive is '!BAUDn'.
+
+        """
+        # Send the command without echo checking (the echo of the end of
+        # the command may come back at the new rate) and wait for it to
+        # be transmitted and processed.
+        self._send_command('BAUD' + str(int(baudrate)), immediate=True,
+                           check_echo=False)
+        self._ser.flush()
+        time.sleep(_BAUDRATE_SETTLE_TIME)
+
+        # Switch the port to the new rate and verify it.
+        self._set_port_baudrate(baudrate)
+        if not verify:
+            return True
+        return self._verify_baudrate()
+
+    def _restore_baudrate(self, failed):
+        """ Returns to the line baud rate after failing to change it.
+
+        The drive may have not switched to the `failed` rate at all, so
+        the port is switched back to the line baud rate first and the
+        drive is only told to switch back (at the `failed` rate) if it
+        can't be talked to there.
+
+        Parameters
+        ----------
+        failed : int
+            The baud rate that couldn't be changed to.
+
+        Returns
+        -------
+        success : bool
+            Whether the drive could be talked to at the line baud rate.
+
+        """
+        self._set_port_baudrate(self._line_baudrate)
+        if self._verify_baudrate():
+            return True
+        self._set_port_baudrate(failed)
+        return self._change_baudrate(self._line_baudrate)
+
+    def _set_port_baudrate(self, baudrate):
+        """ Switches the port to a baud rate.
+
+        Also updates the time it takes to transmit a character and
+        discards whatever garbage came in during the switch.
+
+        """
+        self._ser.baudrate = int(baudrate)
+        self._char_time = 10.0 / self._ser.baudrate
+        self._discard()
+        self._retry_policy.reset()
+
+    def _verify_baudrate(self):
+        """ Verifies that the drive can be talked to at the port's rate.
+
+        Returns
+        -------
+        success : bool
+            Whether the drive answered the 'TREV' command.
+
+        """
+        # Send a bare carriage return to flush out anything garbled that
+        # ended up in the drive's command buffer during the switch, and
+        # discard its response. Then ask for the revision and see if it
+        # is a valid response, which should look like
+        # '*TREV-GV6-L3E_D1.50_F1.00'.
+        self._write(b'\r')
+        self._get_response(timeout=_BAUDRATE_SETTLE_TIME)
+        response = self.send_command('TREV', immediate=True,
+                                     timeout=_BAUDRATE_SETTLE_TIME)
+        return (not self.command_error(response)
+                and len(response[4]) > 0
+                and response[4][0].startswith('*TREV-G'))
+
+
+    @property
+    def retry_policy(self):
+        """ The default policy on retrying commands.
+
+        ``retry.RetryPolicy``
+
+        Used when ``send_command`` and friends aren't given one. Can be
+        set.
+
+        """
+        return self._retry_policy
+
+    @retry_policy.setter
+    def retry_policy(self, value):
+        self._retry_policy = value
+
+    @property
+    def timeout_estimator(self):
+        """ The estimator of the response timeouts by command name.
+
+        ``utilities.TimeoutEstimator``
+
+        Used for a `timeout` of ``'auto'``.
+
+        """
+        return self._timeout_estimator
+
+    def stats(self, reset=False):
+        """ Gets a snapshot of the statistics on the commands sent.
+
+        Only available if the driver was made with `instrument` set.
+
+        Parameters
+        ----------
+        reset : bool, optional
+            Whether to reset the statistics after taking the snapshot.
+
+        Returns
+        -------
+        snapshot : dict or None
+            The snapshot (see ``instrumentation.DriverStats.snapshot``)
+            or ``None`` if not instrumenting.
+
+        See Also
+        --------
+        instrumentation.DriverStats
+
+        """
+        if self._stats is None:
+            return None
+        snapshot = self._stats.snapshot()
+        if reset:
+            self._stats.reset()
+        return snapshot
+
+    def add_tap(self, tap):
+        """ Adds a tap.
+
+        Parameters
+        ----------
+        tap : taps.Tap
+            The tap to give every write, read, and framed response to.
+
+        See Also
+        --------
+        taps.Tap
+
+        """
+        self._taps = self._taps + (tap, )
+        if self._reader is not None:
+            self._reader.taps = self._taps
+
+    def remove_tap(self, tap):
+        """ Removes a tap.
+
+        Parameters
+        ----------
+        tap : taps.Tap
+            The tap to remove.
+
+        Raises
+        ------
+        ValueError
+            If `tap` was not added.
+
+        """
+        taps = list(self._taps)
+        taps.remove(tap)
+        self._taps = tuple(taps)
+        if self._reader is not None:
+            self._reader.taps = self._taps
+
+    def _tap_read(self, data):
+        """ Gives data read from the port to the taps.
+        """
+        now = time.monotonic()
+        for tap in self._taps:
+            tap.on_read(now, data)
+
+    def _write(self, data):
+        """ Writes data to the port, timing it if instrumenting.
+
+        Parameters
+        ----------
+        data : bytes
+            The data to write.
+
+        """
+        if self._stats is None:
+            self._ser.write(data)
+        else:
+            start = time.perf_counter()
+            self._ser.write(data)
+            self._stats.write += time.perf_counter() - start
+            self._stats.bytes_out += len(data)
+        if self._taps:
+            now = time.monotonic()
+            for tap in self._taps:
+                tap.on_write(now, data)
+
+    def _send_command(self, command, immediate=False, timeout=1.0,
+                      check_echo=None, bulk_write=None, deadline=None):
+        """ Send a single command to the drive after sanitizing it.
+
+        Takes a single given `command`, sanitizes it (strips out
+        comments, extra whitespace, and newlines), sends the command to
+        the drive, and returns the sanitized command. The validity of
+        the command is **NOT** checked.
+
+        Parameters
+        ----------
+        command : str
+            The command to send to the Gemini drive.
+        immediate : bool, optional
+            Whether to make it so the command is executed immediately or
+            not.
+        timeout : number, optional
+            Optional timeout in seconds to use to get the command right
+            when we are doing echo checking. A negative value or
+            ``None`` indicates that the an infinite timeout should be
+            used.
+        check_echo : bool or None, optional
+            Whether the echoing of the command as it is being written to
+            the drive should be used to correct mistakes in what the
+            drive is seeing, or whether the default set when the
+            instance of this class was created should be used
+            (``None``).
+        bulk_write : bool or None, optional
+            Whether the command should be written in bulk or a character
+            at a time, or whether the default set when the instance of
+            this class was created should be used (``None``).
+        deadline : float or None, optional
+            Optional overall deadline on the ``time.monotonic`` clock
+            to use in addition to `timeout`. ``None`` means no overall
+            deadline.
+
+        Returns
+        -------
+        sanitized_command : str
+            The sanitized command that was sent to the drive.
+
+        """
+        # Use the default echo checking and writing if None was given.
+        if check_echo is None:
+            check_echo = self._check_echo
+        if bulk_write is None:
+            bulk_write = self._bulk_write
+
+        c = self._sanitize_command(command, immediate=immediate)
+
+        # Read out any junk on the serial port before we start.
+        self._discard()
+
+        # The chunks to write the command in when writing in bulk.
+        chunk_size = self._get_chunk_size(c)
+
+        # The command needs to be written a character at a time with
+        # pauses between them to make sure nothing gets lost or
+        # corrupted, unless it is being written in bulk in which case
+        # each chunk is written at once and then we wait for it to be
+        # transmitted (XON/XOFF flow control keeps the drive's buffer
+        # from being overrun). This is a simple loop if we are not
+        # checking the echo. If we are, it is more complicated.
+        if not check_echo:
+            if bulk_write:
+                for i in range(0, len(c), chunk_size):
+                    self._write(c[i:(i+chunk_size)])
+                    self._ser.flush()
+            else:
+                for i in range(0, len(c)):
+                    self._write(bytes([c[i]]))
+                    time.sleep(0.01)
+        else:
+            # The timeout is converted to a deadline on the monotonic
+            # clock, which is combined with the overall deadline. A zero
+            # timeout is treated as infinite here.
+            if timeout is not None and timeout <= 0:
+                timeout = None
+            deadline = _get_deadline(timeout, deadline)
+
+            # The echo is reconciled with the command as it arrives.
+            # Whether it came back clean, without needing any
+            # correction, is kept for adaptive echo checking.
+            echo = EchoReconciler(c)
+            self._echo_clean = True
+
+            # If writing in bulk, each chunk is written in one go and
+            # then its echo is collected and checked in one pass. As
+            # long as the echo matches what was written, we keep going.
+            # As soon as it doesn't, we fall back to the character by
+            # character writing and correction below, which continues
+            # from whatever the echo is at that point.
+            if bulk_write:
+                for i in range(0, len(c), chunk_size):
+                    chunk = c[i:(i+chunk_size)]
+                    self._write(chunk)
+                    self._collect_echo(echo, i + len(chunk),
+                                       len(chunk), deadline)
+                    if not echo.matches(i + len(chunk)):
+                        self._echo_clean = False
+                        break
+
+            # Each character needs to be written one by one while the
+            # echo is collected. If any mistakes occur, they need to be
+            # corrected with backspaces b'\x08'. We go until either the
+            # echo is identical to the command or the timeout is
+            # exceeded.
+            while not echo.done and not _deadline_passed(deadline):
+                # If there are no mistakes, then the next character is
+                # written. Otherwise, there is a mistake and a backspace
+                # is written.
+                b = echo.next_byte()
+                self._write(b)
+                if b == b'\x08':
+                    self._echo_clean = False
+                    if self._stats is not None:
+                        self._stats.backspaces += 1
+
+                # Pause for a bit to make sure nothing gets lost. Then
+                # read the drive's output and add it to the echo.
+                time.sleep(0.01)
+                echo.feed(self._read_chunk(time.monotonic()))
+
+            # Record how long it took to get the echo right, or that it
+            # timed out.
+            self._echo_done = echo.done
+            if self._stats is not None and self._stats.name is not None:
+                if echo.done:
+                    self._stats.echo = (time.perf_counter()
+                                        - self._stats.start)
+                else:
+                    self._stats.timeouts += 1
+
+        # Write the carriage return to enter the command and then return
+        # the sanitized command.
+        self._write(b'\r')
+        if sys.hexversion >= 0x03000000:
+            return c.decode(errors='replace')
+        else:
+            return c
+
+    def _read_chunk(self, deadline=None):
+        """ Reads whatever the drive has sent so far.
+
+        Blocks till at least one byte has arrived from the drive or
+        `deadline` has passed, and then reads everything that is
+        waiting.
+
+        Parameters
+        ----------
+        deadline : float or None, optional
+            Time on the ``time.monotonic`` clock to give up waiting at.
+            ``None`` means to wait forever.
+
+        Returns
+        -------
+        data : bytes
+            The bytes read, which are empty if the deadline passed
+            without anything arriving.
+
+        """
+        # With a background reader, it is just a matter of taking what
+        # it has read.
+        if self._reader is not None:
+            data = self._reader.read_chunk(deadline)
+            if self._stats is not None:
+                self._stats.bytes_in += len(data)
+            return data
+
+        # Set the read timeout to the time remaining before the
+        # deadline, which is zero (non-blocking) if it already passed.
+        # The port is only reconfigured if the timeout changes.
+        if deadline is None:
+            timeout = None
+        else:
+            timeout = max(0.0, deadline - time.monotonic())
+        if timeout == 0.0:
+            data = self._ser.read(self._ser.inWaiting())
+        else:
+            if self._ser.timeout != timeout:
+                self._ser.timeout = timeout
+
+            # Block for the first byte and then grab the rest that are
+            # waiting.
+            data = self._ser.read(1)
+            if len(data) != 0:
+                n = self._ser.inWaiting()
+                if n > 0:
+                    data += self._ser.read(n)
+        if self._stats is not None:
+            self._stats.bytes_in += len(data)
+        if self._taps and len(data) != 0:
+            self._tap_read(data)
+        return data
+
+    def _discard(self):
+        """ Discards everything received from the drive so far.
+
+        With a background reader, it is kept as unsolicited data
+        instead.
+
+        """
+        if self._reader is not None:
+            self._reader.discard()
+        else:
+            data = self._ser.read(self._ser.inWaiting())
+            if self._taps and len(data) != 0:
+                self._tap_read(data)
+
+    def read_unsolicited(self):
+        """ Gets the output from the drive that wasn't a response.
+
+        Gets everything the drive sent outside of the echoes of and
+        responses to commands since the last call, such as the output of
+        a running program. This is only kept when using the background
+        reader.
+
+        Returns
+        -------
+        output : str
+            The unsolicited output. Carriage returns and linefeeds are
+            preserved. Always empty if not using the background reader.
+        dropped : int
+            The number of bytes that were dropped since the last call
+            because the ring buffers filled up.
+
+        """
+        if self._reader is None:
+            return '', 0
+        data, dropped = self._reader.read_unsolicited()
+        return data.decode(errors='replace'), dropped
+
+    def _collect_echo(self, echo, length, n, deadline=None):
+        """ Collects the echo of characters written in bulk.
+
+        Reads the echo of `n` characters that were just written to the
+        drive in one go and feeds it to `echo` until it is `length`
+        long, the echo stops arriving, or the
+        `deadline` passes.
+
+        Parameters
+        ----------
+        echo : EchoReconciler
+            The reconciler of the echo collected so far.
+        length : int
+            The length the echo should be once all the characters
+            written have been echoed.
+        n : int
+            The number of characters that were just written.
+        deadline : float or None, optional
+            Deadline on the ``time.monotonic`` clock, or ``None`` for no
+            deadline.
+
+        """
+        # The echo should arrive within roughly twice the time it takes
+        # to transmit the characters there and back plus a little slack
+        # for the drive to process them. If it isn't all there by then,
+        # something went wrong and there is no point waiting longer.
+        window = _get_deadline(2*n*self._char_time + 0.02, deadline)
+        while len(echo) < length:
+            data = self._read_chunk(window)
+            if len(data) == 0:
+                break
+            echo.feed(data)
+
+    def _get_response(self, timeout=1.0, eor=('\n', '\n- '),
+                      deadline=None, idle=False):
+        """ Reads a response from the drive.
+
+        Reads the response returned by the drive with an optional
+        timeout. All carriage returns and linefeeds are kept.
+
+        Parameters
+        ----------
+        timeout : number, optional
+            Optional timeout in seconds to use when reading the
+            response. A negative value or ``None`` indicates that the
+            an infinite timeout should be used.
+        eor : str or iterable of str, optional
+            ``str`` or iterable of ``str`` that denote the allowed
+            End Of Response. For most commands, it should be
+            ``('\\n', '\\n- ')``, but for running a program, it should
+            be ``'*END\\n'``. The default is ``('\\n', '\\n- ')``.
+        deadline : float or None, optional
+            Optional overall deadline on the ``time.monotonic`` clock
+            to use in addition to `timeout`. ``None`` means no overall
+            deadline.
+        idle : bool, optional
+            Whether `timeout` is restarted whenever more of the response
+            arrives, making it a timeout on the drive going quiet
+            rather than on the whole response.
+
+        Returns
+        -------
+        response : str
+            The response obtained from the drive. Carriage returns and
+            linefeeds are preserved.
+
+        """
+        # Convert the timeout to a deadline on the monotonic clock and
+        # combine it with the overall deadline, which is kept for
+        # restarting the timeout if it is an idle one.
+        overall = deadline
+        deadline = _get_deadline(timeout, overall)
+
+        # eor needs to be converted to bytes. If it is just an str, it
+        # needs to be wrapped in a tuple.
+        if isinstance(eor, str):
+            eor = tuple([eor])
+        if sys.hexversion >= 0x03000000:
+            eor = [s.encode(encoding='ASCII') for s in eor]
+        scanner = _EORScanner(eor)
+
+        # With a background reader, it frames the response as the data
+        # arrives and wakes us up when it is all there.
+        #
+        # Otherwise, read from the serial port into buf until the EOR is
+        # found or the deadline has passed. Each read blocks till at
+        # least one byte arrives (or the deadline passes), so there is
+        # no polling, and only the newly arrived bytes are scanned for
+        # the EOR.
+        #
+        # When instrumenting, the time till the first byte arrives is
+        # recorded (only possible without a background reader) and so
+        # is not finding the EOR in time.
+        if self._reader is not None:
+            if idle:
+                buf = self._reader.read_response(scanner, deadline,
+                                                 timeout, overall)
+            else:
+                buf = self._reader.read_response(scanner, deadline)
+            if self._stats is not None:
+                self._stats.bytes_in += len(buf)
+                if not any([buf.endswith(s) for s in eor]):
+                    self._stats.timeouts += 1
+        else:
+            if self._stats is not None:
+                start = time.perf_counter()
+            buf = bytearray()
+            end = -1
+            while end == -1:
+                chunk = self._read_chunk(deadline)
+                if len(chunk) == 0:
+                    break
+                if self._stats is not None and len(buf) == 0 \
+                        and self._stats.name is not None:
+                    self._stats.first_byte = time.perf_counter() - start
+                buf += chunk
+                end = scanner.scan(buf)
+                if idle:
+                    deadline = _get_deadline(timeout, overall)
+
+            # Remove anything after the EOR if there is one.
+            if end != -1:
+                del buf[end:]
+            elif self._stats is not None:
+                self._stats.timeouts += 1
+
+        if self._taps:
+            now = time.monotonic()
+            for tap in self._taps:
+                tap.on_response(now, bytes(buf))
+
+        # Convert to an str before returning.
+        if sys.hexversion >= 0x03000000:
+            return buf.decode(errors='replace')
+        else:
+            return bytes(buf)
+
+    def send_command(self, command, immediate=False, timeout=1.0,
+                     max_retries=0, eor=('\n', '\n- '), deadline=None,
+                     retry_policy=None, check_echo=None):
+        """ Sends a single command to the drive and returns output.
+
+        Takes a single given `command`, sanitizes it, sends it to the
+        drive, reads the response, and returns the processed response.
+        The command is first sanitized by removing comments, extra
+        whitespace, and newline characters. If `immediate` is set, the
+        command is made to be an immediate command. Note, the command is
+        **NOT** checked for validity. If the drive returns an error, the
+        command is re-executed up to `max_tries` more times, but never
+        past `deadline` and only as far as `retry_policy` allows. The
+        response from the final execution is processed and returned. The
+        response from the drive is broken down into the echoed command
+        (drive echoes it back), any error returned by the drive (leading
+        '*' is stripped), and the different lines of the response; which
+        are all returned.
+
+        Parameters
+        ----------
+        command : str
+            The command to send to the Gemini drive.
+        immediate : bool, optional
+            Whether to make it so the command is executed immediately or
+            not.
+        timeout : float, None, or 'auto', optional
+            Optional timeout in seconds to use when reading the
+            response. A negative value or ``None`` indicates that the
+            an infinite timeout should be used. ``'auto'`` takes it from
+            the round trip times measured so far for the command name
+            (see ``timeout_estimator``) and restarts it whenever more of
+            the response arrives.
+        max_retries : int, optional
+            Maximum number of retries to do per command in the case of
+            errors.
+        eor : str or iterable of str, optional
+            ``str`` or an iterable of ``str`` that denote the allowed
+            End Of Response. For most commands, it should be
+            ``('\\n', '\\n- ')``, but for running a program, it should
+            be ``'*END\\n'``. The default is ``('\\n', '\\n- ')``.
+        deadline : float or None, optional
+            Optional overall deadline on the ``time.monotonic`` clock
+            for the command including all retries. Once it passes, no
+            more attempts are made and the response to the last attempt
+            is returned. If it has already passed, the command is not
+            sent at all and the response is empty (an error). ``None``
+            means no overall deadline.
+        retry_policy : retry.RetryPolicy or None, optional
+            The policy on retrying the command, which sets the backoff
+            between retries, can further limit the retries and the
+            overall time, and makes the command fail without being sent
+            (empty response) if the drive hasn't been responding.
+            ``None`` means to use ``retry_policy``.
+        check_echo : bool or None, optional
+            Whether to check the echo while writing the command (see
+            the class), overriding the driver's echo checking for this
+            call. ``False`` writes and enters the command in one go,
+            with its echo only checked afterwards along with the
+            response (a mistake then shows up as an error and the
+            command is retried). ``None`` means the driver's echo
+            checking.
+
+        Returns
+        -------
+        output : Response
+            The processed response, which has the sanitized command
+            (``command``), the full response (``raw``, ``None`` if not
+            kept), the echoed command (``echo``), any error response
+            (``error``, ``None`` if none), the lines of the response
+            that are not the echo or error line (``lines``, with
+            newlines stripped), and whether there was an error
+            (``ok``). It can also be indexed like the 5-element
+            ``list`` of them (in that order) that was used before.
+
+        See Also
+        --------
+        send_commands : Send multiple commands.
+
+        Examples
+        --------
+
+        Simple command energizing the motor with no response and no
+        errors.
+
+        >>> from GeminiMotorDrive.drivers import ASCII_RS232
+        >>> ar = ASCII_RS232('/dev/ttyS1')
+        >>> ar.send_command('DRIVE1', immediate=False, timeout=1.0)
+        Response('DRIVE1', 'DRIVE1\\r\\r\\n', 'DRIVE1', None, [])
+
+        Same command but made immediate.
+
+        >>> from GeminiMotorDrive.drivers import ASCII_RS232
+        >>> ar = ASCII_RS232('/dev/ttyS1')
+        >>> ar.send_command('DRIVE1', immediate=True, timeout=1.0)
+        Response('!DRIVE1', '!DRIVE1\\r\\r\\n', '!DRIVE1', None, [])
+
+        Same command with a typo.
+
+        >>> from GeminiMotorDrive.drivers import ASCII_RS232
+        >>> ar = ASCII_RS232('/dev/ttyS1')
+        >>> ar.send_command('DRIV1', immediate=False, timeout=1.0)
+        Response('DRIV1', 'DRIV1\\r*UNDEFINED_LABEL\\r\\r\\n', 'DRIV1',
+         'UNDEFINED_LABEL', [])
+
+        Simple command asking whether the motor is energized or not.
+
+        >>> from GeminiMotorDrive.drivers import ASCII_RS232
+        >>> ar = ASCII_RS232('/dev/ttyS1')
+        >>> ar.send_command('DRIVE', immediate=False, timeout=1.0)
+        Response('DRIVE', 'DRIVE\\r*DRIVE1\\r\\r\\n', 'DRIVE', None,
+         ['*DRIVE1'])
+
+        """
+        if retry_policy is None:
+            retry_policy = self._retry_policy
+        with self.lock:
+            return self._execute(command, immediate, timeout,
+                                 max_retries, eor,
+                                 retry_policy.get_deadline(deadline),
+                                 retry_policy, retry_policy.new_budget(),
+                                 check_echo)
+
+    def _execute(self, command, immediate, timeout, max_retries, eor,
+                 deadline, policy, budget, check_echo=None):
+        """ Executes a command with retries.
+
+        Does the work of ``send_command`` with the retries taken from
+        `budget` and waited between, and the attempts allowed, according
+        to `policy`. `check_echo` overrides the echo checking if it
+        isn't ``None``.
+
+        """
+        # Execute the command till it either doesn't have an error, the
+        # maximum number of retries is exceeded, the retry budget runs
+        # out, the deadline passes, or the circuit breaker stops sending
+        # to a drive that isn't responding. The drive is given a growing
+        # amount of breathing time between retries. Whether the drive
+        # responded to each attempt in time is recorded for the circuit
+        # breaker. When instrumenting, each attempt is timed from when it
+        # starts being sent till its whole response has arrived.
+        #
+        # The time from entering the command till its whole response
+        # arrived is fed to the timeout estimator for the command name,
+        # and a response not arriving in time backs off its timeout.
+        # With an automatic timeout, each attempt's timeout is taken
+        # from the estimator and is an idle one (restarted whenever
+        # more of the response arrives) so that a long response, such
+        # as a program being dumped, isn't cut off by a timeout learned
+        # from shorter ones. The time taken to get the echo right when
+        # checking it is estimated the same way (under the command name
+        # and 'echo'), and is what the echo's timeout is taken from.
+        name = command_name(command.lstrip())
+        echo_key = (name, 'echo')
+        if isinstance(eor, str):
+            eors = (eor, )
+        else:
+            eors = tuple(eor)
+        response = None
+        attempts = max_retries + 1
+        i = 0
+        while i < attempts:
+            if i > 0:
+                if not budget.take():
+                    break
+                _sleep(policy.backoff(i), deadline)
+            if _deadline_passed(deadline) or not policy.allow():
+                break
+            # Make sure the minimum gap since the last response has
+            # passed.
+            _sleep(self._get_pacing_delay(), deadline)
+            if self._stats is not None:
+                if i > 0:
+                    self._stats.retries += 1
+                self._stats.begin(command.lstrip(), time.perf_counter())
+            # With adaptive echo checking, the echo isn't checked while
+            # writing the command once enough commands in a row have
+            # been clean. The command is then written and entered in one
+            # go, and the echo comes back as part of the response and
+            # is checked along with it. The same is done if echo
+            # checking was turned off for this call, and adaptive echo
+            # checking is left out of it if it was set either way.
+            if check_echo is None:
+                checking = self._check_echo and (
+                    not self._adaptive
+                    or self._clean_commands < self._adaptive_threshold)
+                fast = self._adaptive and not checking
+            else:
+                checking = bool(check_echo)
+                fast = not checking
+            if timeout == 'auto':
+                echo_timeout = self._timeout_estimator.timeout(echo_key)
+                attempt_timeout = self._timeout_estimator.timeout(name)
+            else:
+                echo_timeout = 1.0
+                attempt_timeout = timeout
+            # Send the command, getting the sanitized version. Then get
+            # the response and process it. A probe of a half-open
+            # circuit that doesn't get to finish (the deadline passes or
+            # there is an exception) counts as the drive not responding,
+            # since otherwise the circuit would stay half-open and not
+            # let any more commands through.
+            probing = policy.state == HALF_OPEN
+            recorded = False
+            started = time.monotonic()
+            try:
+                if not fast:
+                    c = self._send_command(command, immediate=immediate,
+                                           timeout=echo_timeout,
+                                           check_echo=checking,
+                                           deadline=deadline)
+                else:
+                    c = self._send_command(command, immediate=immediate,
+                                           check_echo=False, bulk_write=True,
+                                           deadline=deadline)
+                entered = time.monotonic()
+                if checking:
+                    if self._echo_done:
+                        self._timeout_estimator.observe(echo_key,
+                                                        entered - started)
+                    elif not _deadline_passed(deadline):
+                        self._timeout_estimator.backoff(echo_key)
+                output = self._get_response(timeout=attempt_timeout,
+                                            eor=eors, deadline=deadline,
+                                            idle=(timeout == 'auto'))
+                self._last_response_time = time.monotonic()
+                if self._stats is not None:
+                    self._stats.end(time.perf_counter())
+                if output.endswith(eors):
+                    self._timeout_estimator.observe(
+                        name, self._last_response_time - entered)
+                    policy.record(True)
+                    recorded = True
+                elif not _deadline_passed(deadline):
+                    self._timeout_estimator.backoff(name)
+                    policy.record(False)
+                    recorded = True
+            finally:
+                if probing and not recorded:
+                    policy.record(False)
+            # If echo checking was done, the echo was already grabbed,
+            # is identical to the command, and needs to be placed back
+            # in front of the output so that it can be processed
+            # properly.
+            if checking:
+                output = c + output
+            response = self._make_response(c, output)
+            # Count the clean commands in a row for adaptive echo
+            # checking, starting over on any mistake or error.
+            # A garbled echo when it wasn't being checked is a mistake
+            # that checking it would have corrected, so the command gets
+            # an extra attempt (with checking) for it.
+            if self._adaptive and check_echo is None:
+                if response.ok and (self._echo_clean or not checking):
+                    self._clean_commands += 1
+                else:
+                    self._clean_commands = 0
+                    if not checking and response.echo != c:
+                        attempts += 1
+            # We are done if there is no error.
+            if response.ok:
+                break
+            i += 1
+
+        # If the deadline had passed before the command could be sent
+        # even once, the response is an empty one.
+        if response is None:
+            response = self._empty_response(command,
+                                            immediate=immediate)
+        return response
+
+    def iter_commands(self, commands, timeout=1.0, max_retries=1,
+                      eor=('\n', '\n- '), deadline=None,
+                      retry_policy=None, check_echo=None):
+        """ Send a sequence of commands, yielding each output as it comes.
+
+        Streaming version of ``send_commands``. It is a generator that
+        takes the commands from `commands` (which can itself be a
+        generator) one at a time as they are needed, sends each one with
+        ``send_command``, and yields its processed response as soon as
+        it is done. It stops after the first command that still has an
+        error once its retries are exhausted (that response is yielded
+        first) or once `deadline` has passed. The retries of all the
+        commands come out of a single retry budget. Nothing is kept
+        between commands, so memory use doesn't depend on how many there
+        are, and the caller can stop at any point by no longer
+        iterating.
+
+        Parameters
+        ----------
+        commands : iterable of str
+            Iterable of commands to send to the drive. Each command must
+            be an ``str``.
+        timeout : float, None, or 'auto', optional
+            Optional timeout in seconds to use when reading the
+            response. A negative value or ``None`` indicates that the
+            an infinite timeout should be used. ``'auto'`` takes it from
+            the round trip times measured so far for the command name
+            (see ``timeout_estimator``) and restarts it whenever more of
+            the response arrives.
+        max_retries : int, optional
+            Maximum number of retries to do per command in the case of
+            errors.
+        eor : str, iterable of str, or list, optional
+            End Of Response. Either a single EOR (a ``str`` or an
+            iterable of ``str``), which is used for every command, or a
+            ``list`` of EOR with one for each command. See
+            ``send_commands``.
+        deadline : float or None, optional
+            Optional overall deadline on the ``time.monotonic`` clock
+            for the whole sequence including all retries. Once it
+            passes, the command that would be sent next gets an empty
+            response (an error) and no more commands are sent. ``None``
+            means no overall deadline.
+        retry_policy : retry.RetryPolicy or None, optional
+            The policy on retrying the commands. Its retry budget and
+            maximum elapsed time are for the whole sequence. ``None``
+            means to use ``retry_policy``. See ``send_command``.
+        check_echo : bool or None, optional
+            Whether to check the echo while writing each command,
+            overriding the driver's echo checking for this call.
+            ``None`` means the driver's echo checking. See
+            ``send_command``.
+
+        Yields
+        ------
+        output : Response
+            The processed response of each command done. See
+            ``send_command``.
+
+        Raises
+        ------
+        ValueError
+            If `eor` is a ``list`` with fewer EOR than there are
+            commands, which is raised when the first command without
+            one is reached.
+
+        See Also
+        --------
+        send_commands : Send multiple commands, collecting the outputs.
+
+        Examples
+        --------
+
+        Upload a long sequence of commands from a file, printing the
+        progress.
+
+        >>> from GeminiMotorDrive.drivers import ASCII_RS232
+        >>> ar = ASCII_RS232('/dev/ttyS1')
+        >>> with open('commands.txt') as f:
+        ...     for i, rsp in enumerate(ar.iter_commands(f)):
+        ...         if not rsp.ok:
+        ...             print('Failed at', i, rsp.command)
+        ...         elif i % 100 == 0:
+        ...             print(i, 'done')
+
+        """
+        # A single EOR is used for every command, and a list of them is
+        # gone through along with the commands.
+        if isinstance(eor, list):
+            eors = iter(eor)
+        else:
+            eors = None
+
+        # The retry budget and the maximum elapsed time of the retry
+        # policy cover the whole sequence, and so are set up when the
+        # first command is needed.
+        if retry_policy is None:
+            retry_policy = self._retry_policy
+        deadline = retry_policy.get_deadline(deadline)
+        budget = retry_policy.new_budget()
+
+        # Do every command one by one, yielding the response. Commands
+        # that failed are retried, and we stop if the last retry is
+        # exhausted. A command that could not be sent because the
+        # deadline passed or the circuit breaker is open has an error,
+        # so we stop then too.
+        for command in commands:
+            if eors is None:
+                e = eor
+            else:
+                e = next(eors, None)
+                if e is None:
+                    raise ValueError('eor is a list with fewer EOR than '
+                                     'there are commands.')
+            with self.lock:
+                rsp = self._execute(command, False, timeout, max_retries,
+                                    e, deadline, retry_policy, budget,
+                                    check_echo)
+            yield rsp
+            if self.command_error(rsp):
+                return
+
+    def send_commands(self, commands, timeout=1.0,
+                      max_retries=1, eor=('\n', '\n- '), deadline=None,
+                      retry_policy=None, check_echo=None):
+        """ Send a sequence of commands to the drive and collect output.
+
+        Takes a sequence of many commands and executes them one by one
+        till either all are executed, one runs out of retries
+        (`max_retries` or the retry budget of `retry_policy`), or
+        `deadline` passes. Retries are optionally performed if a
+        command's response indicates that there was an error. Once a
+        command runs out of retries, the remaining commands are not
+        executed. The processed output of the final execution (last try
+        or retry) of each command that was actually executed is
+        returned.
+
+        This function basically feeds commands one by one to
+        ``send_command`` (through ``iter_commands``) and collates the
+        outputs. How quickly one command follows another is set by the
+        pacing given when the instance of this class was created.
+
+        Parameters
+        ----------
+        commands : iterable of str
+            Iterable of commands to send to the drive. Each command must
+            be an ``str``.
+        timeout : float, None, or 'auto', optional
+            Optional timeout in seconds to use when reading the
+            response. A negative value or ``None`` indicates that the
+            an infinite timeout should be used. ``'auto'`` takes it from
+            the round trip times measured so far for the command name
+            (see ``timeout_estimator``) and restarts it whenever more of
+            the response arrives.
+        max_retries : int, optional
+            Maximum number of retries to do per command in the case of
+            errors.
+        eor : str or iterable of str, optional
+            End Of Response. An EOR is either a ``str`` or an iterable
+            of ``str`` that denote the possible endings of a response.
+            'eor' can be a single EOR, in which case it is used for all
+            commands, or it can be an iterable of EOR to use for each
+            individual command. For most commands, it should be
+            ``('\\n', '\\n- ')``, but for running a program, it should
+            be ``'*END\\n'``. The default is ``('\\n', '\\n- ')``.
+        deadline : float or None, optional
+            Optional overall deadline on the ``time.monotonic`` clock
+            for the whole sequence including all retries. Once it
+            passes, the command that would be sent next gets an empty
+            response (an error) and no more commands are sent. ``None``
+            means no overall deadline.
+        retry_policy : retry.RetryPolicy or None, optional
+            The policy on retrying the commands. Its retry budget and
+            maximum elapsed time are for the whole sequence. ``None``
+            means to use ``retry_policy``. See ``send_command``.
+        check_echo : bool or None, optional
+            Whether to check the echo while writing each command,
+            overriding the driver's echo checking for this call.
+            ``None`` means the driver's echo checking. See
+            ``send_command``.
+
+        Returns
+        -------
+        outputs : list of Response
+            ``list`` composed of the processed responses of each command
+            in the order that they were done up to and including the
+            last command executed. See ``send_command`` for the format
+            of processed responses.
+
+        Raises
+        ------
+        ValueError
+            If `eor` is a ``list`` with fewer EOR than there are
+            commands, which is raised when the first command without
+            one is reached.
+
+        See Also
+        --------
+        send_command : Send a single command.
+        iter_commands : Streaming version.
+
+        Examples
+        --------
+
+        A sequence of commands to energize the motor, move it a bit away
+        from the starting position, and then do 4 forward/reverse
+        cycles, and de-energize the motor. **DO NOT** try these specific
+        movement distances without checking that the motion won't damage
+        something (very motor and application specific).
+
+        >>> from GeminiMotorDrive.drivers import ASCII_RS232
+        >>> ra = ASCII_RS232('/dev/ttyS1')
+        >>> ra.send_commands(['DRIVE1', 'D-10000', 'GO']
+        ...                  + ['D-10000','GO','D10000','GO']*4
+        ...                  + [ 'DRIVE0'])
+        [Response('DRIVE1', 'DRIVE1\\r', 'DRIVE1', None, []),
+         Response('D-10000', 'D-10000\\r', 'D-10000', None, []),
+         Response('GO', 'GO\\r', 'GO', None, []),
+         Response('D-10000', 'D-10000\\r', 'D-10000', None, []),
+         Response('GO', 'GO\\r', 'GO', None, []),
+         Response('D10000', 'D10000\\r', 'D10000', None, []),
+         Response('GO', 'GO\\r', 'GO', None, []),
+         Response('D-10000', 'D-10000\\r', 'D-10000', None, []),
+         Response('GO', 'GO\\r', 'GO', None, []),
+         Response('D10000', 'D10000\\r', 'D10000', None, []),
+         Response('GO', 'GO\\r', 'GO', None, []),
+         Response('D-10000', 'D-10000\\r', 'D-10000', None, []),
+         Response('GO', 'GO\\r', 'GO', None, []),
+         Response('D10000', 'D10000\\r', 'D10000', None, []),
+         Response('GO', 'GO\\r', 'GO', None, []),
+         Response('D-10000', 'D-10000\\r', 'D-10000', None, []),
+         Response('GO', 'GO\\r', 'GO', None, []),
+         Response('D10000', 'D10000\\r', 'D10000', None, []),
+         Response('GO', 'GO\\r', 'GO', None, []),
+         Response('DRIVE0', 'DRIVE0\\r', 'DRIVE0', None, [])]
+
+        """
+        with self.lock:
+            return list(self.iter_commands(commands, timeout=timeout,
+                                           max_retries=max_retries,
+                                           eor=eor, deadline=deadline,
+                                           retry_policy=retry_policy,
+                                           check_echo=check_echo))
+
+
+class ASCII_TCP(ASCII_RS232):
+    """ ASCII TCP comm. driver for a Parker Motion Gemini drive.
+
+    Communications driver to talk to a Parker Motion Gemini drive in
+    ASCII mode over RS232 through a serial-to-Ethernet terminal server
+    (serial device server) in raw TCP mode, using a
+    ``transports.SocketTransport``. It works the same way and has the
+    same ``send_command`` and ``send_commands`` as ``ASCII_RS232``.
+
+    The terminal server must already be set to the drive's baud rate
+    and flow control, which can't be changed through it.
+
+    Parameters
+    ----------
+    host : str
+        Host name or IP address of the terminal server.
+    port : int
+        TCP port of the terminal server's serial port that the Gemini
+        drive is connected to.
+    baudrate : int, optional
+        The baud rate the terminal server talks to the drive at, which
+        sets the timing the driver uses.
+    check_echo : bool or 'adaptive', optional
+        Whether the echoing of the commands as they are being written
+        to the drive should be used to correct mistakes in what the
+        drive is seeing or not as the default. See ``ASCII_RS232``.
+    writeTimeout : float, optional
+        The write timeout for the connection.
+    bulk_write : bool, optional
+        Whether commands should be written to the drive in bulk or a
+        single character at a time. See ``ASCII_RS232``. Unlike for
+        ``ASCII_RS232``, it is the default since writing a character at
+        a time costs a network round trip per character when checking
+        the echo.
+    connect_timeout : float or None, optional
+        Timeout in seconds for connecting. ``None`` blocks.
+    **keywords : additional keyword arguments
+        `chunk_size`, `pacing`, `min_gap`, `retry_delay`,
+        `retry_policy`, `background_reader`, `buffer_size`,
+        `restore_on_close`, `instrument`, `taps`, `keep_raw`, and
+        `adaptive_threshold`, which are the same as for
+        ``ASCII_RS232``.
+
+    Attributes
+    ----------
+    baudrate : int
+    closed : bool
+
+    Raises
+    ------
+    serial.SerialException
+        If the terminal server can't be connected to.
+    ValueError
+        If `pacing` is not one of the allowed values.
+
+    See Also
+    --------
+    ASCII_RS232
+    transports.SocketTransport
+
+    Examples
+    --------
+
+    Energizing the motor.
+
+    >>> from GeminiMotorDrive.drivers import ASCII_TCP
+    >>> with ASCII_TCP('192.168.1.20', 4001) as ar:
+    ...     ar.send_command('DRIVE1')
+    Response('DRIVE1', 'DRIVE1\\r\\r\\n', 'DRIVE1', None, [])
+
+    """
+    def __init__(self, host, port, baudrate=_DEFAULT_BAUDRATE,
+                 check_echo=True, writeTimeout=1.0, bulk_write=True,
+                 connect_timeout=5.0, **keywords):
+        # The driver counts as closed till connected so that __del__
+        # does nothing if connecting fails.
+        self._closed = True
+
+        # The baud rate is passed on as the one to use as well as the
+        # one the transport is at so that the drive is never told to
+        # change it.
+        # The transport is made here, and so belongs to the driver.
+        transport = SocketTransport(host, port, baudrate=baudrate,
+                                    write_timeout=writeTimeout,
+                                    connect_timeout=connect_timeout)
+        try:
+            ASCII_RS232.__init__(self, transport, check_echo=check_echo,
+                                 bulk_write=bulk_write,
+                                 baudrate=baudrate, **keywords)
+        except BaseException:
+            transport.close()
+            raise
+        self._owns_port = True
+
+
+class AsyncASCII_RS232(_ASCIIDriver):
+    """ asyncio ASCII RS232 comm. driver for a Parker Motion Gemini drive.
+
+    Communications driver to talk to a Parker Motion Gemini drive in
+    ASCII mode over RS232 from ``asyncio`` code. All talking to the
+    drive is done with coroutines using non-blocking I/O on the serial
+    port, so many drives can be controlled at once from one event loop
+    without blocking it or needing a thread per drive.
+
+    The driver must be connected with ``connect`` before it is used and
+    should be closed with ``close`` when done. Alternatively, it can be
+    used as an asynchronous context manager, which does both.
 
     Parameters
     ----------
-    port : serial port string
+    port : serial port string or serial port like object
         The serial port (RS232) that the Gemini drive is connected to.
+        It can also be any URL supported by ``serial.serial_for_url``
+        such as ``'loop://'``, or an already open ``serial.Serial`` or
+        object that acts like one (such as a
+        ``simulator.SimulatedSerial``), which is left open when the
+        driver is closed.
     check_echo : bool, optional
         Whether the echoing of the commands as they are being written
         to the drive should be used to correct mistakes in what the
         drive is seeing or not as the default.
-    writeTimout : float, optional
-        The write timeout for the RS232 port. See ``serial.Serial``.
-    interCharTimeout : float or None, optional
-        The inter-character timeout for writing on the RS232 port.
-        ``None`` disables. See ``serial.Serial``.
+    bulk_write : bool, optional
+        Whether commands should be written to the drive in bulk. See
+        ``ASCII_RS232``.
+    chunk_size : int or None, optional
+        Maximum number of characters to write at once when doing bulk
+        writes. ``None`` means the whole command is written at once.
+    pacing : {'response', 'fixed'}, optional
+        How commands are paced. See ``ASCII_RS232``.
+    min_gap : float or None, optional
+        Minimum time in seconds between receiving the response to a
+        command and sending the next command. ``None`` means to use the
+        default for the `pacing`. See ``ASCII_RS232``.
+    retry_delay : float, optional
+        Time in seconds to wait before retrying a command that had an
+        error.
+    keep_raw : bool, optional
+        Whether to keep the full response from the drive in each
+        ``Response`` (its ``raw``) after it has been processed or not.
+        Not keeping it saves memory when doing many commands.
 
     Raises
     ------
     serial.SerialException
         If `port` does not correspond to an available RS232 port or
         can't be opened.
+    ValueError
+        If `pacing` is not one of the allowed values.
+
+    Notes
+    -----
+    Ports with a file descriptor (all serial ports on POSIX systems) are
+    read from when the event loop says they are readable. Other ports
+    (such as ``'loop://'`` or serial ports on Windows) are polled every
+    millisecond while waiting for data.
+
+    The ASCII communications settings of the Gemini drive are changed
+    by ``connect`` and are returned to the default values by ``close``.
+
+    See Also
+    --------
+    ASCII_RS232
+    serial.serial_for_url
+
+    Examples
+    --------
+
+    Energizing the motor.
+
+    >>> import asyncio
+    >>> from GeminiMotorDrive.drivers import AsyncASCII_RS232
+    >>> async def energize():
+    ...     async with AsyncASCII_RS232('/dev/ttyS1') as ar:
+    ...         return await ar.send_command('DRIVE1')
+    >>> asyncio.get_event_loop().run_until_complete(energize())
+    Response('DRIVE1', 'DRIVE1\\r\\r\\n', 'DRIVE1', None, [])
+
+    """
+    def __init__(self, port, check_echo=True, bulk_write=False,
+                 chunk_size=None, pacing='response', min_gap=None,
+                 retry_delay=0.25, keep_raw=True):
+        _ASCIIDriver.__init__(self, check_echo, bulk_write, chunk_size,
+                              pacing, min_gap, retry_delay, keep_raw)
+
+        # Initialize the serial port to connect to the Gemini drive
+        # (unless an already open one was given) with a zero read
+        # timeout so that reads never block. A port that was given
+        # belongs to the caller, and so isn't closed when the driver is.
+        if hasattr(port, 'read') and hasattr(port, 'write'):
+            self._ser = port
+            self._ser.timeout = 0
+            self._owns_port = False
+        else:
+            self._owns_port = True
+            self._ser = serial.serial_for_url(port,
+                                  baudrate=_DEFAULT_BAUDRATE,
+                                  bytesize=serial.EIGHTBITS,
+                                  parity=serial.PARITY_NONE,
+                                  stopbits=serial.STOPBITS_ONE,
+                                  timeout=0,
+                                  xonxoff=True, rtscts=False,
+                                  dsrdtr=False)
+
+        # Get the file descriptor of the port if it has one so that the
+        # event loop can tell us when it is readable or writable, in
+        # which case writes are made non-blocking too (they return how
+        # much was written).
+        try:
+            self._fd = self._ser.fileno()
+        except (AttributeError, NotImplementedError,
+                io.UnsupportedOperation):
+            self._fd = None
+        else:
+            self._ser.write_timeout = 0
+
+        # Data read from the drive is put into a receive buffer, with an
+        # event to signal when there is new data. The event, the lock
+        # used to make sure only one command or sequence of commands is
+        # done at a time, and the event loop are set on connecting.
+        self._rx = bytearray()
+        self._rx_event = None
+        self._lock = None
+        self._loop = None
+
+    async def __aenter__(self):
+        await self.connect()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def connect(self):
+        """ Connects to the drive.
+
+        Starts reading from the drive and sets the drive's ASCII
+        communications settings to the ones used by this driver.
+
+        """
+        # Make the event loop dependent things and start reading from
+        # the port if it has a file descriptor.
+        self._loop = asyncio.get_event_loop()
+        self._rx_event = asyncio.Event()
+        self._lock = asyncio.Lock()
+        if self._fd is not None:
+            self._loop.add_reader(self._fd, self._on_readable)
+
+        # Change the communications parameters to the ones used while
+        # connected. The echo command is the one command that echo
+        # checking cannot be done on since echo may not be enabled yet.
+        async with self._lock:
+            await self._set_comms_settings(_COMMS_SETTINGS,
+                                           check_first_echo=False)
+
+    async def close(self):
+        """ Returns all communications settings to their defaults.
+
+        Returns the drive's ASCII communications settings to their
+        default values, stops reading from the drive, and closes the
+        port.
+
+        """
+        # Nothing needs to be done if we aren't connected.
+        if self._lock is None:
+            return
+        async with self._lock:
+            await self._set_comms_settings(_DEFAULT_COMMS_SETTINGS)
+        if self._fd is not None:
+            self._loop.remove_reader(self._fd)
+        if self._owns_port:
+            self._ser.close()
+        self._lock = None
+
+    async def _set_comms_settings(self, commands, check_first_echo=True):
+        """ Sets communications settings and confirms they took.
+
+        Coroutine version of ``ASCII_RS232._set_comms_settings``.
+
+        Parameters
+        ----------
+        commands : iterable of str
+            The communications settings commands, which are sent as
+            immediate commands.
+        check_first_echo : bool, optional
+            Whether the first command can be echo checked or not, which
+            it can't be if it is the one turning echo on.
+
+        Returns
+        -------
+        confirmed : bool
+            Whether the drive confirmed processing the commands.
+
+        """
+        for i, command in enumerate(commands):
+            if i == 0 and not check_first_echo:
+                check_echo = False
+            else:
+                check_echo = None
+            await self._send_command(command, immediate=True,
+                                     check_echo=check_echo)
+            await self._wait_quiet(_get_deadline(_CONFIRM_TIMEOUT))
+        confirmed = await self._sync()
+        await self._wait_quiet(_get_deadline(_QUIET_TIME))
+        return confirmed
+
+    async def _wait_quiet(self, deadline):
+        """ Discards a response whose end isn't known.
+
+        Coroutine version of ``ASCII_RS232._wait_quiet``.
+
+        Parameters
+        ----------
+        deadline : float or None
+            Time on the ``time.monotonic`` clock to give up waiting for
+            the drive to start sending at.
+
+        """
+        quiet = max(_QUIET_TIME, 5*self._char_time)
+        data = await self._read_chunk(deadline)
+        while len(data) != 0:
+            data = await self._read_chunk(_get_deadline(quiet))
+
+    async def _sync(self, timeout=_SYNC_TIMEOUT):
+        """ Confirms the drive has processed everything sent so far.
+
+        Coroutine version of ``ASCII_RS232._sync``.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Time in seconds to wait for the answer.
+
+        Returns
+        -------
+        synced : bool
+            Whether the answer arrived.
 
-    Notes
-    -----
-    The ASCII communications settings of the Gemini drive are changed
-    while this object is connected and are returned to the default
-    values when this object is deleted. Thus, the values of the
-    communications settings before this object is created are lost.
+        """
+        deadline = _get_deadline(timeout)
+        await self._send_command('TREV', immediate=True,
+                                 deadline=deadline)
+        buf = bytearray()
+        start = -1
+        while True:
+            chunk = await self._read_chunk(deadline)
+            if len(chunk) == 0:
+                return False
+            buf += chunk
+            if start == -1:
+                start = buf.find(b'*TREV-G')
+            if start != -1 and (buf.find(b'\r', start) != -1
+                                or buf.find(b'\n', start) != -1):
+                return True
+
+    def _on_readable(self):
+        """ Reads the data waiting on the port into the receive buffer.
+
+        Called by the event loop whenever the port is readable.
 
-    See Also
-    --------
-    serial.Serial
+        """
+        data = self._ser.read(max(1, self._ser.in_waiting))
+        if len(data) != 0:
+            self._rx += data
+            self._rx_event.set()
 
-    """
-    def __init__(self, port, check_echo=True, writeTimeout=1.0,
-                 interCharTimeout=0.002):
-        # Set private variable holding the echo parameters.
-        self._check_echo = check_echo
+    async def _write(self, data):
+        """ Writes data to the drive without blocking the event loop.
 
-        # Initialize the serial port to connect to the Gemini drive. The
-        # only timeout being explicitly set right now is the write
-        # timeout. Read timeouts are handled in a more manual fasion.
-        self._ser = serial.Serial(port, baudrate=9600,
-                                  bytesize=serial.EIGHTBITS,
-                                  parity=serial.PARITY_NONE,
-                                  stopbits=serial.STOPBITS_ONE,
-                                  timeout=None,
-                                  writeTimeout=writeTimeout,
-                                  interCharTimeout=interCharTimeout,
-                                  xonxoff=True, rtscts=False,
-                                  dsrdtr=False)
+        Parameters
+        ----------
+        data : bytes
+            The data to write.
+
+        """
+        # Write as much as the port will take at once, and wait for it
+        # to become writable again if not everything could be written.
+        while len(data) != 0:
+            try:
+                n = self._ser.write(data)
+            except serial.SerialTimeoutException:
+                n = 0
+            if n is None:
+                n = len(data)
+            data = data[n:]
+            if len(data) != 0:
+                if self._fd is None:
+                    await asyncio.sleep(_POLL_INTERVAL)
+                else:
+                    writable = self._loop.create_future()
+                    self._loop.add_writer(self._fd, writable.set_result,
+                                          None)
+                    try:
+                        await writable
+                    finally:
+                        self._loop.remove_writer(self._fd)
 
-        # It is convenient to have a text wrapper around the serial
-        # port for reading and writing.
-        self._sio = io.TextIOWrapper(io.BufferedRWPair(self._ser,
-                                     self._ser, 1), newline='\n',
-                                     encoding='ASCII')
-
-        # Change the communications parameters so that commands are
-        # echoed, on error level 4, no characters are used to preceed
-        # each response, carriage returns are used for newlines in
-        # responses, responses are terminated by a '\n', and there are
-        # no prompts (there are separate prompts depending on whether
-        # the previous command had an error or not). The echo command is
-        # the one command that echo checking cannot be done on since
-        # echo may not be enabled yet.
-        self._send_command('ECHO1', check_echo=False, immediate=True)
-        self._send_command('ERRLVL4', immediate=True)
-        self._send_command('BOT0,0,0', immediate=True)
-        self._send_command('EOT10,0,0', immediate=True)
-        self._send_command('EOL13,0,0', immediate=True)
-        self._send_command('ERRBAD0,0,0,0', immediate=True)
-        self._send_command('ERROK0,0,0,0', immediate=True)
-
-        # Wait a little while for the commands to be processed and then
-        # discard all the responses.
-        time.sleep(2)
-        self._ser.read(self._ser.inWaiting())
+    def _take(self):
+        """ Takes everything in the receive buffer.
+
+        Returns
+        -------
+        data : bytes
+            Everything in the receive buffer, which is emptied.
 
-    def __del__(self):
-        """ Returns all communications settings to their defaults.
         """
-        # Return all communicatsions parameters to their default values
-        # (from the manual).
-        self._send_command('ECHO1', immediate=True)
-        self._send_command('ERRLVL4', immediate=True)
-        self._send_command('BOT0,0,0', immediate=True)
-        self._send_command('EOT13,0,0', immediate=True)
-        self._send_command('EOL13,10,0', immediate=True)
-        self._send_command('ERRBAD13,10,63,32', immediate=True)
-        self._send_command('ERROK13,10,62,32', immediate=True)
-        # Wait a little while for the commands to be processed and then
-        # discard all the responses.
-        time.sleep(2)
-        self._ser.read(self._ser.inWaiting())
+        # Ports that the event loop isn't reading need to be read now.
+        if self._fd is None:
+            n = self._ser.in_waiting
+            if n > 0:
+                self._rx += self._ser.read(n)
+        data = bytes(self._rx)
+        del self._rx[:]
+        self._rx_event.clear()
+        return data
+
+    async def _read_chunk(self, deadline=None):
+        """ Reads whatever the drive has sent so far.
+
+        Waits till at least one byte has arrived from the drive or
+        `deadline` has passed, and then takes everything received.
+
+        Parameters
+        ----------
+        deadline : float or None, optional
+            Time on the ``time.monotonic`` clock to give up waiting at.
+            ``None`` means to wait forever.
 
+        Returns
+        -------
+        data : bytes
+            The bytes read, which are empty if the deadline passed
+            without anything arriving.
 
-    def _send_command(self, command, immediate=False, timeout=1.0,
-                      check_echo=None):
+        """
+        if self._fd is None:
+            # Poll the port till something is there or the deadline
+            # passes.
+            while self._ser.in_waiting == 0 \
+                    and not _deadline_passed(deadline):
+                await _sleep_async(_POLL_INTERVAL, deadline)
+        elif len(self._rx) == 0 and not _deadline_passed(deadline):
+            # Wait for the event loop to read something.
+            if deadline is None:
+                timeout = None
+            else:
+                timeout = max(0.0, deadline - time.monotonic())
+            try:
+                await asyncio.wait_for(self._rx_event.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+        return self._take()
+
+    async def _discard(self):
+        """ Discards everything received from the drive so far.
+        """
+        await self._read_chunk(deadline=time.monotonic())
+
+    async def _send_command(self, command, immediate=False, timeout=1.0,
+                            check_echo=None, bulk_write=None,
+                            deadline=None):
         """ Send a single command to the drive after sanitizing it.
 
-        Takes a single given `command`, sanitizes it (strips out
-        comments, extra whitespace, and newlines), sends the command to
-        the drive, and returns the sanitized command. The validity of
-        the command is **NOT** checked.
+        Coroutine version of ``ASCII_RS232._send_command``.
 
         Parameters
         ----------
@@ -146,11 +3114,17 @@ class ASCII_RS232(object):
             ``None`` indicates that the an infinite timeout should be
             used.
         check_echo : bool or None, optional
-            Whether the echoing of the command as it is being written to
-            the drive should be used to correct mistakes in what the
-            drive is seeing, or whether the default set when the
-            instance of this class was created should be used
+            Whether to do echo checking, or whether the default set when
+            the instance of this class was created should be used
             (``None``).
+        bulk_write : bool or None, optional
+            Whether the command should be written in bulk or a character
+            at a time, or whether the default set when the instance of
+            this class was created should be used (``None``).
+        deadline : float or None, optional
+            Optional overall deadline on the ``time.monotonic`` clock
+            to use in addition to `timeout`. ``None`` means no overall
+            deadline.
 
         Returns
         -------
@@ -158,103 +3132,85 @@ class ASCII_RS232(object):
             The sanitized command that was sent to the drive.
 
         """
-        # Use the default echo checking if None was given.
+        # Use the default echo checking and writing if None was given.
         if check_echo is None:
             check_echo = self._check_echo
+        if bulk_write is None:
+            bulk_write = self._bulk_write
 
-        # Convert to bytes and then strip comments, whitespace, and
-        # newlines.
-        if sys.hexversion >= 0x03000000:
-            c = bytes(command, encoding='ASCII')
-        else:
-            c = command
-        c = c.split(b';')[0].strip()
-
-        # If the command is supposed to be immediate, insure that it
-        # starts with an '!'.
-        if immediate and not c.startswith(b'!'):
-            c = b'!' + c
+        c = self._sanitize_command(command, immediate=immediate)
 
-        # Read out any junk on the serial port before we start.
-        self._ser.read(self._ser.inWaiting())
+        # Throw out any junk from the drive before we start.
+        await self._discard()
 
-        # The command needs to be written a character at a time with
-        # pauses between them to make sure nothing gets lost or
-        # corrupted. This is a simple loop if we are not checking the
-        # echo. If we are, it is more complicated.
+        # Write the command the same way ASCII_RS232 does, except that
+        # the waiting is done without blocking.
+        chunk_size = self._get_chunk_size(c)
         if not check_echo:
-            for i in range(0, len(c)):
-                self._ser.write(bytes([c[i]]))
-                time.sleep(0.01)
+            if bulk_write:
+                for i in range(0, len(c), chunk_size):
+                    await self._write(c[i:(i+chunk_size)])
+            else:
+                for i in range(0, len(c)):
+                    await self._write(bytes([c[i]]))
+                    await asyncio.sleep(0.01)
         else:
-            # Infinite timeouts need to be converted to None. Finite
-            # ones need to be checked to make sure they are not too big,
-            # which is threading.TIMEOUT_MAX on Python 3.x and not
-            # specified on Python 2.x (lets use a week).
-            if timeout is None or timeout <= 0:
+            if timeout is not None and timeout <= 0:
                 timeout = None
-            else:
-                if sys.hexversion >= 0x03000000:
-                    maxtimeout = threading.TIMEOUT_MAX
-                else:
-                    maxtimeout = 7*24*3600
-                timeout = min(timeout, maxtimeout)
-
-            # A timer will be made that takes timeout to finish. Then,
-            # it is a matter of checking whether it is alive or not to
-            # know whether the timeout was exceeded or not. Then, the
-            # timer is started.
-            tm = threading.Timer(timeout, lambda : None)
-            tm.start()
-
-            # Each character needs to be written one by one while the
-            # echo is collected. If any mistakes occur, they need to be
-            # corrected with backspaces b'\x08'. The echo starts out
-            # empty. We go until either the echo is identical to the
-            # command or the timeout is exceeded.
-            echo = b''
-            while c != echo and tm.is_alive():
-                # If there are no mistakes, then echo will be the
-                # beginning of c meaning the next character can be
-                # written. Otherwise, there is a mistake and a backspace
-                # needs to be written.
-                if c.startswith(echo):
-                    self._ser.write(bytes([c[len(echo)]]))
-                else:
-                    self._ser.write(b'\x08')
-
-                # Pause for a bit to make sure nothing gets lost. Then
-                # read the drive's output add it to the echo.
-                time.sleep(0.01)
-                echo += self._ser.read(self._ser.inWaiting())
-
-                # All backspaces in echo need to be processed. Each
-                # backspace deletes itself and the character before it
-                # (if any).
-                while b'\x08' in echo:
-                    index = echo.index(b'\x08')
-                    if index == 0:
-                        echo = echo[1:]
-                    else:
-                        echo = echo[0:(index-1)] + echo[(index+1):]
-
-            # Turn off the timer in the case that it is still running
-            # (command completely written before timeout).
-            tm.cancel()
+            deadline = _get_deadline(timeout, deadline)
+            echo = EchoReconciler(c)
+            if bulk_write:
+                for i in range(0, len(c), chunk_size):
+                    chunk = c[i:(i+chunk_size)]
+                    await self._write(chunk)
+                    await self._collect_echo(echo, i + len(chunk),
+                                             len(chunk), deadline)
+                    if not echo.matches(i + len(chunk)):
+                        break
+            while not echo.done and not _deadline_passed(deadline):
+                await self._write(echo.next_byte())
+                await asyncio.sleep(0.01)
+                echo.feed(self._take())
 
         # Write the carriage return to enter the command and then return
         # the sanitized command.
-        self._ser.write(b'\r')
+        await self._write(b'\r')
         if sys.hexversion >= 0x03000000:
             return c.decode(errors='replace')
         else:
             return c
 
-    def _get_response(self, timeout=1.0, eor=('\n', '\n- ')):
+    async def _collect_echo(self, echo, length, n, deadline=None):
+        """ Collects the echo of characters written in bulk.
+
+        Coroutine version of ``ASCII_RS232._collect_echo``.
+
+        Parameters
+        ----------
+        echo : EchoReconciler
+            The reconciler of the echo collected so far.
+        length : int
+            The length the echo should be once all the characters
+            written have been echoed.
+        n : int
+            The number of characters that were just written.
+        deadline : float or None, optional
+            Deadline on the ``time.monotonic`` clock, or ``None`` for no
+            deadline.
+
+        """
+        window = _get_deadline(2*n*self._char_time + 0.02, deadline)
+        while len(echo) < length:
+            data = await self._read_chunk(window)
+            if len(data) == 0:
+                break
+            echo.feed(data)
+
+    async def _get_response(self, timeout=1.0, eor=('\n', '\n- '),
+                            deadline=None):
         """ Reads a response from the drive.
 
-        Reads the response returned by the drive with an optional
-        timeout. All carriage returns and linefeeds are kept.
+        Coroutine version of ``ASCII_RS232._get_response``.
 
         Parameters
         ----------
@@ -264,9 +3220,11 @@ class ASCII_RS232(object):
             an infinite timeout should be used.
         eor : str or iterable of str, optional
             ``str`` or iterable of ``str`` that denote the allowed
-            End Of Response. For most commands, it should be
-            ``('\\n', '\\n- ')``, but for running a program, it should
-            be ``'*END\\n'``. The default is ``('\\n', '\\n- ')``.
+            End Of Response.
+        deadline : float or None, optional
+            Optional overall deadline on the ``time.monotonic`` clock
+            to use in addition to `timeout`. ``None`` means no overall
+            deadline.
 
         Returns
         -------
@@ -275,164 +3233,63 @@ class ASCII_RS232(object):
             linefeeds are preserved.
 
         """
-        # If no timeout is given or it is invalid and we are using '\n'
-        # as the eor, use the wrapper to read a line with an infinite
-        # timeout. Otherwise, the reading and timeout must be
-        # implemented manually.
-        if (timeout is None or timeout < 0) and eor == '\n':
-            return self._sio.readline()
-        else:
-            # A timer will be made that takes timeout to finish. Then,
-            # it is a matter of checking whether it is alive or not to
-            # know whether the timeout was exceeded or not. They need to
-            # be checked to make sure they are not too big, which is
-            # threading.TIMEOUT_MAX on Python 3.x and not specified on
-            # Python 2.x (lets use a week). Then, the timer is started.
-            if sys.hexversion >= 0x03000000:
-                maxtimeout = threading.TIMEOUT_MAX
-            else:
-                maxtimeout = 7*24*3600
-            timeout = min(timeout, maxtimeout)
-            tm = threading.Timer(timeout, lambda : None)
-            tm.start()
-
-            # eor needs to be converted to bytes. If it is just an str,
-            # it needs to be wrapped in a tuple.
-            if isinstance(eor, str):
-                eor = tuple([eor])
-            if sys.hexversion >= 0x03000000:
-                eor = [s.encode(encoding='ASCII') for s in eor]
-
-            # Read from the serial port into buf until the EOR is found
-            # or the timer has stopped. A small pause is done each time
-            # so that this thread doesn't hog the CPU.
-            buf = b''
-            while not any([(x in buf) for x in eor]) and tm.is_alive():
-                time.sleep(0.001)
-                buf += self._ser.read(self._ser.inWaiting())
-
-            # Just in case the timer has not stopped (EOR was found),
-            # stop it.
-            tm.cancel()
-
-            # Remove anything after the EOR if there is one. First, a
-            # set of matches (index, eor_str) for each string in eor
-            # needs to be constructed. Sorting the matches by their
-            # index puts all the ones that were not found (index of -1)
-            # at the front. Then a list of bools that are True for each
-            # index that isn't -1 is made, converted to a bytes (True
-            # goes to b'\x01' and False goes to b'\x00'), and then the
-            # index of the first True value found. If it is not -1, then
-            # there was a successful match and  all the characters are
-            # dropped after that eor_str.
-            matches = [(buf.find(x), x) for x in eor]
-            matches.sort(key=lambda x: x[0])
-            index = bytes([x[0] != -1 for x in matches]).find(b'\x01')
-            if index != -1:
-                buf = buf[:(matches[index][0] + len(matches[index][1]))]
-
-            # Convert to an str before returning.
-            if sys.hexversion >= 0x03000000:
-                return buf.decode(errors='replace')
-            else:
-                return buf
-
-    def _process_response(self, response):
-        """ Processes a response from the drive.
-
-        Processes the response returned from the drive. It is broken
-        down into the echoed command (drive echoes it back), any error
-        returned by the drive (leading '*' is stripped), and the
-        different lines of the response.
-
-        Parameters
-        ----------
-        response : str
-            The response returned by the drive.
-
-        Returns
-        -------
-        processed_response : list
-            A 4-element ``list``. The elements, in order, are `response`
-            (``str``), the echoed command (``str``), any error response
-            (``None`` if none, or the ``str`` of the error), and the
-            lines of the response that are not the echo or error line
-            (``list`` of ``str`` with newlines stripped).
-
-        """
-        # Strip the trailing newline and split the response into lines
-        # by carriage returns.
-        rsp_lines = response.rstrip('\r\n').split('\r')
-
-        # If we have at least one line, the first one is the echoed
-        # command. If available, it needs to be grabbed and that line
-        # removed from rsp_lines since it is just the echoing, not the
-        # actual response to the command. None will be used to denote a
-        # non-existent echo.
-        if len(rsp_lines) > 0:
-            echoed_command = rsp_lines[0]
-            del rsp_lines[0]
-        else:
-            echoed_command = None
-
-        # If the next line is one of the different possible error
-        # strings, then there was an error that must be grabbed (leading
-        # '*' is stripped). If there was an error, remove that line from
-        # the response. None will be used to denote the lack of an error.
-        if len(rsp_lines) > 0 and \
-                rsp_lines[0] in ('*INVALID_ADDRESS', '*INVALID_DATA', \
-                '*INVALID_DATA_HIGH', '*INVALID_DATA_LOW', \
-                '*UNDEFINED_LABEL'):
-            err = rsp_lines[0][1:]
-            del rsp_lines[0]
+        deadline = _get_deadline(timeout, deadline)
+        if isinstance(eor, str):
+            eor = tuple([eor])
+        if sys.hexversion >= 0x03000000:
+            eor = [s.encode(encoding='ASCII') for s in eor]
+        scanner = _EORScanner(eor)
+        buf = bytearray()
+        end = -1
+        while end == -1:
+            chunk = await self._read_chunk(deadline)
+            if len(chunk) == 0:
+                break
+            buf += chunk
+            end = scanner.scan(buf)
+        if end != -1:
+            del buf[end:]
+        if sys.hexversion >= 0x03000000:
+            return buf.decode(errors='replace')
         else:
-            err = None
-
-        return [response, echoed_command, err, rsp_lines]
-
-    def command_error(self, response):
-        """ Checks whether a command produced an error.
+            return bytes(buf)
 
-        Checks whether a command procuded an error based on its
-        processed response. The two types of errors are an error
-        returned by the drive and the command that the drive received
-        being different than the one that was sent (error in
-        transmission).
-
-        Parameters
-        ----------
-        response : processed response (list)
-            The processed response ``list`` for the command that was
-            executed.
+    async def _execute(self, command, immediate, timeout, max_retries,
+                       eor, deadline):
+        """ Executes a command with retries.
 
-        Returns
-        -------
-        error : bool
-            ``True`` if there was an error and ``False`` otherwise.
+        Does the work of ``send_command`` without taking the lock.
 
         """
-        # The command should be echoed back accurately (might be
-        # preceeded by a '- ' if it is part of a program definition) and
-        # no errors should be returned, if it has no errors.
-        return (response[2] not in [response[0], '- ' + response[0]]
-                or response[3] is not None)
+        response = None
+        for i in range(0, max_retries+1):
+            if i > 0:
+                await _sleep_async(self._retry_delay, deadline)
+            if _deadline_passed(deadline):
+                break
+            await _sleep_async(self._get_pacing_delay(), deadline)
+            c = await self._send_command(command, immediate=immediate,
+                                         deadline=deadline)
+            output = await self._get_response(timeout=timeout, eor=eor,
+                                              deadline=deadline)
+            self._last_response_time = time.monotonic()
+            if self._check_echo:
+                output = c + output
+            response = self._make_response(c, output)
+            if response.ok:
+                break
+        if response is None:
+            response = self._empty_response(command,
+                                            immediate=immediate)
+        return response
 
-    def send_command(self, command, immediate=False, timeout=1.0,
-                     max_retries=0, eor=('\n', '\n- ')):
+    async def send_command(self, command, immediate=False, timeout=1.0,
+                           max_retries=0, eor=('\n', '\n- '),
+                           deadline=None):
         """ Sends a single command to the drive and returns output.
 
-        Takes a single given `command`, sanitizes it, sends it to the
-        drive, reads the response, and returns the processed response.
-        The command is first sanitized by removing comments, extra
-        whitespace, and newline characters. If `immediate` is set, the
-        command is made to be an immediate command. Note, the command is
-        **NOT** checked for validity. If the drive returns an error, the
-        command is re-executed up to `max_tries` more times. The
-        response from the final execution is processed and returned. The
-        response from the drive is broken down into the echoed command
-        (drive echoes it back), any error returned by the drive (leading
-        '*' is stripped), and the different lines of the response; which
-        are all returned.
+        Coroutine version of ``ASCII_RS232.send_command``, which it
+        takes the same arguments as and returns the same output as.
 
         Parameters
         ----------
@@ -450,96 +3307,41 @@ class ASCII_RS232(object):
             errors.
         eor : str or iterable of str, optional
             ``str`` or an iterable of ``str`` that denote the allowed
-            End Of Response. For most commands, it should be
-            ``('\\n', '\\n- ')``, but for running a program, it should
-            be ``'*END\\n'``. The default is ``('\\n', '\\n- ')``.
+            End Of Response.
+        deadline : float or None, optional
+            Optional overall deadline on the ``time.monotonic`` clock
+            for the command including all retries. ``None`` means no
+            overall deadline.
 
         Returns
         -------
-        output : list
-            A 5-element ``list``. The elements, in order, are the
-            sanitized command (``str``), the full response (``str``),
-            the echoed command (``str``), any error response (``None``
-            if none, or the ``str`` of the error), and the lines of the
-            response that are not the echo or error line (``list`` of
-            ``str`` with newlines stripped).
+        output : Response
+            The processed response. See ``ASCII_RS232.send_command``.
 
-        See Also
-        --------
-        send_commands : Send multiple commands.
+        Raises
+        ------
+        serial.SerialException
+            If the driver is not connected.
 
-        Examples
+        See Also
         --------
-
-        Simple command energizing the motor with no response and no
-        errors.
-
-        >>> from GeminiMotorDrive.drivers import ASCII_RS232
-        >>> ar = ASCII_RS232('/dev/ttyS1')
-        >>> ar.send_command('DRIVE1', immediate=False, timeout=1.0)
-        ['DRIVE1', 'DRIVE1\\r\\r\\n', 'DRIVE1', None, []]
-
-        Same command but made immediate.
-
-        >>> from GeminiMotorDrive.drivers import ASCII_RS232
-        >>> ar = ASCII_RS232('/dev/ttyS1')
-        >>> ar.send_command('DRIVE1', immediate=True, timeout=1.0)
-        ['!DRIVE1', '!DRIVE1\\r\\r\\n', '!DRIVE1', None, []]
-
-        Same command with a typo.
-
-        >>> from GeminiMotorDrive.drivers import ASCII_RS232
-        >>> ar = ASCII_RS232('/dev/ttyS1')
-        >>> ar.send_command('DRIV1', immediate=False, timeout=1.0)
-        ['DRIV1', 'DRIV1\\r*UNDEFINED_LABEL\\r\\r\\n', 'DRIV1',
-         'UNDEFINED_LABEL', []]
-
-        Simple command asking whether the motor is energized or not.
-
-        >>> from GeminiMotorDrive.drivers import ASCII_RS232
-        >>> ar = ASCII_RS232('/dev/ttyS1')
-        >>> ar.send_command('DRIVE', immediate=False, timeout=1.0)
-        ['DRIVE', 'DRIVE\\r*DRIVE1\\r\\r\\n', 'DRIVE', None,
-         ['*DRIVE1']]
+        ASCII_RS232.send_command
 
         """
-        # Execute the command till it either doesn't have an error or
-        # the maximum number of retries is exceeded.
-        for i in range(0, max_retries+1):
-            # Send the command and stuff the sanitized version in a
-            # list. Then process the response and add it to the list.
-            response = [self._send_command(command,
-                        immediate=immediate)]
-            output = self._get_response(timeout=timeout, eor=eor)
-            # If echo checking was done, the echo was already grabbed,
-            # is identical to the command, and needs to be placed back
-            # in front of the output so that it can be processed
-            # properly.
-            if self._check_echo:
-                output = response[0] + output
-            response.extend(self._process_response(output))
-            # We are done if there is no error.
-            if not self.command_error(response):
-                break
-            # Put in a slight pause so the drive has a bit of breathing
-            # time between retries.
-            time.sleep(0.25)
-        return response
-
-    def send_commands(self, commands, timeout=1.0,
-                      max_retries=1, eor=('\n', '\n- ')):
+        if self._lock is None:
+            raise serial.SerialException('Driver is not connected.')
+        async with self._lock:
+            return await self._execute(command, immediate, timeout,
+                                       max_retries, eor, deadline)
+
+    async def send_commands(self, commands, timeout=1.0, max_retries=1,
+                            eor=('\n', '\n- '), deadline=None):
         """ Send a sequence of commands to the drive and collect output.
 
-        Takes a sequence of many commands and executes them one by one
-        till either all are executed or one runs out of retries
-        (`max_retries`). Retries are optionally performed if a command's
-        repsonse indicates that there was an error. Remaining commands
-        are not executed. The processed output of the final execution
-        (last try or retry) of each command that was actually executed
-        is returned.
-
-        This function basically feeds commands one by one to
-        ``send_command`` and collates the outputs.
+        Coroutine version of ``ASCII_RS232.send_commands``, which it
+        takes the same arguments as and returns the same output as. No
+        other commands can be sent by other coroutines while the
+        sequence is being sent.
 
         Parameters
         ----------
@@ -554,78 +3356,46 @@ class ASCII_RS232(object):
             Maximum number of retries to do per command in the case of
             errors.
         eor : str or iterable of str, optional
-            End Of Resonse. An EOR is either a ``str`` or an iterable
-            of ``str`` that denote the possible endings of a response.
-            'eor' can be a single EOR, in which case it is used for all
-            commands, or it can be an iterable of EOR to use for each
-            individual command. For most commands, it should be
-            ``('\\n', '\\n- ')``, but for running a program, it should
-            be ``'*END\\n'``. The default is ``('\\n', '\\n- ')``.
+            End Of Resonse. Either a single EOR used for all commands or
+            a ``list`` of EOR to use for each individual command.
+        deadline : float or None, optional
+            Optional overall deadline on the ``time.monotonic`` clock
+            for the whole sequence including all retries. ``None``
+            means no overall deadline.
 
         Returns
         -------
-        outputs : list of lists
+        outputs : list of Response
             ``list`` composed of the processed responses of each command
             in the order that they were done up to and including the
-            last command executed. See ``send_command`` for the format
-            of processed responses.
+            last command executed.
 
-        See Also
-        --------
-        send_command : Send a single command.
+        Raises
+        ------
+        serial.SerialException
+            If the driver is not connected.
+        ValueError
+            If `eor` is a ``list`` with fewer EOR than there are
+            commands.
 
-        Examples
+        See Also
         --------
+        ASCII_RS232.send_commands
 
-        A sequence of commands to energize the motor, move it a bit away
-        from the starting position, and then do 4 forward/reverse
-        cycles, and de-energize the motor. **DO NOT** try these specific
-        movement distances without checking that the motion won't damage
-        something (very motor and application specific).
-
-        >>> from GeminiMotorDrive.drivers import ASCII_RS232
-        >>> ra = ASCII_RS232('/dev/ttyS1')
-        >>> ra.send_commands(['DRIVE1', 'D-10000', 'GO']
-        ...                  + ['D-10000','GO','D10000','GO']*4
-        ...                  + [ 'DRIVE0'])
-        [['DRIVE1', 'DRIVE1\\r', 'DRIVE1', None, []],
-         ['D-10000', 'D-10000\\r', 'D-10000', None, []],
-         ['GO', 'GO\\r', 'GO', None, []],
-         ['D-10000', 'D-10000\\r', 'D-10000', None, []],
-         ['GO', 'GO\\r', 'GO', None, []],
-         ['D10000', 'D10000\\r', 'D10000', None, []],
-         ['GO', 'GO\\r', 'GO', None, []],
-         ['D-10000', 'D-10000\\r', 'D-10000', None, []],
-         ['GO', 'GO\\r', 'GO', None, []],
-         ['D10000', 'D10000\\r', 'D10000', None, []],
-         ['GO', 'GO\\r', 'GO', None, []],
-         ['D-10000', 'D-10000\\r', 'D-10000', None, []],
-         ['GO', 'GO\\r', 'GO', None, []],
-         ['D10000', 'D10000\\r', 'D10000', None, []],
-         ['GO', 'GO\\r', 'GO', None, []],
-         ['D-10000', 'D-10000\\r', 'D-10000', None, []],
-         ['GO', 'GO\\r', 'GO', None, []],
-         ['D10000', 'D10000\\r', 'D10000', None, []],
-         ['GO', 'GO\\r', 'GO', None, []],
-         ['DRIVE0', 'DRIVE0\\r', 'DRIVE0', None, []]]
-
-        """
-        # If eor is not a list, make a list of it replicated enough for
-        # every command.
+        """
+        if self._lock is None:
+            raise serial.SerialException('Driver is not connected.')
         if not isinstance(eor, list):
             eor = [eor]*len(commands)
-        # Do every command one by one, collecting the responses and
-        # stuffing them in a list. Commands that failed are retried, and
-        # we stop if the last retry is exhausted.
+        elif len(eor) < len(commands):
+            raise ValueError('eor is a list with fewer EOR than there '
+                             'are commands.')
         responses = []
-        for i, command in enumerate(commands):
-            rsp = self.send_command(command, timeout=timeout,
-                                    max_retries=max_retries,
-                                    eor=eor[i])
-            responses.append(rsp)
-            if self.command_error(rsp):
-                break
-            # Put in a slight pause so the drive has a bit of breathing
-            # time between commands.
-            time.sleep(0.25)
+        async with self._lock:
+            for i, command in enumerate(commands):
+                rsp = await self._execute(command, False, timeout,
+                                          max_retries, eor[i], deadline)
+                responses.append(rsp)
+                if self.command_error(rsp):
+                    break
         return responses
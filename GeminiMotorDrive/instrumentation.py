@@ -0,0 +1,263 @@
+# Copyright 2014-2016 Freja Nordsiek
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Module for instrumenting the communications with the drives.
+"""
+
+import re
+import bisect
+import threading
+
+
+# Upper bounds in seconds of the buckets of the latency histograms,
+# which cover everything from a single character at a high baud rate to
+# a slow program. There is an extra bucket for everything above the
+# last bound.
+LATENCY_BOUNDS = (0.0005, 0.001, 0.002, 0.005, 0.01, 0.02, 0.05, 0.1,
+                  0.2, 0.5, 1.0, 2.0, 5.0)
+
+# The latencies recorded for each command.
+_LATENCIES = ('write', 'echo', 'first_byte', 'round_trip')
+
+# The counters kept.
+_COUNTERS = ('commands', 'retries', 'backspaces', 'bytes_out',
+             'bytes_in', 'timeouts')
+
+# Regular expression to pick the command name (keyword) out of a
+# sanitized command, skipping the immediate marker and any axis number.
+_NAME_PATTERN = re.compile('^!?[0-9]*([A-Za-z]*)')
+
+
+def command_name(command):
+    """ Gets the name (keyword) of a command.
+
+    Parameters
+    ----------
+    command : str
+        The sanitized command.
+
+    Returns
+    -------
+    name : str
+        The name of the command in upper case, which is empty if it
+        doesn't start with a keyword.
+
+    Examples
+    --------
+
+    >>> from GeminiMotorDrive.instrumentation import command_name
+    >>> command_name('!DRIVE1')
+    'DRIVE'
+
+    """
+    return _NAME_PATTERN.match(command).group(1).upper()
+
+
+class Histogram(object):
+    """ Histogram with fixed buckets.
+
+    Counts values into buckets with fixed upper bounds, keeping track
+    of the total count, sum, minimum, and maximum too. Recording a value
+    takes a binary search over the bounds.
+
+    Parameters
+    ----------
+    bounds : iterable of float, optional
+        The increasing upper bounds (inclusive) of the buckets. There is
+        an extra bucket for values above the last one.
+
+    Attributes
+    ----------
+    bounds : tuple of float
+    counts : list of int
+        The number of values in each bucket.
+    count : int
+        The number of values recorded.
+    sum : float
+        The sum of the values recorded.
+    min : float or None
+        The smallest value recorded, or ``None`` if none have been.
+    max : float or None
+        The largest value recorded, or ``None`` if none have been.
+
+    """
+    def __init__(self, bounds=LATENCY_BOUNDS):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = None
+        self.max = None
+
+    def record(self, value):
+        """ Records a value.
+
+        Parameters
+        ----------
+        value : float
+            The value to record.
+
+        """
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+
+    def snapshot(self):
+        """ Gets a snapshot of the histogram.
+
+        Returns
+        -------
+        snapshot : dict
+            The ``'bounds'``, ``'counts'``, ``'count'``, ``'sum'``,
+            ``'min'``, and ``'max'`` of the histogram.
+
+        """
+        return {'bounds': self.bounds, 'counts': list(self.counts),
+                'count': self.count, 'sum': self.sum, 'min': self.min,
+                'max': self.max}
+
+
+class DriverStats(object):
+    """ Statistics on the commands a driver sent.
+
+    Keeps counters of the commands sent, the retries done, the
+    backspaces sent to correct the echo, the bytes written and read,
+    and the timeouts (echo or response not arriving in time); as well as
+    latency histograms for each command name (keyword).
+
+    The latencies recorded, in seconds, are
+
+    ``'write'``
+        Time spent writing the command to the port.
+    ``'echo'``
+        Time from starting to write the command till its echo was
+        correct (only when checking the echo).
+    ``'first_byte'``
+        Time from entering the command till the first byte of the
+        response arrived (not available with a background reader).
+    ``'round_trip'``
+        Time from starting to write the command till the whole response
+        arrived.
+
+    A command being sent is started with ``begin``, has its timings
+    filled in by the driver, and is recorded with ``end``. Snapshots
+    can be taken from any thread.
+
+    Parameters
+    ----------
+    bounds : iterable of float, optional
+        The upper bounds of the buckets of the latency histograms.
+
+    Attributes
+    ----------
+    commands : int
+    retries : int
+    backspaces : int
+    bytes_out : int
+    bytes_in : int
+    timeouts : int
+
+    See Also
+    --------
+    Histogram
+
+    """
+    def __init__(self, bounds=LATENCY_BOUNDS):
+        self._bounds = tuple(bounds)
+        self._lock = threading.Lock()
+        self._histograms = dict()
+        self.reset()
+
+    def reset(self):
+        """ Resets all counters and histograms.
+        """
+        with self._lock:
+            for counter in _COUNTERS:
+                setattr(self, counter, 0)
+            self._histograms.clear()
+        self.name = None
+        self.start = None
+        self.write = 0.0
+        self.echo = None
+        self.first_byte = None
+
+    def begin(self, command, start):
+        """ Begins a command.
+
+        Parameters
+        ----------
+        command : str
+            The command, which only needs to be stripped of leading
+            whitespace.
+        start : float
+            Time on the ``time.perf_counter`` clock that the command
+            started being written at.
+
+        """
+        self.commands += 1
+        self.name = command_name(command)
+        self.start = start
+        self.write = 0.0
+        self.echo = None
+        self.first_byte = None
+
+    def end(self, finish):
+        """ Ends the command and records its latencies.
+
+        Parameters
+        ----------
+        finish : float
+            Time on the ``time.perf_counter`` clock that the whole
+            response arrived at.
+
+        """
+        if self.name is None:
+            return
+        with self._lock:
+            histograms = self._histograms.get(self.name)
+            if histograms is None:
+                histograms = dict([(k, Histogram(self._bounds))
+                                   for k in _LATENCIES])
+                self._histograms[self.name] = histograms
+            histograms['write'].record(self.write)
+            if self.echo is not None:
+                histograms['echo'].record(self.echo)
+            if self.first_byte is not None:
+                histograms['first_byte'].record(self.first_byte)
+            histograms['round_trip'].record(finish - self.start)
+        self.name = None
+
+    def snapshot(self):
+        """ Gets a snapshot of the statistics.
+
+        Returns
+        -------
+        snapshot : dict
+            The counters by name, along with ``'commands_by_name'``
+            which is a ``dict`` of the latency histogram snapshots
+            (see ``Histogram.snapshot``) by latency name for each
+            command name.
+
+        """
+        with self._lock:
+            snapshot = dict([(k, getattr(self, k)) for k in _COUNTERS])
+            snapshot['commands_by_name'] = dict(
+                [(name, dict([(k, v.snapshot())
+                              for k, v in histograms.items()]))
+                 for name, histograms in self._histograms.items()])
+        return snapshot
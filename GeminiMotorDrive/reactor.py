@@ -0,0 +1,995 @@
+# Copyright 2014-2016 Freja Nordsiek
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Module for driving many drives from a single thread.
+"""
+
+import time
+import socket
+import threading
+import collections
+import selectors
+import concurrent.futures
+
+import serial
+
+from .drivers import EchoReconciler, _ASCIIDriver, _EORScanner, \
+    _get_deadline, _deadline_passed, _DEFAULT_BAUDRATE, \
+    _COMMS_SETTINGS, _DEFAULT_COMMS_SETTINGS, _CONFIRM_TIMEOUT, \
+    _QUIET_TIME, _SYNC_TIMEOUT
+
+
+# The states of the command/response state machine of each drive.
+#
+# _IDLE       Nothing being done.
+# _WAITING    Waiting on a timer (pacing or retry delay).
+# _ECHO       Command written (in part), waiting for its echo.
+# _RESPONSE   Command entered, waiting for the End Of Response.
+# _DRAIN      Command entered, discarding its response till the drive
+#             goes quiet (the end of the response isn't known).
+_IDLE = 0
+_WAITING = 1
+_ECHO = 2
+_RESPONSE = 3
+_DRAIN = 4
+
+
+class _Command(object):
+    """ A single command of a job with the options to send it with.
+
+    An `eor` of ``None`` means that the end of the response isn't known
+    and it is discarded once the drive goes quiet. `sync` means that the
+    command is the 'TREV' query confirming that the drive has processed
+    everything sent before it, whose answer is recognized by
+    ``_SyncScanner``.
+
+    """
+    def __init__(self, c, timeout, max_retries, eor, check_echo,
+                 sync=False):
+        self.c = c
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.eor = eor
+        self.check_echo = check_echo
+        self.sync = sync
+
+
+class _SyncScanner(object):
+    """ Scanner for the answer to the 'TREV' query used to sync.
+
+    Recognizes the answer by its line ending, whatever the response
+    terminators are set to, the same way ``drivers.ASCII_RS232._sync``
+    does. Has the same interface as ``drivers._EORScanner``.
+
+    """
+    def __init__(self):
+        self._start = -1
+
+    def scan(self, buf):
+        """ Scans the buffer for the end of the answer.
+
+        Parameters
+        ----------
+        buf : bytes or bytearray
+            The whole response buffer so far.
+
+        Returns
+        -------
+        end : int
+            The index just past the end of the answer's first line in
+            `buf`, or ``-1`` if it hasn't arrived yet.
+
+        """
+        if self._start == -1:
+            self._start = buf.find(b'*TREV-G')
+            if self._start == -1:
+                return -1
+        ends = [i for i in (buf.find(b'\r', self._start),
+                            buf.find(b'\n', self._start)) if i != -1]
+        if len(ends) == 0:
+            return -1
+        return min(ends) + 1
+
+
+class _Job(object):
+    """ A command or sequence of commands submitted to a drive.
+
+    Parameters
+    ----------
+    commands : list of _Command
+        The commands to send, in order.
+    deadline : float or None
+        Overall deadline on the ``time.monotonic`` clock, or ``None``.
+    single : bool
+        Whether the result is the single response of a single command
+        (``send_command``) or the ``list`` of responses
+        (``send_commands``).
+    settle : bool, optional
+        Whether this is a job to set communications settings, whose
+        responses are thrown away. The result is ``None``.
+    close : bool, optional
+        Whether to close the drive's port when the job is done.
+
+    """
+    def __init__(self, commands, deadline, single, settle=False,
+                 close=False):
+        self.commands = commands
+        self.deadline = deadline
+        self.single = single
+        self.settle = settle
+        self.close = close
+        self.future = concurrent.futures.Future()
+        self.responses = []
+        self.index = 0
+
+
+class ReactorDrive(_ASCIIDriver):
+    """ A drive being driven by a ``DriveReactor``.
+
+    Talks to a Parker Motion Gemini drive in ASCII mode over RS232 the
+    same way ``drivers.ASCII_RS232`` does, except that the I/O is done
+    without blocking by the reactor thread. Commands are submitted with
+    ``submit_command`` and ``submit_commands``, which return futures for
+    the responses. ``send_command`` and ``send_commands`` are blocking
+    versions that take the same arguments as and return the same output
+    as the ones of ``drivers.ASCII_RS232``, so an instance can be used
+    as the driver of a ``GeminiMotorDrive.GeminiG6``.
+
+    Instances are made by ``DriveReactor.add_drive`` and should not be
+    made directly.
+
+    Commands are always written in bulk (see ``drivers.ASCII_RS232``),
+    with mistakes found by echo checking then fixed a character at a
+    time.
+
+    Notes
+    -----
+    The blocking methods must not be called from the reactor thread
+    (such as from a callback added to one of the futures), which would
+    deadlock.
+
+    See Also
+    --------
+    DriveReactor
+    drivers.ASCII_RS232
+
+    """
+    def __init__(self, reactor, ser, check_echo, chunk_size, pacing,
+                 min_gap, retry_delay, keep_raw=True):
+        _ASCIIDriver.__init__(self, check_echo, True, chunk_size,
+                              pacing, min_gap, retry_delay, keep_raw)
+        self._reactor = reactor
+        self._ser = ser
+        self._fd = ser.fileno()
+        self._char_time = 10.0 / ser.baudrate
+
+        # Submitted jobs are put on a queue (appending is thread safe)
+        # for the reactor thread to take off one at a time.
+        self._jobs = collections.deque()
+        self._job = None
+        self._closed = False
+        self._owns_port = True
+
+        # State machine state. _timer is the time on the
+        # time.monotonic clock at which _on_timer is to be called, or
+        # None if no timer is set.
+        self._state = _IDLE
+        self._timer = None
+        self._on_timer = None
+        self._events = selectors.EVENT_READ
+
+        # Output not yet written and input received for the current
+        # command.
+        self._out = bytearray()
+        self._in = bytearray()
+
+        # Per command state.
+        self._attempt = 0
+        self._response = None
+        self._echo = None
+        self._echo_pending = 0
+        self._echo_deadline = None
+        self._chunk_end = 0
+        self._echo_chunk = b''
+        self._scanner = None
+        self._eor_end = -1
+        self._quiet = max(_QUIET_TIME, 5*self._char_time)
+        self._drain_callback = None
+
+    @property
+    def closed(self):
+        """ Whether the drive has been closed.
+
+        bool
+
+        """
+        return self._closed
+
+    def _submit(self, job):
+        """ Puts a job on the queue and wakes the reactor.
+        """
+        if self._closed:
+            raise serial.SerialException('Drive is closed.')
+        self._jobs.append(job)
+        self._reactor._wake()
+        return job.future
+
+    def _make_command(self, command, immediate, timeout, max_retries,
+                      eor, check_echo=None):
+        """ Makes a _Command from the arguments of send_command.
+        """
+        if check_echo is None:
+            check_echo = self._check_echo
+        if eor is not None:
+            if isinstance(eor, str):
+                eor = tuple([eor])
+            eor = tuple([s.encode(encoding='ASCII') for s in eor])
+        return _Command(self._sanitize_command(command,
+                                               immediate=immediate),
+                        timeout, max_retries, eor, check_echo)
+
+    def submit_command(self, command, immediate=False, timeout=1.0,
+                       max_retries=0, eor=('\n', '\n- '),
+                       deadline=None):
+        """ Submits a single command to be sent to the drive.
+
+        Takes the same arguments as ``drivers.ASCII_RS232.send_command``
+        but returns right away with a future for the output. Commands
+        submitted to the same drive are done in the order they were
+        submitted.
+
+        Parameters
+        ----------
+        command : str
+            The command to send to the Gemini drive.
+        immediate : bool, optional
+            Whether to make it so the command is executed immediately or
+            not.
+        timeout : float or None, optional
+            Optional timeout in seconds to use when reading the
+            response. A negative value or ``None`` indicates that the
+            an infinite timeout should be used.
+        max_retries : int, optional
+            Maximum number of retries to do per command in the case of
+            errors.
+        eor : str or iterable of str, optional
+            ``str`` or an iterable of ``str`` that denote the allowed
+            End Of Response.
+        deadline : float or None, optional
+            Optional overall deadline on the ``time.monotonic`` clock
+            for the command including all retries. ``None`` means no
+            overall deadline.
+
+        Returns
+        -------
+        future : concurrent.futures.Future
+            Future for the processed response, which is the
+            ``drivers.Response`` described in
+            ``drivers.ASCII_RS232.send_command``.
+
+        Raises
+        ------
+        serial.SerialException
+            If the drive has been closed.
+
+        See Also
+        --------
+        send_command
+        drivers.ASCII_RS232.send_command
+
+        """
+        return self._submit(_Job([self._make_command(command, immediate,
+                                  timeout, max_retries, eor)],
+                                 deadline, True))
+
+    def submit_commands(self, commands, timeout=1.0, max_retries=1,
+                        eor=('\n', '\n- '), deadline=None):
+        """ Submits a sequence of commands to be sent to the drive.
+
+        Takes the same arguments as
+        ``drivers.ASCII_RS232.send_commands`` but returns right away
+        with a future for the output. No other commands are sent to the
+        drive in the middle of the sequence.
+
+        Parameters
+        ----------
+        commands : iterable of str
+            Iterable of commands to send to the drive. Each command must
+            be an ``str``.
+        timeout : float or None, optional
+            Optional timeout in seconds to use when reading the
+            response. A negative value or ``None`` indicates that the
+            an infinite timeout should be used.
+        max_retries : int, optional
+            Maximum number of retries to do per command in the case of
+            errors.
+        eor : str or iterable of str, optional
+            End Of Resonse. Either a single EOR used for all commands or
+            a ``list`` of EOR to use for each individual command.
+        deadline : float or None, optional
+            Optional overall deadline on the ``time.monotonic`` clock
+            for the whole sequence including all retries. ``None``
+            means no overall deadline.
+
+        Returns
+        -------
+        future : concurrent.futures.Future
+            Future for the ``list`` of processed responses of each
+            command in the order that they were done up to and including
+            the last command executed.
+
+        Raises
+        ------
+        serial.SerialException
+            If the drive has been closed.
+
+        See Also
+        --------
+        send_commands
+        drivers.ASCII_RS232.send_commands
+
+        """
+        commands = list(commands)
+        if not isinstance(eor, list):
+            eor = [eor]*len(commands)
+        return self._submit(_Job([self._make_command(command, False,
+                                  timeout, max_retries, eor[i])
+                                  for i, command in enumerate(commands)],
+                                 deadline, False))
+
+    def send_command(self, command, immediate=False, timeout=1.0,
+                     max_retries=0, eor=('\n', '\n- '), deadline=None):
+        """ Sends a single command to the drive and returns output.
+
+        Blocking version of ``submit_command``, which it takes the same
+        arguments as. Returns the same output as
+        ``drivers.ASCII_RS232.send_command``.
+
+        See Also
+        --------
+        submit_command
+        drivers.ASCII_RS232.send_command
+
+        """
+        return self.submit_command(command, immediate=immediate,
+                                   timeout=timeout,
+                                   max_retries=max_retries, eor=eor,
+                                   deadline=deadline).result()
+
+    def send_commands(self, commands, timeout=1.0, max_retries=1,
+                      eor=('\n', '\n- '), deadline=None):
+        """ Send a sequence of commands to the drive and collect output.
+
+        Blocking version of ``submit_commands``, which it takes the same
+        arguments as. Returns the same output as
+        ``drivers.ASCII_RS232.send_commands``.
+
+        See Also
+        --------
+        submit_commands
+        drivers.ASCII_RS232.send_commands
+
+        """
+        return self.submit_commands(commands, timeout=timeout,
+                                    max_retries=max_retries, eor=eor,
+                                    deadline=deadline).result()
+
+    def close(self):
+        """ Returns all communications settings to their defaults.
+
+        Queues up returning the drive's ASCII communications settings to
+        their default values, after which the drive is removed from the
+        reactor and its port is closed. Commands submitted before are
+        still done first.
+
+        Returns
+        -------
+        future : concurrent.futures.Future
+            Future that is done when the drive has been closed. Its
+            result is ``None``.
+
+        """
+        future = self._submit(self._make_settle_job(
+            _DEFAULT_COMMS_SETTINGS, close=True))
+        self._closed = True
+        return future
+
+    def _make_settle_job(self, commands, close=False):
+        """ Makes a job setting communications settings.
+
+        Like ``drivers.ASCII_RS232._set_comms_settings``, the response
+        to each command is discarded before sending the next so that it
+        doesn't get mixed up with the echo of the next, and then the
+        'TREV' query confirms that the drive has processed all of them.
+        The echo command (the first) cannot be echo checked since echo
+        may not be enabled yet.
+
+        """
+        cmds = [self._make_command(command, True, 1.0, 0, None,
+                                   check_echo=(self._check_echo
+                                               and i != 0))
+                for i, command in enumerate(commands)]
+        sync = self._make_command('TREV', True, _SYNC_TIMEOUT, 0, None)
+        sync.sync = True
+        cmds.append(sync)
+        return _Job(cmds, None, True, settle=True, close=close)
+
+    # The rest of the methods are only called from the reactor thread.
+
+    def _set_timer(self, when, callback):
+        """ Sets the timer to call `callback` at time `when`.
+        """
+        self._timer = when
+        self._on_timer = callback
+
+    def _write(self, data):
+        """ Writes data to the drive without blocking.
+        """
+        self._out += data
+        self._flush()
+
+    def _flush(self):
+        """ Writes as much of the pending output as the port will take.
+        """
+        if len(self._out) != 0:
+            n = self._ser.write(bytes(self._out))
+            if n:
+                del self._out[:n]
+        # Only ask to be told the port is writable while there is
+        # output left to write.
+        if len(self._out) != 0:
+            events = selectors.EVENT_READ | selectors.EVENT_WRITE
+        else:
+            events = selectors.EVENT_READ
+        if events != self._events:
+            self._events = events
+            self._reactor._selector.modify(self._fd, events, self)
+
+    def _on_readable(self, now):
+        """ Handles data arriving from the drive.
+        """
+        data = self._ser.read(max(1, self._ser.in_waiting))
+        if len(data) == 0:
+            return
+        if self._state == _ECHO:
+            self._echo.feed(data)
+            self._echo_pending -= len(data)
+            if self._echo_pending <= 0:
+                self._echo_step(now)
+        elif self._state == _RESPONSE:
+            self._in += data
+            self._eor_end = self._scanner.scan(self._in)
+            if self._eor_end != -1:
+                self._end_response(now)
+        elif self._state == _DRAIN:
+            # Wait till nothing more has arrived for a while.
+            self._set_timer(now + self._quiet, self._drain_callback)
+        # Anything else is junk that is thrown away.
+
+    def _fail(self, exc):
+        """ Fails the current and all queued jobs with an exception.
+        """
+        self._closed = True
+        self._timer = None
+        self._state = _IDLE
+        jobs = list(self._jobs)
+        self._jobs.clear()
+        if self._job is not None:
+            jobs.insert(0, self._job)
+            self._job = None
+        for job in jobs:
+            if not job.future.done():
+                job.future.set_exception(exc)
+        self._reactor._remove(self)
+
+    def _start_job(self, now):
+        """ Starts the next job in the queue, if there is one.
+        """
+        self._job = None
+        while len(self._jobs) != 0:
+            job = self._jobs.popleft()
+            # Cancelled jobs are skipped.
+            if job.future.set_running_or_notify_cancel():
+                self._job = job
+                break
+        if self._job is None:
+            self._state = _IDLE
+            return
+        self._attempt = 0
+        self._response = None
+        self._begin_attempt(now)
+
+    def _begin_attempt(self, now):
+        """ Starts an attempt at the current command after pacing it.
+        """
+        job = self._job
+        if _deadline_passed(job.deadline):
+            if self._response is None:
+                self._response = self._empty_response(
+                    job.commands[job.index].c.decode(errors='replace'))
+            self._end_command(now)
+            return
+        delay = self._get_pacing_delay()
+        if delay > 0:
+            self._state = _WAITING
+            when = now + delay
+            if job.deadline is not None:
+                when = min(when, job.deadline)
+            self._set_timer(when, self._send)
+        else:
+            self._send(now)
+
+    def _send(self, now):
+        """ Writes the current command to the drive.
+        """
+        cmd = self._job.commands[self._job.index]
+        c = cmd.c
+
+        # Throw out any junk from the drive before we start.
+        self._in = bytearray()
+
+        # Without echo checking, the command is just written and
+        # entered all at once.
+        if not cmd.check_echo:
+            self._write(c + b'\r')
+            self._begin_response(now)
+            return
+
+        # With echo checking, the first chunk is written and then the
+        # echo for it is waited for. The echo checking is done by
+        # _echo_step, which writes the following chunks and fixes any
+        # mistakes.
+        timeout = cmd.timeout
+        if timeout is not None and timeout <= 0:
+            timeout = None
+        self._echo_deadline = _get_deadline(timeout, self._job.deadline)
+        self._echo = EchoReconciler(c)
+        self._chunk_end = 0
+        self._state = _ECHO
+        self._write_chunk(now, c[:self._get_chunk_size(c)])
+        self._chunk_end = len(self._echo_chunk)
+
+    def _write_chunk(self, now, chunk):
+        """ Writes a chunk of a command and waits for its echo.
+        """
+        self._echo_chunk = chunk
+        self._echo_pending = len(chunk)
+        self._write(chunk)
+        self._set_timer(_get_deadline(2*len(chunk)*self._char_time
+                                      + 0.02, self._echo_deadline),
+                        self._echo_step)
+
+    def _echo_step(self, now):
+        """ Checks the echo and writes the next chunk or fix.
+
+        Called when the echo of everything written has arrived or it
+        took too long.
+
+        """
+        c = self._job.commands[self._job.index].c
+        echo = self._echo
+
+        # Enter the command if it is right or we ran out of time to fix
+        # it.
+        if echo.done or _deadline_passed(self._echo_deadline):
+            self._write(b'\r')
+            self._begin_response(now)
+            return
+
+        # If everything written so far was echoed right, write the next
+        # chunk. Otherwise, fix it a character at a time like
+        # ASCII_RS232 does.
+        if self._chunk_end < len(c) and echo.matches(self._chunk_end):
+            chunk = c[self._chunk_end:(self._chunk_end
+                                       + self._get_chunk_size(c))]
+            self._chunk_end += len(chunk)
+            self._write_chunk(now, chunk)
+        else:
+            self._write_chunk(now, echo.next_byte())
+
+    def _begin_response(self, now):
+        """ Starts waiting for the response to the current command.
+        """
+        cmd = self._job.commands[self._job.index]
+
+        # Settings commands have responses whose end isn't known, which
+        # are discarded once the drive goes quiet.
+        if cmd.eor is None and not cmd.sync:
+            self._response = None
+            self._begin_drain(now, _CONFIRM_TIMEOUT, self._end_command)
+            return
+        self._state = _RESPONSE
+        self._in = bytearray()
+        if cmd.sync:
+            self._scanner = _SyncScanner()
+        else:
+            self._scanner = _EORScanner(cmd.eor)
+        self._eor_end = -1
+        deadline = _get_deadline(cmd.timeout, self._job.deadline)
+        if deadline is None:
+            self._timer = None
+        else:
+            self._set_timer(deadline, self._end_response)
+
+    def _begin_drain(self, now, wait, callback):
+        """ Discards everything the drive sends till it goes quiet.
+
+        Waits up to `wait` seconds for the drive to start sending
+        something and then discards everything it sends till no more
+        has arrived for a while, after which `callback` is called.
+
+        """
+        self._state = _DRAIN
+        self._in = bytearray()
+        self._drain_callback = callback
+        self._set_timer(now + wait, callback)
+
+    def _end_response(self, now):
+        """ Processes the response (complete or not) to a command.
+        """
+        cmd = self._job.commands[self._job.index]
+        self._timer = None
+        self._last_response_time = now
+
+        # The rest of the answer to the sync query is discarded so that
+        # it can't get mixed up with the next echo.
+        if cmd.sync:
+            self._in = bytearray()
+            self._response = None
+            self._begin_drain(now, self._quiet, self._end_command)
+            return
+
+        # Remove anything after the EOR if there is one.
+        buf = self._in
+        if self._eor_end != -1:
+            del buf[self._eor_end:]
+        self._in = bytearray()
+
+        c = cmd.c.decode(errors='replace')
+        output = buf.decode(errors='replace')
+        if self._check_echo:
+            output = c + output
+        self._response = self._make_response(c, output)
+
+        # Retry after the retry delay if there was an error and retries
+        # are left.
+        if not self._response.ok \
+                and self._attempt < cmd.max_retries:
+            self._attempt += 1
+            self._state = _WAITING
+            self._set_timer(now + self._retry_delay, self._begin_attempt)
+        else:
+            self._end_command(now)
+
+    def _end_command(self, now):
+        """ Finishes the current command and moves onto the next.
+        """
+        job = self._job
+        response = self._response
+        self._response = None
+        self._attempt = 0
+        job.index += 1
+        if response is not None:
+            job.responses.append(response)
+            error = self.command_error(response)
+        else:
+            error = False
+
+        # The sequence stops at the first command with an error.
+        if not error and job.index < len(job.commands):
+            self._begin_attempt(now)
+        else:
+            self._end_job(now)
+
+    def _end_job(self, now):
+        """ Hands the output of the current job to its future.
+        """
+        job = self._job
+        self._timer = None
+        self._in = bytearray()
+        if job.settle:
+            result = None
+        elif job.single:
+            result = job.responses[0]
+        else:
+            result = job.responses
+        if job.close:
+            self._closed = True
+            self._job = None
+            self._reactor._remove(self)
+        job.future.set_result(result)
+        if not job.close:
+            self._start_job(now)
+
+
+class DriveReactor(object):
+    """ Drives many Parker Motion Gemini drives from a single thread.
+
+    Talking to a drive is mostly waiting for it, so rather than using
+    one driver and thread per drive, the serial ports of all the drives
+    are registered with a ``selectors`` selector (epoll on Linux) and a
+    single thread runs the command/response state machine of every
+    drive without blocking. Commands are submitted from any thread and
+    their responses are handed back through futures. Each drive does its
+    commands in the order they were submitted, while the drives all run
+    at the same time.
+
+    The reactor thread is started when the reactor is made. The reactor
+    can also be used as a context manager, which closes it (and all its
+    drives) on exit.
+
+    Notes
+    -----
+    Only ports with a file descriptor can be used, which means serial
+    ports on POSIX systems.
+
+    See Also
+    --------
+    ReactorDrive
+    drivers.ASCII_RS232
+    selectors
+
+    Examples
+    --------
+
+    Energizing the motors of two drives at the same time.
+
+    >>> from GeminiMotorDrive.reactor import DriveReactor
+    >>> with DriveReactor() as reactor:
+    ...     drives = [reactor.add_drive(port)
+    ...               for port in ('/dev/ttyS1', '/dev/ttyS2')]
+    ...     futures = [drive.submit_command('DRIVE1')
+    ...                for drive in drives]
+    ...     for f in futures:
+    ...         print(f.result())
+    Response('DRIVE1', 'DRIVE1\\r\\r\\n', 'DRIVE1', None, [])
+    Response('DRIVE1', 'DRIVE1\\r\\r\\n', 'DRIVE1', None, [])
+
+    """
+    def __init__(self):
+        self._selector = selectors.DefaultSelector()
+        self._drives = set()
+
+        # Functions to run in the reactor thread are put on a queue, and
+        # the reactor is woken up from other threads by writing to a
+        # socket pair.
+        self._calls = collections.deque()
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._selector.register(self._wake_r, selectors.EVENT_READ,
+                                None)
+
+        self._running = True
+        self._thread = threading.Thread(target=self._run,
+                                        name='DriveReactor')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def drives(self):
+        """ The drives currently in the reactor.
+
+        list of ReactorDrive
+
+        """
+        return list(self._drives)
+
+    def add_drive(self, port, check_echo=True, chunk_size=None,
+                  pacing='response', min_gap=None, retry_delay=0.25,
+                  keep_raw=True):
+        """ Opens a drive and adds it to the reactor.
+
+        Opens the serial port the drive is on and queues up setting the
+        drive's ASCII communications settings to the ones used while
+        connected, which takes a little while. Commands can be submitted
+        to the returned drive right away, and will be done once the
+        settings have been set.
+
+        Parameters
+        ----------
+        port : serial port string or transport
+            The serial port (RS232) that the Gemini drive is connected
+            to. It can also be any URL supported by
+            ``serial.serial_for_url`` whose port has a file descriptor,
+            or an already open transport with a file descriptor (such
+            as a ``transports.SocketTransport``), in which case it is
+            made non-blocking and is left open when the drive is
+            closed.
+        check_echo : bool, optional
+            Whether the echoing of the commands as they are being
+            written to the drive should be used to correct mistakes in
+            what the drive is seeing or not.
+        chunk_size : int or None, optional
+            Maximum number of characters to write at once. ``None``
+            means the whole command is written at once.
+        pacing : {'response', 'fixed'}, optional
+            How commands are paced. See ``drivers.ASCII_RS232``.
+        min_gap : float or None, optional
+            Minimum time in seconds between receiving the response to a
+            command and sending the next command. ``None`` means to use
+            the default for the `pacing`.
+        retry_delay : float, optional
+            Time in seconds to wait before retrying a command that had
+            an error.
+        keep_raw : bool, optional
+            Whether to keep the full response from the drive in each
+            ``drivers.Response`` or not.
+
+        Returns
+        -------
+        drive : ReactorDrive
+            The drive.
+
+        Raises
+        ------
+        serial.SerialException
+            If `port` does not correspond to an available RS232 port or
+            can't be opened, or the reactor is closed.
+        ValueError
+            If `pacing` is not one of the allowed values or the port
+            doesn't have a file descriptor.
+
+        """
+        if not self._running:
+            raise serial.SerialException('Reactor is closed.')
+        # A port that was given belongs to the caller, and so isn't
+        # closed when the drive is.
+        owns_port = not (hasattr(port, 'read') and hasattr(port, 'write'))
+        if not owns_port:
+            ser = port
+            ser.timeout = 0
+            ser.write_timeout = 0
+        else:
+            ser = serial.serial_for_url(port,
+                                        baudrate=_DEFAULT_BAUDRATE,
+                                        bytesize=serial.EIGHTBITS,
+                                        parity=serial.PARITY_NONE,
+                                        stopbits=serial.STOPBITS_ONE,
+                                        timeout=0, write_timeout=0,
+                                        xonxoff=True, rtscts=False,
+                                        dsrdtr=False)
+        try:
+            ser.fileno()
+        except Exception:
+            if owns_port:
+                ser.close()
+            raise ValueError('port must have a file descriptor.')
+        try:
+            drive = ReactorDrive(self, ser, check_echo, chunk_size,
+                                 pacing, min_gap, retry_delay, keep_raw)
+        except ValueError:
+            if owns_port:
+                ser.close()
+            raise
+        drive._owns_port = owns_port
+
+        # The drive is registered by the reactor thread, after which the
+        # job setting the communications settings is submitted so that
+        # it is first in line.
+        def register():
+            self._selector.register(drive._fd, selectors.EVENT_READ,
+                                    drive)
+            self._drives.add(drive)
+        drive._jobs.append(drive._make_settle_job(_COMMS_SETTINGS))
+        self._call(register)
+        return drive
+
+    def close(self):
+        """ Closes all the drives and stops the reactor.
+
+        Returns the communications settings of all the drives to their
+        defaults (at the same time), closes their ports, and then stops
+        the reactor thread.
+
+        """
+        if not self._running:
+            return
+        futures = [drive.close() for drive in list(self._drives)
+                   if not drive.closed]
+        concurrent.futures.wait(futures)
+        self._running = False
+        self._wake()
+        self._thread.join()
+        self._selector.close()
+        self._wake_r.close()
+        self._wake_w.close()
+
+    def _wake(self):
+        """ Wakes the reactor thread up.
+        """
+        try:
+            self._wake_w.send(b'\x00')
+        except (BlockingIOError, OSError):
+            # The socket is full, which means the reactor will wake up
+            # anyways, or closed.
+            pass
+
+    def _call(self, func):
+        """ Runs a function in the reactor thread.
+        """
+        self._calls.append(func)
+        self._wake()
+
+    def _remove(self, drive):
+        """ Removes a drive from the reactor and closes its port.
+
+        The port is only closed if it was opened by ``add_drive``. Only
+        called from the reactor thread.
+
+        """
+        if drive in self._drives:
+            self._drives.discard(drive)
+            self._selector.unregister(drive._fd)
+        if drive._owns_port:
+            drive._ser.close()
+
+    def _run(self):
+        """ The reactor loop.
+        """
+        while self._running:
+            # Wait till something is readable or writable or the next
+            # timer of any drive is due.
+            timers = [drive._timer for drive in self._drives
+                      if drive._timer is not None]
+            if len(self._calls) != 0:
+                timeout = 0
+            elif len(timers) != 0:
+                timeout = max(0.0, min(timers) - time.monotonic())
+            else:
+                timeout = None
+            events = self._selector.select(timeout)
+
+            # Run the calls from other threads.
+            while len(self._calls) != 0:
+                self._calls.popleft()()
+
+            now = time.monotonic()
+            for key, mask in events:
+                drive = key.data
+                if drive is None:
+                    try:
+                        self._wake_r.recv(4096)
+                    except (BlockingIOError, OSError):
+                        pass
+                    continue
+                if drive not in self._drives:
+                    continue
+                try:
+                    if mask & selectors.EVENT_WRITE:
+                        drive._flush()
+                    if mask & selectors.EVENT_READ:
+                        drive._on_readable(now)
+                except (serial.SerialException, OSError) as exc:
+                    drive._fail(exc)
+
+            # Fire the due timers and start the next job on idle drives.
+            now = time.monotonic()
+            for drive in list(self._drives):
+                try:
+                    if drive._timer is not None and now >= drive._timer:
+                        callback = drive._on_timer
+                        drive._timer = None
+                        callback(now)
+                    if drive._state == _IDLE and drive._job is None \
+                            and len(drive._jobs) != 0:
+                        drive._start_job(now)
+                except (serial.SerialException, OSError) as exc:
+                    drive._fail(exc)
@@ -0,0 +1,280 @@
+# Copyright 2014-2016 Freja Nordsiek
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Module for the policies on retrying commands.
+"""
+
+import time
+import random
+
+
+# The states of the circuit breaker.
+#
+# CLOSED     Commands are sent normally.
+# OPEN       The drive isn't responding and commands fail without being
+#            sent.
+# HALF_OPEN  The drive gets one command to see if it is responding again.
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half-open'
+
+
+class RetryBudget(object):
+    """ Budget of retries shared by the commands of a single call.
+
+    Parameters
+    ----------
+    retries : int or None, optional
+        The number of retries that can be done. ``None`` means there is
+        no limit.
+
+    Attributes
+    ----------
+    remaining : int or None
+
+    """
+    def __init__(self, retries=None):
+        self._remaining = retries
+
+    @property
+    def remaining(self):
+        """ The number of retries left.
+
+        ``int`` or ``None``
+
+        ``None`` means there is no limit.
+
+        """
+        return self._remaining
+
+    def take(self):
+        """ Takes a retry from the budget.
+
+        Returns
+        -------
+        allowed : bool
+            Whether there was a retry left to take.
+
+        """
+        if self._remaining is None:
+            return True
+        if self._remaining <= 0:
+            return False
+        self._remaining -= 1
+        return True
+
+
+class RetryPolicy(object):
+    """ Policy on retrying commands sent to a drive.
+
+    Decides how long to wait before each retry of a command, how many
+    retries all the commands of a single ``send_command`` or
+    ``send_commands`` call can do in total, how long such a call can
+    take at most, and when to stop sending commands to a drive that
+    isn't responding at all.
+
+    The wait before the n'th retry of a command is ``delay`` times
+    ``factor**(n - 1)`` (exponential backoff), capped at `max_delay`,
+    and then shortened by a random fraction of up to `jitter` of it so
+    that retries on several drives don't stay in lock step.
+
+    The circuit breaker counts the attempts in a row that the drive
+    didn't respond to in time (a response with an error counts as the
+    drive responding). Once there have been `failure_threshold` of them,
+    the circuit opens and commands fail straight away without being
+    sent. After `reset_time`, a single command is let through
+    (half-open) and the circuit closes again if the drive responds to
+    it, or stays open for another `reset_time` if it doesn't. If nothing
+    is recorded for the probe, another one is let through once
+    `reset_time` has passed since it started.
+
+    Parameters
+    ----------
+    delay : float, optional
+        Time in seconds to wait before the first retry of a command.
+    factor : float, optional
+        Factor the wait grows by with each further retry of the same
+        command.
+    max_delay : float, optional
+        Longest time in seconds to wait before a retry.
+    jitter : float, optional
+        Largest fraction of the wait to randomly take off of it.
+    budget : int or None, optional
+        Total number of retries that all the commands of a single call
+        can do. ``None`` means no limit beyond each command's own
+        `max_retries`.
+    max_elapsed : float or None, optional
+        Longest time in seconds a single call can take, including all
+        retries, which is combined with the call's own deadline.
+        ``None`` means no limit.
+    failure_threshold : int or None, optional
+        Number of attempts in a row the drive didn't respond to after
+        which the circuit opens. ``None`` disables the circuit breaker.
+    reset_time : float, optional
+        Time in seconds the circuit stays open before letting a command
+        through to see if the drive is responding again.
+
+    Attributes
+    ----------
+    state : {'closed', 'open', 'half-open'}
+
+    See Also
+    --------
+    drivers.ASCII_RS232
+
+    Examples
+    --------
+
+    Give a whole upload at most 5 retries and 30 seconds, and fail fast
+    after 3 commands in a row get no response.
+
+    >>> from GeminiMotorDrive.drivers import ASCII_RS232
+    >>> from GeminiMotorDrive.retry import RetryPolicy
+    >>> policy = RetryPolicy(budget=5, max_elapsed=30.0,
+    ...                      failure_threshold=3)
+    >>> ar = ASCII_RS232('/dev/ttyS1', retry_policy=policy)
+
+    """
+    def __init__(self, delay=0.25, factor=2.0, max_delay=2.0,
+                 jitter=0.1, budget=None, max_elapsed=None,
+                 failure_threshold=5, reset_time=2.0):
+        self.delay = max(0.0, delay)
+        self.factor = factor
+        self.max_delay = max_delay
+        self.jitter = min(1.0, max(0.0, jitter))
+        self.budget = budget
+        self.max_elapsed = max_elapsed
+        self.failure_threshold = failure_threshold
+        self.reset_time = reset_time
+        self._failures = 0
+        self._state = CLOSED
+        self._opened_at = None
+        self._probed_at = None
+
+    @property
+    def state(self):
+        """ The state of the circuit breaker.
+
+        {'closed', 'open', 'half-open'}
+
+        """
+        return self._state
+
+    def backoff(self, retry):
+        """ Gets how long to wait before a retry.
+
+        Parameters
+        ----------
+        retry : int
+            Which retry of the command it is, starting from 1.
+
+        Returns
+        -------
+        delay : float
+            Time in seconds to wait.
+
+        """
+        d = min(self.max_delay,
+                self.delay * self.factor**max(0, retry - 1))
+        return d * (1.0 - self.jitter * random.random())
+
+    def new_budget(self):
+        """ Makes the retry budget for a single call.
+
+        Returns
+        -------
+        budget : RetryBudget
+            The retry budget.
+
+        """
+        return RetryBudget(self.budget)
+
+    def get_deadline(self, deadline=None):
+        """ Gets the deadline for a single call starting now.
+
+        Parameters
+        ----------
+        deadline : float or None, optional
+            The call's own deadline on the ``time.monotonic`` clock, or
+            ``None`` for no deadline.
+
+        Returns
+        -------
+        deadline : float or None
+            The earlier of `deadline` and `max_elapsed` from now, or
+            ``None`` if there is no deadline at all.
+
+        """
+        if self.max_elapsed is None:
+            return deadline
+        elapsed_deadline = time.monotonic() + self.max_elapsed
+        if deadline is None or elapsed_deadline < deadline:
+            return elapsed_deadline
+        return deadline
+
+    def allow(self):
+        """ Checks whether a command can be sent to the drive.
+
+        Moves an open circuit to half-open once `reset_time` has
+        passed, letting a single command through. A half-open circuit
+        lets another command through once `reset_time` has passed since
+        the last one was let through, in case nothing was recorded for
+        it.
+
+        Returns
+        -------
+        allowed : bool
+            Whether the command can be sent.
+
+        """
+        if self._state == CLOSED:
+            return True
+        now = time.monotonic()
+        if self._state == OPEN:
+            since = self._opened_at
+        else:
+            since = self._probed_at
+        if now - since >= self.reset_time:
+            self._state = HALF_OPEN
+            self._probed_at = now
+            return True
+        return False
+
+    def record(self, responded):
+        """ Records whether the drive responded to an attempt.
+
+        Parameters
+        ----------
+        responded : bool
+            Whether the drive's whole response arrived in time.
+
+        """
+        if responded:
+            self._failures = 0
+            self._state = CLOSED
+            return
+        self._failures += 1
+        if self._state == HALF_OPEN or (
+                self.failure_threshold is not None
+                and self._failures >= self.failure_threshold):
+            self._state = OPEN
+            self._opened_at = time.monotonic()
+
+    def reset(self):
+        """ Closes the circuit and forgets the failures.
+        """
+        self._failures = 0
+        self._state = CLOSED
+        self._opened_at = None
+        self._probed_at = None
@@ -0,0 +1,923 @@
+# Copyright 2014-2016 Freja Nordsiek
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Module for simulating a drive without any hardware.
+
+Provides a simulated Parker Motion Gemini GV-6/GT-6 drive speaking the
+ASCII protocol over RS232 that ``drivers`` relies on, so that the
+drivers and ``GeminiMotorDrive.GeminiG6`` can be exercised and
+benchmarked without a drive. It can be served on a pseudo-terminal or
+a local TCP port standing in for a terminal server.
+
+"""
+
+import os
+import math
+import time
+import random
+import select
+import socket
+import threading
+import collections
+
+
+# The default baud rate of the drive.
+_DEFAULT_BAUDRATE = 9600
+
+# The baud rates the drive supports.
+_BAUDRATES = (9600, 19200, 38400, 57600, 115200)
+
+# The default revision string of the simulated drive.
+_DEFAULT_REVISION = 'GV6-L3E_D1.50_F1.00'
+
+# The commands the simulator understands. A command is matched to the
+# longest one of these it starts with.
+_KEYWORDS = ('A', 'AD', 'BAUD', 'BOT', 'C', 'D', 'DEF', 'DEL',
+             'DMEPIT', 'DMVLIM', 'DRIVE', 'ECHO', 'END', 'EOL', 'EOT',
+             'ERES', 'ERRBAD', 'ERRLVL', 'ERROK', 'GO', 'GOBUF',
+             'GOWHEN', 'K', 'PRUN', 'PS', 'RESET', 'RUN', 'S', 'T',
+             'TAS', 'TPROG', 'TREV', 'V', 'VF', 'WAIT')
+
+# The communications settings and their default values (from the
+# manual). Each is a list of character codes with 0 meaning none.
+_DEFAULT_COMMS_SETTINGS = {'ECHO': [1], 'ERRLVL': [4],
+                           'BOT': [0, 0, 0], 'EOT': [13, 0, 0],
+                           'EOL': [13, 10, 0],
+                           'ERRBAD': [13, 10, 63, 32],
+                           'ERROK': [13, 10, 62, 32]}
+
+# The parameters, their types, formats, and default values.
+_PARAMETERS = {'DRIVE': (int, '{0:d}', 0),
+               'ERES': (int, '{0:d}', 4000),
+               'DMEPIT': (float, '{0:.2f}', 42.0),
+               'DMVLIM': (float, '{0:.4f}', 5.0),
+               'A': (float, '{0:.4f}', 10.0),
+               'AD': (float, '{0:.4f}', 0.0),
+               'V': (float, '{0:.4f}', 1.0),
+               'VF': (float, '{0:.4f}', 0.0),
+               'D': (int, '{0:d}', 0)}
+
+# The bits of the axis status (1 based like the manual).
+_TAS_MOVING = 1
+_TAS_NEGATIVE = 2
+_TAS_SHUT_DOWN = 13
+
+
+def _move_time(distance, acceleration, deceleration, velocity):
+    """ Gets how long a trapezoidal move takes.
+
+    Parameters
+    ----------
+    distance : float
+        The distance to move in revolutions.
+    acceleration : float
+        The acceleration in revolutions per second squared.
+    deceleration : float
+        The deceleration in revolutions per second squared.
+    velocity : float
+        The maximum velocity in revolutions per second.
+
+    Returns
+    -------
+    duration : float
+        The duration of the move in seconds.
+
+    """
+    distance = abs(distance)
+    if distance == 0 or velocity <= 0 or acceleration <= 0 \
+            or deceleration <= 0:
+        return 0.0
+    # Distances covered while accelerating to and decelerating from the
+    # maximum velocity. If they add up to more than the distance, the
+    # move is triangular and never reaches the maximum velocity.
+    d_acc = velocity**2 / (2*acceleration)
+    d_dec = velocity**2 / (2*deceleration)
+    if d_acc + d_dec <= distance:
+        return (velocity/acceleration + velocity/deceleration
+                + (distance - d_acc - d_dec) / velocity)
+    peak = math.sqrt(2 * distance * acceleration * deceleration
+                     / (acceleration + deceleration))
+    return peak/acceleration + peak/deceleration
+
+
+class SimulatedDrive(object):
+    """ Simulated Parker Motion Gemini GV-6/GT-6 drive.
+
+    Simulates the ASCII protocol of the drive as seen from its RS232
+    port without doing any I/O itself. Bytes from the host are given to
+    ``write`` and the bytes the drive sends back are gotten with
+    ``read``. Output becomes available over time according to the
+    `char_time` and `response_time`, measured with `clock`.
+
+    Simulated are the character echo (``ECHO``) and backspace handling,
+    the ``BOT``, ``EOT``, ``EOL``, ``ERRBAD``, ``ERROK``, ``ERRLVL``,
+    and ``BAUD`` settings, the ``TREV`` and ``TAS`` queries, the
+    ``DRIVE``, ``ERES``, ``DMEPIT``, ``DMVLIM``, ``A``, ``AD``, ``V``,
+    ``VF``, and ``D`` parameters, programs and profiles with ``DEF``,
+    ``END``, ``DEL``, ``TPROG``, ``RUN``, and ``PRUN``, and moves with
+    ``GO``, ``GOBUF``, ``WAIT``, ``T``, ``K``, and ``S``. Anything else
+    gets the '*UNDEFINED_LABEL' error.
+
+    Parameters
+    ----------
+    char_time : float, optional
+        Time in seconds it takes to send each character back to the
+        host. ``10.0 / 9600`` models a real 9600 baud line, and 0 makes
+        everything available right away.
+    response_time : float, optional
+        Time in seconds the drive takes to start responding to a
+        command after it is entered.
+    error_rate : float, optional
+        Probability that each character received (other than carriage
+        returns and backspaces) is corrupted into a different one, which
+        is what the drive will see and echo.
+    seed : int or None, optional
+        Seed for the random number generator used for the errors, which
+        makes them deterministic.
+    clock : callable, optional
+        Function returning the current time in seconds.
+    revision : str, optional
+        The revision returned by 'TREV', without the leading '*TREV-'.
+
+    Attributes
+    ----------
+    baudrate : int
+    parameters : dict
+        The values of the parameters by name.
+    programs : dict
+        The commands (``list`` of ``str``) of the programs and profiles
+        by name (e.g. ``'PROG1'``).
+    comms_settings : dict
+        The communications settings by name. Each is a ``list`` of
+        ``int``.
+    commands : int
+        Number of commands executed.
+
+    Notes
+    -----
+    Programs and profiles are executed right away as far as the state
+    of the drive is concerned, but their output and the moves they make
+    follow the simulated timing (``WAIT`` waits for the motion to
+    finish and ``T`` waits the given time).
+
+    See Also
+    --------
+    SimulatedSerial
+    PtyDrive
+
+    Examples
+    --------
+
+    >>> from GeminiMotorDrive.simulator import SimulatedDrive
+    >>> drive = SimulatedDrive()
+    >>> drive.write(b'ERES\\r')
+    5
+    >>> drive.read()
+    b'ERES\\r*ERES4000\\r\\n\\r\\n\\r\\r\\n> '
+
+    """
+    def __init__(self, char_time=0.0, response_time=0.0, error_rate=0.0,
+                 seed=None, clock=time.monotonic,
+                 revision=_DEFAULT_REVISION):
+        self._char_time = max(0.0, char_time)
+        self._response_time = max(0.0, response_time)
+        self._error_rate = error_rate
+        self._random = random.Random(seed)
+        self._clock = clock
+        self._revision = revision
+        self._lock = threading.RLock()
+
+        self.baudrate = _DEFAULT_BAUDRATE
+        self.comms_settings = dict([(k, list(v)) for k, v
+                                    in _DEFAULT_COMMS_SETTINGS.items()])
+        self.parameters = dict([(k, v[2]) for k, v
+                                in _PARAMETERS.items()])
+        self.programs = dict()
+        self.commands = 0
+
+        # The command being received, the program or profile being
+        # defined (None if not defining one), and the motion timeline
+        # as the times the current move started and will end and its
+        # direction.
+        self._line = bytearray()
+        self._defining = None
+        self._move_start = 0.0
+        self._move_end = 0.0
+        self._move_negative = False
+
+        # Output is a queue of chunks, each being the time its first
+        # character starts being sent, the data, and the baud rate it
+        # is sent at. _line_free is the time the line will be done
+        # sending everything queued.
+        self._out = collections.deque()
+        self._line_free = 0.0
+
+    def _emit(self, data, at):
+        """ Queues output to be sent no earlier than time `at`.
+        """
+        if len(data) == 0:
+            return
+        start = max(at, self._line_free)
+        self._out.append([start, bytes(data), self.baudrate])
+        self._line_free = start + len(data) * self._char_time
+
+    def _available(self, chunk, now):
+        """ Number of bytes of an output chunk sent by time `now`.
+        """
+        if self._char_time == 0:
+            return len(chunk[1]) if now >= chunk[0] else 0
+        n = int((now - chunk[0]) / self._char_time)
+        return max(0, min(len(chunk[1]), n))
+
+    @property
+    def in_waiting(self):
+        """ The number of bytes sent by the drive so far not yet read.
+
+        ``int``
+
+        """
+        with self._lock:
+            now = self._clock()
+            total = 0
+            for chunk in self._out:
+                n = self._available(chunk, now)
+                total += n
+                if n < len(chunk[1]):
+                    break
+            return total
+
+    def next_output_time(self):
+        """ Gets when the next byte of output will have been sent.
+
+        Returns
+        -------
+        when : float or None
+            The time on `clock`, or ``None`` if there is no output
+            queued.
+
+        """
+        with self._lock:
+            if len(self._out) == 0:
+                return None
+            chunk = self._out[0]
+            return chunk[0] + self._char_time
+
+    def read(self, size=None, baudrate=None):
+        """ Reads the output the drive has sent so far.
+
+        Parameters
+        ----------
+        size : int or None, optional
+            Maximum number of bytes to read. ``None`` means no limit.
+        baudrate : int or None, optional
+            The baud rate of the port doing the reading. Output sent at
+            a different baud rate is lost. ``None`` means to not check.
+
+        Returns
+        -------
+        data : bytes
+            The output.
+
+        """
+        with self._lock:
+            now = self._clock()
+            data = bytearray()
+            while len(self._out) != 0 \
+                    and (size is None or len(data) < size):
+                chunk = self._out[0]
+                n = self._available(chunk, now)
+                if size is not None:
+                    n = min(n, size - len(data))
+                if n == 0:
+                    break
+                if baudrate is None or baudrate == chunk[2]:
+                    data += chunk[1][:n]
+                # Take what was read off the chunk, keeping its timing.
+                if n == len(chunk[1]):
+                    self._out.popleft()
+                else:
+                    chunk[1] = chunk[1][n:]
+                    chunk[0] += n * self._char_time
+            return bytes(data)
+
+    def write(self, data, baudrate=None):
+        """ Receives bytes from the host.
+
+        Parameters
+        ----------
+        data : bytes
+            The bytes.
+        baudrate : int or None, optional
+            The baud rate of the port doing the writing. Bytes written
+            at a different baud rate are lost. ``None`` means to not
+            check.
+
+        Returns
+        -------
+        n : int
+            The number of bytes written, which is all of them.
+
+        """
+        with self._lock:
+            if baudrate is not None and baudrate != self.baudrate:
+                return len(data)
+            now = self._clock()
+            echo = self.comms_settings['ECHO'][0] != 0
+            for b in bytearray(data):
+                if b == 13:
+                    if echo:
+                        self._emit(b'\r', now)
+                    line = bytes(self._line)
+                    self._line = bytearray()
+                    self._enter(line.decode('ASCII', 'replace'), now)
+                elif b == 8:
+                    # A backspace only does something (and is only
+                    # echoed) if there is something to delete.
+                    if len(self._line) != 0:
+                        del self._line[-1]
+                        if echo:
+                            self._emit(b'\x08', now)
+                else:
+                    if self._error_rate > 0 \
+                            and self._random.random() < self._error_rate:
+                        b = self._random.choice(
+                            [c for c in range(33, 127) if c != b])
+                    self._line.append(b)
+                    if echo:
+                        self._emit(bytes([b]), now)
+                echo = self.comms_settings['ECHO'][0] != 0
+            return len(data)
+
+    def _chars(self, name):
+        """ Gets the bytes of a communications setting.
+        """
+        return bytes([c for c in self.comms_settings[name] if c != 0])
+
+    def _enter(self, line, now):
+        """ Executes an entered command and sends the response.
+        """
+        immediate = line.startswith('!')
+        command = line.lstrip('!').strip()
+        self.commands += 1
+        at = now + self._response_time
+
+        # Commands that aren't immediate are stored while defining a
+        # program or profile, till the 'END'.
+        if self._defining is not None and not immediate \
+                and command != 'END':
+            if len(command) != 0:
+                self.programs[self._defining].append(command)
+            self._respond([], None, at)
+            return
+
+        # Run programs and profiles are special since their output is
+        # spread out over time.
+        keyword, argument = self._split(command)
+        if keyword in ('RUN', 'PRUN'):
+            name = argument.strip()
+            if name not in self.programs:
+                self._respond([], 'UNDEFINED_LABEL', at)
+                return
+            at = self._run(self.programs[name], at,
+                           output=(keyword == 'RUN'))
+            if keyword == 'RUN':
+                self._emit(b'*END\n', at)
+            self._respond([], None, at)
+            return
+
+        lines, error, at = self._execute(keyword, argument, at)
+        self._respond(lines, error, at)
+
+        # Change the baud rate after the response has been sent.
+        if keyword == 'BAUD' and error is None and len(argument) != 0:
+            self.baudrate = int(argument)
+
+    def _respond(self, lines, error, at):
+        """ Sends the response to a command.
+
+        The response is any error line and the lines of output, each
+        followed by the EOL characters, then an empty line and the EOT
+        characters, and then the prompt. The prompt is '- ' while
+        defining a program or profile, and the ERRBAD or ERROK
+        characters otherwise.
+
+        """
+        eol = self._chars('EOL')
+        out = bytearray(self._chars('BOT'))
+        if error is not None:
+            out += b'*' + error.encode('ASCII') + eol
+        for line in lines:
+            out += line.encode('ASCII') + eol
+        out += eol + self._chars('EOT')
+        if self._defining is not None:
+            out += b'- '
+        elif error is not None:
+            out += self._chars('ERRBAD')
+        else:
+            out += self._chars('ERROK')
+        self._emit(out, at)
+
+    def _split(self, command):
+        """ Splits a command into its keyword and argument.
+
+        Any leading axis number is dropped. The keyword is ``None`` if
+        it isn't a known one.
+
+        """
+        command = command.lstrip('0123456789')
+        keyword = None
+        for k in _KEYWORDS:
+            if command.startswith(k) \
+                    and (keyword is None or len(k) > len(keyword)):
+                keyword = k
+        if keyword is None:
+            return None, command
+        return keyword, command[len(keyword):]
+
+    def _moving(self, now):
+        """ Whether the motor is moving at time `now`.
+        """
+        return self._move_start <= now < self._move_end
+
+    def _go(self, at):
+        """ Starts a move with the current parameters at time `at`.
+
+        Moves queue up behind the current one.
+
+        """
+        p = self.parameters
+        resolution = max(1, p['ERES'])
+        deceleration = p['AD'] if p['AD'] > 0 else p['A']
+        duration = _move_time(p['D'] / float(resolution), p['A'],
+                              deceleration, p['V'])
+        start = max(at, self._move_end)
+        self._move_start = start
+        self._move_end = start + duration
+        self._move_negative = p['D'] < 0
+
+    def _stop(self, at):
+        """ Stops all motion at time `at`.
+        """
+        self._move_end = min(self._move_end, at)
+
+    def _run(self, commands, at, output):
+        """ Runs the commands of a program or profile starting at `at`.
+
+        Returns the time they finish.
+
+        """
+        for command in commands:
+            if output:
+                self._emit(b'*' + command.encode('ASCII') + b'\n', at)
+            keyword, argument = self._split(command)
+            if keyword in ('RUN', 'PRUN'):
+                name = argument.strip()
+                if name in self.programs:
+                    at = self._run(self.programs[name], at, output)
+            else:
+                at = self._execute(keyword, argument, at)[2]
+        return at
+
+    def _execute(self, keyword, argument, at):
+        """ Executes a single command at time `at`.
+
+        Returns the lines of output, any error, and the time it is
+        done.
+
+        """
+        argument = argument.strip()
+        if keyword is None:
+            return [], 'UNDEFINED_LABEL', at
+
+        # Communications settings.
+        if keyword in self.comms_settings:
+            setting = self.comms_settings[keyword]
+            if len(argument) == 0:
+                return ['*' + keyword + ','.join([str(c) for c
+                                                  in setting])], None, at
+            try:
+                values = [int(c) for c in argument.split(',')]
+            except ValueError:
+                return [], 'INVALID_DATA', at
+            if len(values) != len(setting) \
+                    or any([c < 0 or c > 255 for c in values]):
+                return [], 'INVALID_DATA', at
+            self.comms_settings[keyword] = values
+            return [], None, at
+        if keyword == 'BAUD':
+            if len(argument) == 0:
+                return ['*BAUD' + str(self.baudrate)], None, at
+            try:
+                baudrate = int(argument)
+            except ValueError:
+                return [], 'INVALID_DATA', at
+            if baudrate not in _BAUDRATES:
+                return [], 'INVALID_DATA', at
+            return [], None, at
+
+        # Parameters.
+        if keyword in _PARAMETERS:
+            tp, fmt, default = _PARAMETERS[keyword]
+            if len(argument) == 0:
+                return ['*' + keyword
+                        + fmt.format(self.parameters[keyword])], None, at
+            try:
+                if tp == int:
+                    value = int(float(argument))
+                else:
+                    value = float(argument)
+            except ValueError:
+                return [], 'INVALID_DATA', at
+            if keyword == 'DRIVE':
+                if value not in (0, 1):
+                    return [], 'INVALID_DATA', at
+                if value == 0:
+                    self._stop(at)
+            elif keyword == 'ERES' and value <= 0:
+                return [], 'INVALID_DATA_LOW', at
+            elif keyword != 'D' and value < 0:
+                return [], 'INVALID_DATA_LOW', at
+            self.parameters[keyword] = value
+            return [], None, at
+
+        # Queries.
+        if keyword == 'TREV':
+            return ['*TREV-' + self._revision], None, at
+        if keyword == 'TAS':
+            bits = ['0'] * 32
+            if self._moving(self._clock()):
+                bits[_TAS_MOVING - 1] = '1'
+            if self._move_negative:
+                bits[_TAS_NEGATIVE - 1] = '1'
+            if self.parameters['DRIVE'] == 0:
+                bits[_TAS_SHUT_DOWN - 1] = '1'
+            return ['*TAS' + '_'.join([''.join(bits[i:(i+4)])
+                                       for i in range(0, 32, 4)])], \
+                None, at
+
+        # Programs and profiles.
+        if keyword == 'DEF':
+            if len(argument) == 0:
+                return [], 'INVALID_DATA', at
+            self._defining = argument
+            self.programs[argument] = []
+            return [], None, at
+        if keyword == 'END':
+            self._defining = None
+            return [], None, at
+        if keyword == 'DEL':
+            self.programs.pop(argument, None)
+            return [], None, at
+        if keyword == 'TPROG':
+            if argument not in self.programs:
+                return [], 'UNDEFINED_LABEL', at
+            return (['*' + c for c in self.programs[argument]]
+                    + ['*END'], None, at)
+
+        # Motion.
+        if keyword in ('GO', 'GOBUF'):
+            if self.parameters['DRIVE'] != 0:
+                self._go(at)
+            return [], None, at
+        if keyword in ('K', 'S'):
+            self._stop(at)
+            return [], None, at
+        if keyword == 'WAIT':
+            return [], None, max(at, self._move_end)
+        if keyword == 'T':
+            try:
+                return [], None, at + max(0.0, float(argument))
+            except ValueError:
+                return [], 'INVALID_DATA', at
+        if keyword == 'RESET':
+            self._stop(at)
+            self._defining = None
+            self.parameters['DRIVE'] = 0
+            return [], None, at
+
+        # Everything else ('PS', 'C', 'GOWHEN') is accepted but does
+        # nothing.
+        return [], None, at
+
+
+class SimulatedSerial(object):
+    """ pyserial compatible stand-in for a port with a simulated drive.
+
+    Behaves enough like a ``serial.Serial`` (reads and writes with
+    timeouts, ``in_waiting``, ``baudrate``, etc.) to be given to the
+    drivers in ``drivers`` in place of a port.
+
+    Parameters
+    ----------
+    drive : SimulatedDrive or None, optional
+        The simulated drive. ``None`` means to make a new one with the
+        default settings.
+    baudrate : int, optional
+        The baud rate of the port. Data sent and received at a different
+        baud rate than the drive is using is lost.
+    timeout : float or None, optional
+        The read timeout in seconds. ``None`` means to wait forever and
+        0 means to not wait at all.
+    write_timeout : float or None, optional
+        Ignored since writes never block.
+    **keywords : additional keyword arguments
+        Ignored so that the same arguments as for ``serial.Serial`` can
+        be given.
+
+    Attributes
+    ----------
+    drive : SimulatedDrive
+    baudrate : int
+    timeout : float or None
+    write_timeout : float or None
+    is_open : bool
+
+    Examples
+    --------
+
+    >>> from GeminiMotorDrive import GeminiG6, drivers, simulator
+    >>> ser = simulator.SimulatedSerial()
+    >>> g = GeminiG6(drivers.ASCII_RS232(ser, bulk_write=True))
+    >>> g.encoder_resolution
+    4000
+
+    """
+    def __init__(self, drive=None, baudrate=_DEFAULT_BAUDRATE,
+                 timeout=None, write_timeout=None, **keywords):
+        if drive is None:
+            drive = SimulatedDrive()
+        self.drive = drive
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.write_timeout = write_timeout
+        self.is_open = True
+
+    @property
+    def port(self):
+        return None
+
+    @property
+    def in_waiting(self):
+        return self.drive.in_waiting
+
+    def inWaiting(self):
+        return self.drive.in_waiting
+
+    def read(self, size=1):
+        """ Reads from the drive, waiting up to the timeout.
+        """
+        if self.timeout is None:
+            deadline = None
+        else:
+            deadline = time.monotonic() + self.timeout
+        data = bytearray()
+        while True:
+            data += self.drive.read(size - len(data),
+                                    baudrate=self.baudrate)
+            if len(data) >= size:
+                break
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                break
+            # Sleep till the next output is due (or the deadline),
+            # checking back now and then in case the drive gets written
+            # to from another thread.
+            wake = self.drive.next_output_time()
+            if wake is None:
+                wake = now + 0.001
+            if deadline is not None:
+                wake = min(wake, deadline)
+            time.sleep(min(max(0.0, wake - now), 0.01))
+        return bytes(data)
+
+    def write(self, data):
+        return self.drive.write(data, baudrate=self.baudrate)
+
+    def flush(self):
+        pass
+
+    def reset_input_buffer(self):
+        self.drive.read(baudrate=self.baudrate)
+
+    def close(self):
+        self.is_open = False
+
+
+class PtyDrive(object):
+    """ Simulated drive on a pseudo-terminal.
+
+    Opens a pseudo-terminal (pty) and serves a simulated drive on it
+    from a background thread, so that anything that can open a serial
+    port (including ``drivers.ASCII_RS232``, ``drivers.AsyncASCII_RS232``,
+    and ``reactor.DriveReactor``) can talk to it by the name in
+    ``port``. Only available on POSIX systems.
+
+    Can be used as a context manager, which closes it on exit.
+
+    Parameters
+    ----------
+    drive : SimulatedDrive or None, optional
+        The simulated drive. ``None`` means to make a new one with the
+        default settings.
+
+    Attributes
+    ----------
+    drive : SimulatedDrive
+    port : str
+        The name of the pty to open as the serial port.
+
+    Notes
+    -----
+    Baud rates are not simulated on a pty since the drive can't see
+    what the port was set to.
+
+    Examples
+    --------
+
+    >>> from GeminiMotorDrive import drivers, simulator
+    >>> with simulator.PtyDrive() as pd:
+    ...     with drivers.ASCII_RS232(pd.port) as ar:
+    ...         ar.send_command('DRIVE1')
+    Response('DRIVE1', 'DRIVE1\\r\\r\\n', 'DRIVE1', None, [])
+
+    """
+    def __init__(self, drive=None):
+        # The pty and tty modules are only available on POSIX systems,
+        # so they are only imported if needed.
+        import pty
+        import tty
+        if drive is None:
+            drive = SimulatedDrive()
+        self.drive = drive
+        self._master, self._slave = pty.openpty()
+        tty.setraw(self._slave)
+        self.port = os.ttyname(self._slave)
+        self._running = True
+        self._thread = threading.Thread(target=self._run,
+                                        name='PtyDrive')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _run(self):
+        """ Moves data between the pty and the drive till closed.
+        """
+        while self._running:
+            # Wait for the host to write something or for the next
+            # output of the drive to be due, checking back now and then
+            # for being closed.
+            timeout = 0.05
+            wake = self.drive.next_output_time()
+            if wake is not None:
+                timeout = min(timeout, max(0.0, wake - time.monotonic()))
+            try:
+                readable = select.select([self._master], [], [],
+                                         timeout)[0]
+                if len(readable) != 0:
+                    self.drive.write(os.read(self._master, 4096))
+                data = self.drive.read()
+                while len(data) != 0:
+                    data = data[os.write(self._master, data):]
+            except OSError:
+                break
+
+    def close(self):
+        """ Stops serving the drive and closes the pty.
+        """
+        if not self._running:
+            return
+        self._running = False
+        self._thread.join()
+        os.close(self._master)
+        os.close(self._slave)
+
+
+class TcpDrive(object):
+    """ Simulated drive behind a simulated terminal server.
+
+    Listens on a local TCP port and serves a simulated drive to one
+    connection at a time from a background thread, like a
+    serial-to-Ethernet terminal server in raw TCP mode would. So
+    ``drivers.ASCII_TCP``, ``transports.SocketTransport``, and anything
+    else that talks to a terminal server can be exercised without one.
+
+    Can be used as a context manager, which closes it on exit.
+
+    Parameters
+    ----------
+    drive : SimulatedDrive or None, optional
+        The simulated drive. ``None`` means to make a new one with the
+        default settings.
+    host : str, optional
+        The address to listen on.
+    port : int, optional
+        The TCP port to listen on. 0 means any free port.
+
+    Attributes
+    ----------
+    drive : SimulatedDrive
+    address : tuple
+        The ``(host, port)`` being listened on.
+
+    Notes
+    -----
+    Baud rates are not simulated since a terminal server doesn't pass
+    them on.
+
+    Examples
+    --------
+
+    >>> from GeminiMotorDrive import drivers, simulator
+    >>> with simulator.TcpDrive() as td:
+    ...     with drivers.ASCII_TCP(*td.address) as ar:
+    ...         ar.send_command('DRIVE1')
+    Response('DRIVE1', 'DRIVE1\\r\\r\\n', 'DRIVE1', None, [])
+
+    """
+    def __init__(self, drive=None, host='127.0.0.1', port=0):
+        if drive is None:
+            drive = SimulatedDrive()
+        self.drive = drive
+        self._server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR,
+                                1)
+        self._server.bind((host, port))
+        self._server.listen(1)
+        self.address = self._server.getsockname()[:2]
+        self._running = True
+        self._thread = threading.Thread(target=self._run,
+                                        name='TcpDrive')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _run(self):
+        """ Serves connections till closed.
+        """
+        while self._running:
+            readable = select.select([self._server], [], [], 0.05)[0]
+            if len(readable) == 0:
+                continue
+            try:
+                conn = self._server.accept()[0]
+            except OSError:
+                continue
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            try:
+                self._serve(conn)
+            finally:
+                conn.close()
+
+    def _serve(self, conn):
+        """ Moves data between a connection and the drive till it ends.
+        """
+        while self._running:
+            # Wait for the host to write something or for the next
+            # output of the drive to be due, checking back now and then
+            # for being closed.
+            timeout = 0.05
+            wake = self.drive.next_output_time()
+            if wake is not None:
+                timeout = min(timeout, max(0.0, wake - time.monotonic()))
+            try:
+                readable = select.select([conn], [], [], timeout)[0]
+                if len(readable) != 0:
+                    data = conn.recv(4096)
+                    if len(data) == 0:
+                        break
+                    self.drive.write(data)
+                data = self.drive.read()
+                if len(data) != 0:
+                    conn.sendall(data)
+            except OSError:
+                break
+
+    def close(self):
+        """ Stops serving the drive and closes the listening socket.
+        """
+        if not self._running:
+            return
+        self._running = False
+        self._thread.join()
+        self._server.close()
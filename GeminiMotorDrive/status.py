@@ -0,0 +1,505 @@
+# Copyright 2014-2016 Freja Nordsiek
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Module for decoding and monitoring the status of the drives.
+"""
+
+import re
+import time
+import threading
+
+
+# The named bits of the axis status ('TAS'), which are numbered from 1
+# like in the manual. The rest are reserved or model dependent and can
+# be gotten by number.
+AXIS_STATUS_BITS = {'moving': 1, 'negative': 2, 'accelerating': 3,
+                    'at_velocity': 4, 'home_successful': 5,
+                    'absolute': 6, 'continuous': 7, 'jog': 8,
+                    'stall': 12, 'shut_down': 13, 'fault': 14,
+                    'hard_limit_positive': 15,
+                    'hard_limit_negative': 16,
+                    'soft_limit_positive': 17,
+                    'soft_limit_negative': 18}
+
+# Regular expression to pick the bits out of the response line to a
+# status command, such as '*TAS0000_0000_0000_1000_0000_0000_0000_0000'.
+_STATUS_PATTERN = re.compile('^\\*!?[0-9]*[A-Za-z]+([01_]+)$')
+
+
+class StatusWord(object):
+    """ A status word of a drive as a compact integer bitset.
+
+    The drive reports status words (such as the axis status from
+    'TAS') as strings of ``'0'`` and ``'1'`` with bit 1 first. The bits
+    are held in a single ``int`` with bit n (numbered from 1 like in
+    the manual) being bit ``n - 1`` of it. Named bits can be gotten as
+    attributes.
+
+    Parameters
+    ----------
+    value : int, optional
+        The bits.
+    length : int, optional
+        The number of bits in the word.
+
+    Attributes
+    ----------
+    value : int
+        The bits.
+    length : int
+        The number of bits in the word.
+
+    See Also
+    --------
+    AxisStatus
+
+    """
+    __slots__ = ('value', 'length')
+
+    #: The named bits by name, numbered from 1.
+    #:
+    #: dict
+    BITS = dict()
+
+    def __init__(self, value=0, length=32):
+        self.value = value
+        self.length = length
+
+    @classmethod
+    def parse(cls, line):
+        """ Parses the response line to a status command.
+
+        Parameters
+        ----------
+        line : str
+            The line, such as
+            ``'*TAS0000_0000_0000_1000_0000_0000_0000_0000'``.
+
+        Returns
+        -------
+        status : StatusWord
+            The decoded status word.
+
+        Raises
+        ------
+        ValueError
+            If `line` isn't a status word.
+
+        """
+        match = _STATUS_PATTERN.match(line.strip())
+        if match is None:
+            raise ValueError('Not a status word: ' + repr(line))
+        bits = match.group(1).replace('_', '')
+        return cls(int(bits[::-1], 2), len(bits))
+
+    def __getattr__(self, name):
+        # Only called for attributes that don't exist otherwise, which
+        # is how the named bits are gotten.
+        n = type(self).BITS.get(name)
+        if n is None:
+            raise AttributeError(name)
+        return self.bit(n)
+
+    def bit(self, n):
+        """ Gets a bit.
+
+        Parameters
+        ----------
+        n : int
+            The number of the bit, starting from 1.
+
+        Returns
+        -------
+        value : bool
+            Whether the bit is set.
+
+        """
+        return bool((self.value >> (n - 1)) & 1)
+
+    def changed(self, other):
+        """ Gets the bits that differ from another status word.
+
+        Parameters
+        ----------
+        other : StatusWord or None
+            The other status word. ``None`` counts as all bits clear.
+
+        Returns
+        -------
+        mask : int
+            The bits that differ, in the same layout as ``value``.
+
+        """
+        if other is None:
+            return self.value
+        return self.value ^ other.value
+
+    def set_bits(self):
+        """ Gets the names of the named bits that are set.
+
+        Returns
+        -------
+        names : list of str
+            The names, in order of bit number.
+
+        """
+        return [name for name, n in sorted(type(self).BITS.items(),
+                                           key=lambda x: x[1])
+                if self.bit(n)]
+
+    def __int__(self):
+        return self.value
+
+    def __eq__(self, other):
+        return isinstance(other, StatusWord) \
+            and self.value == other.value and self.length == other.length
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash((self.value, self.length))
+
+    def __str__(self):
+        bits = ''.join(['1' if self.bit(n) else '0'
+                        for n in range(1, self.length + 1)])
+        return '_'.join([bits[i:(i+4)] for i in range(0, len(bits), 4)])
+
+    def __repr__(self):
+        return type(self).__name__ + '(' + repr(str(self)) + ')'
+
+
+class AxisStatus(StatusWord):
+    """ The axis status of a drive ('TAS') as a compact integer bitset.
+
+    The named bits in ``AXIS_STATUS_BITS`` ('moving', 'negative',
+    'accelerating', 'at_velocity', 'home_successful', 'absolute',
+    'continuous', 'jog', 'stall', 'shut_down', 'fault',
+    'hard_limit_positive', 'hard_limit_negative',
+    'soft_limit_positive', and 'soft_limit_negative') can be gotten as
+    attributes.
+
+    See Also
+    --------
+    StatusWord
+
+    Examples
+    --------
+
+    >>> from GeminiMotorDrive.status import AxisStatus
+    >>> s = AxisStatus.parse('*TAS1000_0000_0000_1000_0000_0000_0000_0000')
+    >>> s.moving, s.shut_down, s.fault
+    (True, True, False)
+    >>> s.set_bits()
+    ['moving', 'shut_down']
+
+    """
+    __slots__ = ()
+    BITS = AXIS_STATUS_BITS
+
+
+# The status word classes of the status commands that have named bits.
+_STATUS_CLASSES = {'TAS': AxisStatus}
+
+
+def parse_status(driver, response, command='TAS'):
+    """ Parses the response to a status command.
+
+    Parameters
+    ----------
+    driver : driver
+        The driver the command was sent with.
+    response : drivers.Response
+        The processed response to the command.
+    command : str, optional
+        The status command, which picks the class of the status word.
+
+    Returns
+    -------
+    status : StatusWord or None
+        The decoded status word (an ``AxisStatus`` for 'TAS'), or
+        ``None`` if there was an error.
+
+    """
+    if driver.command_error(response) or len(response[4]) != 1:
+        return None
+    try:
+        return _STATUS_CLASSES.get(command.lstrip('!').upper(),
+                                   StatusWord).parse(response[4][0])
+    except ValueError:
+        return None
+
+
+class StatusMonitor(object):
+    """ Polls status commands of a drive on a thread and reports changes.
+
+    Sends each of the status `commands` (such as 'TAS') as an immediate
+    command every `interval` seconds from a dedicated thread, decodes
+    the responses into ``StatusWord`` (``AxisStatus`` for 'TAS'), and
+    calls the subscribed callbacks only when bits they are interested
+    in change. The latest status word of each command can be gotten
+    with ``status`` at any time without talking to the drive.
+
+    The monitor is started with ``start`` and stopped with ``close``, or
+    used as a context manager which does both.
+
+    Parameters
+    ----------
+    driver : driver
+        Connected driver for the drive.
+    commands : iterable of str, optional
+        The status commands to poll.
+    interval : float, optional
+        Time in seconds between the starts of consecutive polls.
+    timeout : float, optional
+        Timeout in seconds for the response to each status command.
+    lock : lock or None, optional
+        Lock held while talking to the drive. ``None`` means the
+        driver's ``lock`` if it has one (like ``drivers.ASCII_RS232``),
+        and a new ``threading.RLock`` otherwise. Is stored in the
+        attribute ``lock``.
+    on_error : callable or None, optional
+        Function called as ``on_error(exc)`` on the monitor's thread
+        with the exception when a poll raises one (including from a
+        callback), after which polling carries on. ``None`` means to
+        just keep it in ``last_error``.
+
+    Attributes
+    ----------
+    lock : lock
+        Lock held while talking to the drive.
+    polls : int
+        The number of polls done.
+    errors : int
+        The number of polls that raised an exception.
+    last_error : Exception or None
+        The last exception raised by a poll, or ``None`` if none has.
+    running : bool
+
+    Notes
+    -----
+    By default, the monitor holds the driver's own lock while polling,
+    which ``drivers.ASCII_RS232`` holds for every command it sends. So
+    other threads (such as one using a ``GeminiMotorDrive.GeminiG6``
+    with the same driver) can use the driver while the monitor is
+    running without their commands and the polls getting mixed up.
+    Other threads only need to hold ``lock`` themselves to keep the
+    polls out of the middle of several calls. ``reactor.ReactorDrive``
+    and ``broker.BrokerClient`` already do the commands one at a time.
+
+    Callbacks are called on the monitor's thread, and so should return
+    quickly. An exception raised by one is handled like any other
+    exception in a poll. An exception raised by `on_error` stops the
+    monitor.
+
+    See Also
+    --------
+    AxisStatus
+
+    Examples
+    --------
+
+    Print whenever a move starts or finishes, or the drive faults.
+
+    >>> import time
+    >>> from GeminiMotorDrive.drivers import ASCII_RS232
+    >>> from GeminiMotorDrive.status import StatusMonitor
+    >>> def on_change(command, old, new):
+    ...     print(new.set_bits())
+    >>> ar = ASCII_RS232('/dev/ttyS1')
+    >>> with StatusMonitor(ar, interval=0.02) as monitor:
+    ...     monitor.subscribe(on_change, bits=['moving', 'fault'])
+    ...     ar.send_commands(['DRIVE1', 'D4000', 'GO'])
+    ...     time.sleep(2.0)
+    ['moving']
+    []
+
+    """
+    def __init__(self, driver, commands=('TAS', ), interval=0.05,
+                 timeout=1.0, lock=None, on_error=None):
+        self._driver = driver
+        self._commands = tuple(commands)
+        self._interval = interval
+        self._timeout = timeout
+        if lock is None:
+            lock = getattr(driver, 'lock', None)
+            if lock is None:
+                lock = threading.RLock()
+        self.lock = lock
+        self._on_error = on_error
+        self.polls = 0
+        self.errors = 0
+        self.last_error = None
+        # The latest status word of each command, and the subscriptions
+        # as (callback, command, mask) with a mask of None meaning all
+        # bits. The subscriptions are kept in a tuple that is replaced
+        # rather than changed so that the thread can go through them
+        # without a lock.
+        self._status = dict()
+        self._subscriptions = ()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @property
+    def running(self):
+        """ Whether the monitor is running.
+
+        ``bool``
+
+        """
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """ Starts polling on the monitor's thread.
+        """
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run,
+                                        name='GeminiStatusMonitor')
+        self._thread.daemon = True
+        self._thread.start()
+
+    def close(self):
+        """ Stops polling and waits for the thread to finish.
+        """
+        self._stop.set()
+        if self._thread is not None \
+                and self._thread is not threading.current_thread():
+            self._thread.join()
+        self._thread = None
+
+    def status(self, command='TAS'):
+        """ Gets the latest status word of a status command.
+
+        Parameters
+        ----------
+        command : str, optional
+            The status command.
+
+        Returns
+        -------
+        status : StatusWord or None
+            The latest status word, or ``None`` if there isn't one yet.
+
+        """
+        return self._status.get(command)
+
+    def subscribe(self, callback, command='TAS', bits=None):
+        """ Subscribes to changes in the bits of a status command.
+
+        `callback` is called as ``callback(command, old, new)`` with the
+        old and new ``StatusWord`` whenever any of the `bits` change
+        between one poll and the next. It is not called for the first
+        poll.
+
+        Parameters
+        ----------
+        callback : callable
+            The function to call.
+        command : str, optional
+            The status command.
+        bits : iterable of int and str, or None, optional
+            The bits to watch, by number (starting from 1) or name.
+            ``None`` means all of them.
+
+        Returns
+        -------
+        subscription : tuple
+            The subscription, which is what to give ``unsubscribe``.
+
+        Raises
+        ------
+        KeyError
+            If a bit name isn't one of the named bits of `command`.
+
+        """
+        if bits is None:
+            mask = None
+        else:
+            names = _STATUS_CLASSES.get(command, StatusWord).BITS
+            mask = 0
+            for n in bits:
+                if isinstance(n, str):
+                    n = names[n]
+                mask |= 1 << (n - 1)
+        subscription = (callback, command, mask)
+        self._subscriptions = self._subscriptions + (subscription, )
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """ Removes a subscription.
+
+        Parameters
+        ----------
+        subscription : tuple
+            The subscription returned by ``subscribe``.
+
+        """
+        self._subscriptions = tuple([s for s in self._subscriptions
+                                     if s is not subscription])
+
+    def _poll(self):
+        """ Polls every status command once and reports the changes.
+        """
+        for command in self._commands:
+            with self.lock:
+                response = self._driver.send_command(
+                    command, immediate=True, timeout=self._timeout)
+            new = parse_status(self._driver, response, command)
+            if new is None:
+                continue
+            old = self._status.get(command)
+            self._status[command] = new
+            if old is None:
+                continue
+            changed = new.changed(old)
+            if changed == 0:
+                continue
+            for callback, c, mask in self._subscriptions:
+                if c == command and (mask is None or changed & mask):
+                    callback(command, old, new)
+        self.polls += 1
+
+    def _run(self):
+        """ Polls till stopped.
+        """
+        # Polls are started every interval. If a poll runs over, the
+        # next one starts right away and the schedule starts over from
+        # then rather than trying to catch up.
+        #
+        # An exception in a poll (such as the port going away) is kept
+        # and handed to on_error rather than ending the thread, so the
+        # monitor keeps going if the problem clears up.
+        when = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                self._poll()
+            except Exception as exc:
+                self.errors += 1
+                self.last_error = exc
+                if self._on_error is not None:
+                    self._on_error(exc)
+            when += self._interval
+            now = time.monotonic()
+            if when < now:
+                when = now
+            self._stop.wait(when - now)
@@ -0,0 +1,217 @@
+# Copyright 2014-2016 Freja Nordsiek
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Module for taps on the communications with the drives.
+
+A tap is given everything a driver writes to and reads from the drive,
+as well as every response it frames, with ``time.monotonic``
+timestamps. Taps are added to a ``drivers.ASCII_RS232`` with its `taps`
+argument or ``add_tap``.
+
+A session recorded with ``SessionRecorder`` can be read back with
+``read_session`` or fed back into a driver with
+``transports.ReplayTransport``.
+
+"""
+
+import struct
+import threading
+
+
+# The kinds of events.
+WRITE = 0
+READ = 1
+RESPONSE = 2
+
+# A session log starts with the magic bytes and the format version, and
+# then has one record per event made up of a header (the kind, the
+# timestamp, and the length of the data) followed by the data.
+_MAGIC = b'GMDS'
+_VERSION = 1
+_RECORD_HEADER = struct.Struct('<BdI')
+
+
+class Tap(object):
+    """ Base class for taps.
+
+    Subclasses override the methods for the events they want. Each is
+    called right after the event happened, and should return quickly
+    since the driver waits on it. Reads can be reported from the
+    background reader thread of the driver if it has one.
+
+    """
+    def on_write(self, timestamp, data):
+        """ Called for every write to the drive.
+
+        Parameters
+        ----------
+        timestamp : float
+            Time on the ``time.monotonic`` clock.
+        data : bytes
+            The bytes written.
+
+        """
+        pass
+
+    def on_read(self, timestamp, data):
+        """ Called for every chunk read from the drive.
+
+        Parameters
+        ----------
+        timestamp : float
+            Time on the ``time.monotonic`` clock.
+        data : bytes
+            The bytes read.
+
+        """
+        pass
+
+    def on_response(self, timestamp, response):
+        """ Called for every response framed by the driver.
+
+        Parameters
+        ----------
+        timestamp : float
+            Time on the ``time.monotonic`` clock.
+        response : bytes
+            The response, which includes the End Of Response unless it
+            timed out.
+
+        """
+        pass
+
+
+class SessionRecorder(Tap):
+    """ Tap that records a session to a compact binary log.
+
+    Each event takes 13 bytes plus its data. The log can be read with
+    ``read_session`` and replayed with ``transports.ReplayTransport``.
+
+    Can be used as a context manager, which closes it on exit.
+
+    Parameters
+    ----------
+    file : str or file-like
+        The path of the file to write to or an open binary file.
+
+    See Also
+    --------
+    read_session
+    transports.ReplayTransport
+
+    Examples
+    --------
+
+    Record a session and replay it.
+
+    >>> from GeminiMotorDrive import drivers, taps, transports
+    >>> with taps.SessionRecorder('session.bin') as recorder:
+    ...     with drivers.ASCII_RS232('/dev/ttyS1',
+    ...                              taps=[recorder]) as ar:
+    ...         ar.send_command('DRIVE1')
+    Response('DRIVE1', 'DRIVE1\\r\\r\\n', 'DRIVE1', None, [])
+    >>> with drivers.ASCII_RS232(
+    ...         transports.ReplayTransport('session.bin')) as ar:
+    ...     ar.send_command('DRIVE1')
+    Response('DRIVE1', 'DRIVE1\\r\\r\\n', 'DRIVE1', None, [])
+
+    """
+    def __init__(self, file):
+        if hasattr(file, 'write'):
+            self._file = file
+            self._own_file = False
+        else:
+            self._file = open(file, 'wb')
+            self._own_file = True
+        self._lock = threading.Lock()
+        self._file.write(_MAGIC + struct.pack('<B', _VERSION))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """ Flushes the log, closing the file if it was opened here.
+        """
+        with self._lock:
+            if self._file is None:
+                return
+            self._file.flush()
+            if self._own_file:
+                self._file.close()
+            self._file = None
+
+    def _record(self, kind, timestamp, data):
+        """ Writes an event to the log if it is still open.
+        """
+        with self._lock:
+            if self._file is not None:
+                self._file.write(_RECORD_HEADER.pack(kind, timestamp,
+                                                     len(data)))
+                self._file.write(data)
+
+    def on_write(self, timestamp, data):
+        self._record(WRITE, timestamp, data)
+
+    def on_read(self, timestamp, data):
+        self._record(READ, timestamp, data)
+
+    def on_response(self, timestamp, response):
+        self._record(RESPONSE, timestamp, response)
+
+
+def read_session(file):
+    """ Reads a session log written by ``SessionRecorder``.
+
+    Parameters
+    ----------
+    file : str or file-like
+        The path of the log or an open binary file.
+
+    Returns
+    -------
+    events : list of tuple
+        The events in order, each a ``(kind, timestamp, data)`` where
+        `kind` is ``WRITE``, ``READ``, or ``RESPONSE``.
+
+    Raises
+    ------
+    ValueError
+        If it isn't a session log or is of an unsupported version.
+
+    """
+    if hasattr(file, 'read'):
+        buf = file.read()
+    else:
+        with open(file, 'rb') as f:
+            buf = f.read()
+    if buf[:len(_MAGIC)] != _MAGIC:
+        raise ValueError('Not a session log.')
+    if struct.unpack_from('<B', buf, len(_MAGIC))[0] != _VERSION:
+        raise ValueError('Unsupported session log version.')
+
+    # Go through the records one by one, stopping at a partial one at
+    # the end (the recording may have been cut short).
+    events = []
+    pos = len(_MAGIC) + 1
+    while pos + _RECORD_HEADER.size <= len(buf):
+        kind, timestamp, n = _RECORD_HEADER.unpack_from(buf, pos)
+        pos += _RECORD_HEADER.size
+        if pos + n > len(buf):
+            break
+        events.append((kind, timestamp, bytes(buf[pos:(pos+n)])))
+        pos += n
+    return events
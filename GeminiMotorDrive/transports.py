@@ -0,0 +1,457 @@
+# Copyright 2014-2016 Freja Nordsiek
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Module for the transports the drivers can talk to drives over.
+
+The drivers talk to a drive through a transport, which is anything that
+acts enough like a ``serial.Serial`` for them. Namely, it must have
+
+* ``read(size)`` and ``write(data)``, with the read timeout in the
+  ``timeout`` attribute (``None`` blocks, 0 doesn't) and the write
+  timeout in the ``write_timeout`` attribute (with 0 making ``write``
+  non-blocking and return the number of bytes written).
+* ``in_waiting`` (and ``inWaiting()``) for the number of bytes that can
+  be read without blocking.
+* ``flush()`` to wait till everything written has been sent.
+* ``baudrate``, the baud rate of the line to the drive, which sets the
+  timing the drivers use.
+* ``close()``.
+* ``fileno()`` if it can be waited on with ``select`` (needed by
+  ``reactor.DriveReactor`` and used by ``drivers.AsyncASCII_RS232``).
+
+An open ``serial.Serial`` is the transport for a drive on a serial
+port, and ``SocketTransport`` is the transport for one behind a
+serial-to-Ethernet terminal server. ``ReplayTransport`` replays a
+session recorded with ``taps.SessionRecorder``.
+
+"""
+
+import time
+import socket
+import select
+
+import serial
+
+
+# Default baud rate of the line between the terminal server and the
+# drive.
+_DEFAULT_BAUDRATE = 9600
+
+# Number of bytes that are buffered by a write before they are sent
+# without waiting for a flush or read.
+_BATCH_SIZE = 1024
+
+# Maximum number of bytes to receive at once.
+_RECEIVE_SIZE = 65536
+
+
+class SocketTransport(object):
+    """ Transport over a TCP connection to a terminal server.
+
+    Transport for a drive whose RS232 port is on a serial-to-Ethernet
+    terminal server (serial device server) in raw TCP mode. The
+    terminal server must already be set to the drive's baud rate and
+    flow control.
+
+    Nagle's algorithm is disabled so that what is written gets sent
+    right away instead of waiting for the acknowledgement of earlier
+    segments, which would otherwise add a round trip to most commands.
+    To keep that from making many small segments, writes are batched.
+    They are buffered and sent together by ``flush``, before reading
+    (the drive can't respond to what it hasn't been sent), or once
+    enough has been buffered. Non-blocking writes (``write_timeout`` of
+    0) are not buffered.
+
+    Parameters
+    ----------
+    host : str
+        Host name or IP address of the terminal server.
+    port : int
+        TCP port of the terminal server's serial port.
+    baudrate : int, optional
+        Baud rate of the terminal server's serial port. It is not sent
+        to the terminal server, and only sets the timing the drivers
+        use.
+    timeout : float or None, optional
+        Read timeout in seconds. ``None`` blocks and 0 doesn't.
+    write_timeout : float or None, optional
+        Write timeout in seconds. ``None`` blocks and 0 doesn't.
+    connect_timeout : float or None, optional
+        Timeout in seconds for connecting. ``None`` blocks.
+
+    Attributes
+    ----------
+    baudrate : int
+    timeout : float or None
+    write_timeout : float or None
+    in_waiting : int
+
+    Raises
+    ------
+    serial.SerialException
+        If the terminal server can't be connected to.
+
+    See Also
+    --------
+    drivers.ASCII_TCP
+    serial.Serial
+
+    """
+    def __init__(self, host, port, baudrate=_DEFAULT_BAUDRATE,
+                 timeout=None, write_timeout=None, connect_timeout=5.0):
+        try:
+            self._sock = socket.create_connection((host, port),
+                                                  connect_timeout)
+        except OSError as exc:
+            raise serial.SerialException('Could not connect to '
+                                         + str(host) + ':' + str(port)
+                                         + ': ' + str(exc))
+        self._sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        # The socket is non-blocking, with all waiting done by select
+        # so that the timeouts work the same way as for a serial port.
+        self._sock.setblocking(False)
+        self._rx = bytearray()
+        self._tx = bytearray()
+        self._closed = False
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.write_timeout = write_timeout
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def fileno(self):
+        """ Gets the file descriptor of the socket.
+        """
+        return self._sock.fileno()
+
+    def close(self):
+        """ Sends anything still buffered and closes the connection.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        try:
+            self.flush()
+        except (OSError, serial.SerialException):
+            pass
+        finally:
+            self._sock.close()
+
+    def _receive(self, timeout):
+        """ Receives whatever has arrived into the receive buffer.
+
+        Parameters
+        ----------
+        timeout : float or None
+            Time in seconds to wait for something to arrive. ``None``
+            waits forever.
+
+        Returns
+        -------
+        received : bool
+            Whether anything was received.
+
+        Raises
+        ------
+        serial.SerialException
+            If the connection was closed by the terminal server.
+
+        """
+        if len(select.select([self._sock], [], [], timeout)[0]) == 0:
+            return False
+        try:
+            data = self._sock.recv(_RECEIVE_SIZE)
+        except (BlockingIOError, InterruptedError):
+            return False
+        except OSError as exc:
+            raise serial.SerialException('Connection lost: ' + str(exc))
+        if len(data) == 0:
+            raise serial.SerialException('Connection closed by the '
+                                         'terminal server.')
+        self._rx += data
+        return True
+
+    @property
+    def in_waiting(self):
+        """ The number of bytes that can be read without blocking.
+
+        ``int``
+
+        """
+        self._receive(0)
+        return len(self._rx)
+
+    def inWaiting(self):
+        """ Gets the number of bytes that can be read without blocking.
+        """
+        return self.in_waiting
+
+    def read(self, size=1):
+        """ Reads `size` bytes or as many as arrive before the timeout.
+
+        Sends any batched writes first.
+
+        Parameters
+        ----------
+        size : int, optional
+            The number of bytes to read.
+
+        Returns
+        -------
+        data : bytes
+            The bytes read.
+
+        """
+        if len(self._tx) != 0:
+            self.flush()
+        if self.timeout is None:
+            deadline = None
+        else:
+            deadline = time.monotonic() + self.timeout
+        while len(self._rx) < size:
+            if deadline is None:
+                timeout = None
+            else:
+                timeout = max(0.0, deadline - time.monotonic())
+            if not self._receive(timeout) and timeout is not None \
+                    and time.monotonic() >= deadline:
+                break
+        data = bytes(self._rx[:size])
+        del self._rx[:size]
+        return data
+
+    def write(self, data):
+        """ Writes bytes.
+
+        They are batched up to be sent later unless `write_timeout` is
+        0, in which case as much as can be sent without blocking is sent
+        right away.
+
+        Parameters
+        ----------
+        data : bytes
+            The bytes to write.
+
+        Returns
+        -------
+        n : int
+            The number of bytes written.
+
+        """
+        if self.write_timeout == 0:
+            if len(self._tx) != 0:
+                self._send(0)
+                if len(self._tx) != 0:
+                    return 0
+            try:
+                return self._sock.send(data)
+            except (BlockingIOError, InterruptedError):
+                return 0
+            except OSError as exc:
+                raise serial.SerialException('Connection lost: '
+                                             + str(exc))
+        self._tx += data
+        if len(self._tx) >= _BATCH_SIZE:
+            self.flush()
+        return len(data)
+
+    def _send(self, timeout):
+        """ Sends as much of the batched writes as possible in time.
+
+        Parameters
+        ----------
+        timeout : float or None
+            Time in seconds to keep trying. ``None`` means till all of
+            it is sent.
+
+        """
+        if timeout is None:
+            deadline = None
+        else:
+            deadline = time.monotonic() + timeout
+        while len(self._tx) != 0:
+            try:
+                n = self._sock.send(self._tx)
+            except (BlockingIOError, InterruptedError):
+                n = 0
+            except OSError as exc:
+                raise serial.SerialException('Connection lost: '
+                                             + str(exc))
+            del self._tx[:n]
+            if len(self._tx) == 0:
+                break
+            if deadline is None:
+                remaining = None
+            else:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+            select.select([], [self._sock], [], remaining)
+
+    def flush(self):
+        """ Sends everything that has been written.
+
+        Raises
+        ------
+        serial.SerialTimeoutException
+            If it couldn't all be sent within `write_timeout`.
+
+        """
+        self._send(self.write_timeout)
+        if len(self._tx) != 0:
+            raise serial.SerialTimeoutException('Write timeout')
+
+    def reset_input_buffer(self):
+        """ Discards everything received so far.
+        """
+        self._receive(0)
+        del self._rx[:]
+
+
+class ReplayTransport(object):
+    """ Transport that replays a recorded session.
+
+    Feeds what was read from the drive in a session recorded with
+    ``taps.SessionRecorder`` back to a driver, so that a session from
+    the field can be reproduced offline. Rather than at the recorded
+    times, each chunk that was read becomes available as soon as the
+    driver has written as many bytes as had been written before it was
+    read, so the replay runs at full speed while keeping the order of
+    the writes and reads. Reads that would have to wait for more writes
+    (or the end of the session) return right away with what is there,
+    like a timeout.
+
+    What the driver writes is compared against what was written in the
+    session, and the position of the first difference is kept in
+    ``divergence``. Since reads never wait, it shouldn't be used with a
+    background reader, which would spin.
+
+    Parameters
+    ----------
+    session : str, file-like, or list of tuple
+        The path of the session log, an open binary file of it, or the
+        events from ``taps.read_session``.
+    baudrate : int, optional
+        The baud rate to report, which sets the timing the drivers use.
+
+    Attributes
+    ----------
+    baudrate : int
+    timeout : float or None
+        Ignored since reads never wait.
+    write_timeout : float or None
+        Ignored since writes never wait.
+    in_waiting : int
+    written : int
+        The number of bytes written so far.
+    divergence : int or None
+        Position in the written bytes of the first one that differs from
+        the session, or ``None`` if they have all matched.
+
+    See Also
+    --------
+    taps.SessionRecorder
+    taps.read_session
+
+    """
+    def __init__(self, session, baudrate=_DEFAULT_BAUDRATE):
+        # Imported here since taps doesn't need to be loaded to use the
+        # other transports.
+        from . import taps
+        if not isinstance(session, list):
+            session = taps.read_session(session)
+
+        # Split the session into what was written and the chunks that
+        # were read, each with the number of bytes that had been written
+        # before it.
+        self._recorded = bytearray()
+        self._chunks = []
+        for kind, timestamp, data in session:
+            if kind == taps.WRITE:
+                self._recorded += data
+            elif kind == taps.READ:
+                self._chunks.append((len(self._recorded), data))
+        self._next = 0
+        self._rx = bytearray()
+        self.written = 0
+        self.divergence = None
+        self.baudrate = baudrate
+        self.timeout = None
+        self.write_timeout = None
+
+    def _release(self):
+        """ Makes the chunks that were read by now available.
+        """
+        while self._next < len(self._chunks) \
+                and self._chunks[self._next][0] <= self.written:
+            self._rx += self._chunks[self._next][1]
+            self._next += 1
+
+    @property
+    def in_waiting(self):
+        """ The number of bytes that can be read.
+
+        ``int``
+
+        """
+        self._release()
+        return len(self._rx)
+
+    def inWaiting(self):
+        """ Gets the number of bytes that can be read.
+        """
+        return self.in_waiting
+
+    def read(self, size=1):
+        """ Reads up to `size` bytes without waiting.
+        """
+        self._release()
+        data = bytes(self._rx[:size])
+        del self._rx[:size]
+        return data
+
+    def write(self, data):
+        """ Writes bytes, checking them against the session.
+        """
+        if self.divergence is None:
+            expected = self._recorded[self.written:(self.written
+                                                    + len(data))]
+            if expected != data:
+                for i in range(0, len(data)):
+                    if i >= len(expected) or expected[i] != data[i]:
+                        self.divergence = self.written + i
+                        break
+        self.written += len(data)
+        return len(data)
+
+    def flush(self):
+        """ Does nothing since writes are never buffered.
+        """
+        pass
+
+    def reset_input_buffer(self):
+        """ Discards everything that can be read.
+        """
+        self._release()
+        del self._rx[:]
+
+    def close(self):
+        """ Does nothing since there is nothing to close.
+        """
+        pass
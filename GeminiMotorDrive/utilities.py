@@ -12,13 +12,27 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
-""" Module for a utility function and class.
+""" Module for utility functions and classes.
 """
 
 
+import os
+import json
+import time
+import hashlib
 import collections
 
 
+# The caching policies of the drive parameters that GeminiG6 has
+# properties for. Configuration parameters only change when written, so
+# they are cached till then (None). State parameters can change on their
+# own (the motor is de-energized by a fault or a kill), so they are only
+# cached for a short time in seconds.
+PARAMETER_CACHE_POLICIES = {'ERES': None, 'DMEPIT': None,
+                            'DMVLIM': None, 'KDRIVE': None,
+                            'DRIVE': 0.25}
+
+
 def strip_commands(commands):
     """ Strips a sequence of commands.
 
@@ -165,3 +179,431 @@ class UnitConverter(object):
             return [(x / self._va_to_motor) for x in va]
         else:
             return va / self._va_to_motor
+
+
+class TimeoutEstimator(object):
+    """ Estimator of response timeouts from measured round trips.
+
+    Keeps a smoothed round trip time (SRTT) and round trip time
+    variation (RTTVAR) for each key (such as a command name) the same
+    way TCP estimates its retransmission timeout (RFC 6298), and gives
+    a timeout of ``SRTT + k*RTTVAR`` for it. The first round trip
+    measured for a key sets SRTT to it and RTTVAR to half of it, and
+    each one after that is folded in with
+    ``RTTVAR = (1 - beta)*RTTVAR + beta*|SRTT - R|`` and
+    ``SRTT = (1 - alpha)*SRTT + alpha*R``.
+
+    Each time a response doesn't arrive in time, the timeout for that
+    key is doubled (exponential backoff) till the next round trip is
+    measured. Timeouts are always kept between `minimum` and `maximum`.
+
+    Parameters
+    ----------
+    initial : float, optional
+        Timeout in seconds for keys that no round trips have been
+        measured for yet.
+    minimum : float, optional
+        Smallest timeout in seconds to give.
+    maximum : float, optional
+        Largest timeout in seconds to give.
+    alpha : float, optional
+        Gain of the smoothed round trip time.
+    beta : float, optional
+        Gain of the round trip time variation.
+    k : float, optional
+        Number of round trip time variations to add to the smoothed
+        round trip time for the timeout.
+
+    """
+    def __init__(self, initial=1.0, minimum=0.05, maximum=60.0,
+                 alpha=0.125, beta=0.25, k=4.0):
+        self.initial = initial
+        self.minimum = minimum
+        self.maximum = maximum
+        self.alpha = alpha
+        self.beta = beta
+        self.k = k
+        # The estimates are held as [SRTT, RTTVAR, backoff multiplier]
+        # for each key.
+        self._estimates = dict()
+
+    def _clamp(self, timeout):
+        """ Clamps a timeout to between the minimum and maximum.
+        """
+        return min(self.maximum, max(self.minimum, timeout))
+
+    def timeout(self, key):
+        """ Gets the timeout for a key.
+
+        Parameters
+        ----------
+        key : hashable
+            The key, such as a command name.
+
+        Returns
+        -------
+        timeout : float
+            The timeout in seconds.
+
+        """
+        estimate = self._estimates.get(key)
+        if estimate is None:
+            return self._clamp(self.initial)
+        return self._clamp(estimate[2] * (estimate[0]
+                                          + self.k * estimate[1]))
+
+    def observe(self, key, rtt):
+        """ Folds a measured round trip time into the estimate for a key.
+
+        Also resets the backoff for the key.
+
+        Parameters
+        ----------
+        key : hashable
+            The key, such as a command name.
+        rtt : float
+            The measured round trip time in seconds.
+
+        """
+        estimate = self._estimates.get(key)
+        if estimate is None:
+            self._estimates[key] = [rtt, rtt / 2.0, 1]
+        else:
+            estimate[1] += self.beta * (abs(estimate[0] - rtt)
+                                        - estimate[1])
+            estimate[0] += self.alpha * (rtt - estimate[0])
+            estimate[2] = 1
+
+    def backoff(self, key):
+        """ Doubles the timeout for a key after a response timed out.
+
+        Keys that no round trips have been measured for yet keep using
+        `initial`.
+
+        Parameters
+        ----------
+        key : hashable
+            The key, such as a command name.
+
+        """
+        estimate = self._estimates.get(key)
+        if estimate is not None and self.timeout(key) < self.maximum:
+            estimate[2] *= 2
+
+    def estimate(self, key):
+        """ Gets the current estimate for a key.
+
+        Parameters
+        ----------
+        key : hashable
+            The key, such as a command name.
+
+        Returns
+        -------
+        estimate : tuple of float or None
+            The smoothed round trip time and round trip time variation
+            in seconds, or ``None`` if no round trips have been
+            measured for `key`.
+
+        """
+        estimate = self._estimates.get(key)
+        if estimate is None:
+            return None
+        return (estimate[0], estimate[1])
+
+    def reset(self):
+        """ Forgets all estimates.
+        """
+        self._estimates.clear()
+
+
+class ParameterCache(object):
+    """ Cache of drive parameter values.
+
+    Holds the values of drive parameters so that reading them again
+    doesn't need a round trip to the drive. How long each parameter is
+    cached for is set by its policy, which is either ``None`` to cache
+    it till it is written or the cache is invalidated (configuration
+    parameters) or a time to live in seconds (state parameters that can
+    change on their own). A time to live of zero means the parameter
+    isn't cached.
+
+    The number of lookups that found a value (hits) and that didn't
+    (misses) are counted.
+
+    Parameters
+    ----------
+    policies : dict or None, optional
+        The policy for each parameter name. ``None`` means
+        ``PARAMETER_CACHE_POLICIES``.
+    default : float or None, optional
+        The policy of parameters not in `policies`. The default is not
+        to cache them.
+
+    Attributes
+    ----------
+    hits : int
+    misses : int
+    hit_rate : float
+
+    See Also
+    --------
+    GeminiMotorDrive.GeminiG6
+
+    Examples
+    --------
+
+    Cache the parameters of a drive, and check how often reads were
+    answered from the cache.
+
+    >>> from GeminiMotorDrive import GeminiG6, get_driver
+    >>> from GeminiMotorDrive.utilities import ParameterCache
+    >>> g = GeminiG6(get_driver(port='/dev/ttyS1'),
+    ...              parameter_cache=ParameterCache())
+    >>> [g.encoder_resolution for i in range(4)]
+    [4000, 4000, 4000, 4000]
+    >>> g.parameter_cache.hit_rate
+    0.75
+
+    """
+    def __init__(self, policies=None, default=0.0):
+        if policies is None:
+            policies = PARAMETER_CACHE_POLICIES
+        self._policies = dict(policies)
+        self._default = default
+        # The values are held as (value, expiry time on the
+        # time.monotonic clock or None) for each name.
+        self._values = dict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def hit_rate(self):
+        """ The fraction of lookups that found a value.
+
+        ``float``
+
+        Zero if there have been no lookups.
+
+        """
+        lookups = self.hits + self.misses
+        if lookups == 0:
+            return 0.0
+        return self.hits / float(lookups)
+
+    def lookup(self, name):
+        """ Looks up the value of a parameter.
+
+        Parameters
+        ----------
+        name : str
+            The name of the parameter.
+
+        Returns
+        -------
+        value : bool, int, float, or None
+            The cached value, or ``None`` if there isn't one or it has
+            expired.
+
+        """
+        entry = self._values.get(name)
+        if entry is not None and (entry[1] is None
+                                  or time.monotonic() < entry[1]):
+            self.hits += 1
+            return entry[0]
+        self.misses += 1
+        return None
+
+    def store(self, name, value):
+        """ Stores the value of a parameter read from or written to it.
+
+        Does nothing if the parameter isn't cached.
+
+        Parameters
+        ----------
+        name : str
+            The name of the parameter.
+        value : bool, int, or float
+            The value.
+
+        """
+        ttl = self._policies.get(name, self._default)
+        if ttl is None:
+            self._values[name] = (value, None)
+        elif ttl > 0:
+            self._values[name] = (value, time.monotonic() + ttl)
+
+    def invalidate(self, name=None):
+        """ Drops the cached value of a parameter or of all of them.
+
+        Parameters
+        ----------
+        name : str or None, optional
+            The name of the parameter. ``None`` means all of them.
+
+        """
+        if name is None:
+            self._values.clear()
+        else:
+            self._values.pop(name, None)
+
+    def reset_stats(self):
+        """ Resets the hit and miss counts to zero.
+        """
+        self.hits = 0
+        self.misses = 0
+
+
+def program_hash(stripped_commands):
+    """ Gets the content hash of a program or profile.
+
+    Parameters
+    ----------
+    stripped_commands : list of str
+        The stripped commands making up the program or profile (see
+        ``strip_commands``).
+
+    Returns
+    -------
+    digest : str
+        The SHA-256 hash of the commands as a hex string.
+
+    """
+    return hashlib.sha256('\n'.join(stripped_commands).encode(
+        'utf-8')).hexdigest()
+
+
+class ProgramIndex(object):
+    """ Host side index of the programs and profiles on drives.
+
+    Keeps the content hash (see ``program_hash``) of each program and
+    profile known to be on each drive, so that setting one that is
+    already there doesn't need it to be read back from the drive. The
+    index can be kept in a file so that it persists between runs, in
+    which case it is loaded when made and saved every time it is
+    changed (the file is replaced in one go so that it is never left
+    half written).
+
+    An entry is stale, and so isn't used, once it is older than
+    `max_age`. The index can't see programs being changed on the drive
+    by anything else, so it should be invalidated when that happens.
+
+    Parameters
+    ----------
+    path : str or None, optional
+        Path of the file to keep the index in. ``None`` means it is
+        only kept in memory.
+    max_age : float or None, optional
+        Time in seconds after which an entry is stale. ``None`` means
+        entries never go stale.
+
+    Raises
+    ------
+    ValueError
+        If the file at `path` isn't a program index.
+
+    See Also
+    --------
+    GeminiMotorDrive.GeminiG6.set_program_profile
+    program_hash
+
+    Examples
+    --------
+
+    Keep the index in a file so that deploying unchanged programs is
+    quick.
+
+    >>> from GeminiMotorDrive import GeminiG6, get_driver
+    >>> from GeminiMotorDrive.utilities import ProgramIndex
+    >>> g = GeminiG6(get_driver(port='/dev/ttyS1'),
+    ...              program_index=ProgramIndex('programs.json'),
+    ...              drive_id='axis1')
+    >>> g.set_program_profile(1, ['A100', 'V5', 'D4000', 'GO'])
+    True
+
+    """
+    def __init__(self, path=None, max_age=None):
+        self.path = path
+        self.max_age = max_age
+        # The entries are held as [hash, time.time() when stored] by
+        # program or profile name for each drive.
+        self._entries = dict()
+        if path is not None and os.path.exists(path):
+            with open(path, 'r') as f:
+                data = json.load(f)
+            if not isinstance(data, dict) or data.get('version') != 1:
+                raise ValueError('Not a program index: ' + path)
+            self._entries = data['entries']
+
+    def lookup(self, drive, name):
+        """ Looks up the hash of a program or profile on a drive.
+
+        Parameters
+        ----------
+        drive : str
+            The identity of the drive.
+        name : str
+            The name of the program or profile, such as ``'PROG1'``.
+
+        Returns
+        -------
+        digest : str or None
+            The hash, or ``None`` if there isn't an entry for it or the
+            entry is stale.
+
+        """
+        entry = self._entries.get(drive, dict()).get(name)
+        if entry is None or (self.max_age is not None
+                             and time.time() - entry[1] > self.max_age):
+            return None
+        return entry[0]
+
+    def store(self, drive, name, digest):
+        """ Stores the hash of a program or profile on a drive.
+
+        Parameters
+        ----------
+        drive : str
+            The identity of the drive.
+        name : str
+            The name of the program or profile, such as ``'PROG1'``.
+        digest : str
+            The hash.
+
+        """
+        self._entries.setdefault(drive, dict())[name] = [digest,
+                                                         time.time()]
+        self.save()
+
+    def invalidate(self, drive=None, name=None):
+        """ Drops entries from the index.
+
+        Parameters
+        ----------
+        drive : str or None, optional
+            The identity of the drive. ``None`` means all drives.
+        name : str or None, optional
+            The name of the program or profile. ``None`` means all of
+            them.
+
+        """
+        if drive is None:
+            drives = list(self._entries)
+        else:
+            drives = [drive]
+        for d in drives:
+            if name is None:
+                self._entries.pop(d, None)
+            else:
+                self._entries.get(d, dict()).pop(name, None)
+        self.save()
+
+    def save(self):
+        """ Saves the index to its file if it has one.
+        """
+        if self.path is None:
+            return
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'version': 1, 'entries': self._entries}, f)
+        os.replace(tmp, self.path)
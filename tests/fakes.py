@@ -0,0 +1,103 @@
+# Copyright 2014-2016 Freja Nordsiek
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+""" Fake drivers and clocks for the tests.
+"""
+
+from GeminiMotorDrive import drivers, simulator
+
+
+class FakeClock(object):
+    """ Clock that only moves when slept on or advanced.
+
+    Can be given to ``simulator.SimulatedDrive`` and patched in for
+    ``time.monotonic`` and ``time.sleep``. It also moves on by `step`
+    every time it is read if `step` isn't zero.
+
+    """
+    def __init__(self, now=1000.0, step=0.0):
+        self.now = now
+        self.step = step
+        self.sleeps = []
+
+    def __call__(self):
+        now = self.now
+        self.now += self.step
+        return now
+
+    def monotonic(self):
+        return self()
+
+    def sleep(self, delay):
+        if delay < 0:
+            raise ValueError('sleep length must be non-negative')
+        self.sleeps.append(delay)
+        self.now += delay
+
+    def advance(self, delay):
+        self.now += delay
+
+
+class RecordingDriver(object):
+    """ Driver recording the commands sent through it.
+
+    Passes everything on to `driver` (by default an ``ASCII_RS232`` on
+    a simulated drive) except for the commands in `fail`, which get a
+    response with an error without being sent.
+
+    """
+    def __init__(self, driver=None, drive=None):
+        if driver is None:
+            driver = drivers.ASCII_RS232(simulator.SimulatedSerial(drive),
+                                         bulk_write=True)
+        self.driver = driver
+        self.commands = []
+        self.fail = set()
+
+    def __getattr__(self, name):
+        return getattr(self.driver, name)
+
+    def _failed(self, command):
+        return drivers.Response(command, command + '\r*ERROR\r\n',
+                                command, 'ERROR', [])
+
+    def send_command(self, command, **keywords):
+        self.commands.append(command)
+        if command in self.fail:
+            return self._failed(command)
+        return self.driver.send_command(command, **keywords)
+
+    def send_commands(self, commands, **keywords):
+        responses = []
+        eor = keywords.pop('eor', ('\n', '\n- '))
+        for i, command in enumerate(commands):
+            self.commands.append(command)
+            if command in self.fail:
+                responses.append(self._failed(command))
+                break
+            if isinstance(eor, list):
+                e = eor[i]
+            else:
+                e = eor
+            responses.extend(self.driver.send_commands([command], eor=e,
+                                                       **keywords))
+            if self.driver.command_error(responses[-1]):
+                break
+        return responses
+
+    def sent(self, prefix):
+        """ Gets the commands sent that start with `prefix`.
+        """
+        return [c for c in self.commands
+                if c.lstrip('!').startswith(prefix)]
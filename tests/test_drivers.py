@@ -0,0 +1,116 @@
+# Copyright 2014-2016 Freja Nordsiek
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+import asyncio
+import unittest
+
+import serial
+
+from GeminiMotorDrive import drivers, simulator
+
+
+class LossySerial(simulator.SimulatedSerial):
+    """ Simulated port that loses everything written at one baud rate.
+    """
+    lossy_baudrate = 19200
+
+    def write(self, data):
+        if self.baudrate == self.lossy_baudrate:
+            return len(data)
+        return simulator.SimulatedSerial.write(self, data)
+
+
+class RecordingDrive(simulator.SimulatedDrive):
+    """ Simulated drive recording what it is sent at which baud rate.
+    """
+    def __init__(self, *args, **keywords):
+        simulator.SimulatedDrive.__init__(self, *args, **keywords)
+        self.received = []
+
+    def write(self, data, baudrate=None):
+        self.received.append((bytes(data), baudrate))
+        return simulator.SimulatedDrive.write(self, data, baudrate)
+
+
+class TestBaudrate(unittest.TestCase):
+    def test_switch(self):
+        ser = simulator.SimulatedSerial()
+        with drivers.ASCII_RS232(ser, baudrate=19200,
+                                 bulk_write=True) as ar:
+            self.assertEqual(ar.baudrate, 19200)
+            self.assertEqual(ser.drive.baudrate, 19200)
+            self.assertTrue(ar.send_command('DRIVE1').ok)
+        self.assertEqual(ser.drive.baudrate, 9600)
+
+    def test_rejected_rate_falls_back_without_baud(self):
+        # The drive doesn't support the rate and stays at 9600, so only
+        # the one BAUD command is sent.
+        drive = RecordingDrive()
+        with drivers.ASCII_RS232(simulator.SimulatedSerial(drive),
+                                 baudrate=14400, bulk_write=True) as ar:
+            self.assertEqual(ar.baudrate, 9600)
+            self.assertEqual(drive.baudrate, 9600)
+            self.assertTrue(ar.send_command('DRIVE1').ok)
+            bauds = [r for r in drive.received if b'BAUD' in r[0]]
+            self.assertEqual(bauds, [(b'!BAUD14400', 9600)])
+
+    def test_unreachable_raises(self):
+        # The drive switches, but nothing gets through at the new rate,
+        # so it can't be told to switch back either.
+        ser = LossySerial()
+        self.assertRaises(serial.SerialException, drivers.ASCII_RS232,
+                          ser, baudrate=19200, bulk_write=True)
+        # The port was given, and so belongs to the caller.
+        self.assertTrue(ser.is_open)
+
+
+class TestPortOwnership(unittest.TestCase):
+    def test_given_port_left_open(self):
+        ser = simulator.SimulatedSerial()
+        drivers.ASCII_RS232(ser, bulk_write=True).close()
+        self.assertTrue(ser.is_open)
+        # The port can still be used by another driver.
+        with drivers.ASCII_RS232(ser, bulk_write=True) as ar:
+            self.assertTrue(ar.send_command('DRIVE1').ok)
+
+    def test_opened_port_closed(self):
+        ar = drivers.ASCII_RS232('loop://', check_echo=False,
+                                 restore_on_close=False)
+        ser = ar._ser
+        ar.close()
+        self.assertFalse(ser.is_open)
+
+    def test_async_handshake(self):
+        ser = simulator.SimulatedSerial()
+
+        async def run():
+            async with drivers.AsyncASCII_RS232(ser,
+                                                bulk_write=True) as ar:
+                settings = dict(ser.drive.comms_settings)
+                response = await ar.send_command('DRIVE1')
+            return settings, response
+
+        start = time.monotonic()
+        settings, response = asyncio.run(run())
+        self.assertLess(time.monotonic() - start, 2.0)
+        self.assertEqual(settings['EOT'], [10, 0, 0])
+        self.assertEqual(settings['ERROK'], [0, 0, 0, 0])
+        self.assertTrue(response.ok)
+        self.assertEqual(ser.drive.comms_settings['EOT'], [13, 0, 0])
+        self.assertTrue(ser.is_open)
+
+
+if __name__ == '__main__':
+    unittest.main()
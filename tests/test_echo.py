@@ -0,0 +1,156 @@
+# Copyright 2014-2016 Freja Nordsiek
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import random
+import unittest
+
+from GeminiMotorDrive.drivers import EchoReconciler, \
+    _common_prefix_length
+
+
+def _process(stream):
+    """ Processes the backspaces in an echo the slow way.
+    """
+    echo = bytearray()
+    for b in stream:
+        if b == 8:
+            if len(echo) != 0:
+                del echo[-1]
+        else:
+            echo.append(b)
+    return bytes(echo)
+
+
+def _prefix(a, b):
+    """ Gets the length of the common prefix the slow way.
+    """
+    n = 0
+    while n < min(len(a), len(b)) and a[n] == b[n]:
+        n += 1
+    return n
+
+
+def _noisy_echo(command, rng, drop=0.1, garble=0.1, fix=0.5):
+    """ Makes the echo a noisy line gives of writing a command.
+
+    Characters get dropped and garbled, and some of the garbled ones
+    get backspaced over and written again.
+
+    """
+    stream = bytearray()
+    for c in command:
+        r = rng.random()
+        if r < drop:
+            continue
+        if r < drop + garble:
+            stream.append(rng.choice(b'ABCXYZ019 '))
+            if rng.random() < fix:
+                stream += b'\x08' + bytes([c])
+            continue
+        stream.append(c)
+    # The occasional stray backspace, even past the start.
+    if rng.random() < 0.2:
+        stream += b'\x08' * rng.randint(1, 3)
+    return bytes(stream)
+
+
+def _splits(stream, rng):
+    """ Splits a stream into chunks in a few different ways.
+    """
+    yield [stream]
+    yield [stream[i:(i+1)] for i in range(len(stream))]
+    for _ in range(3):
+        chunks = []
+        i = 0
+        while i < len(stream):
+            n = rng.randint(1, 7)
+            chunks.append(stream[i:(i+n)])
+            i += n
+        yield chunks
+
+
+class TestCommonPrefixLength(unittest.TestCase):
+    def test_lengths(self):
+        command = b'DRIVE1'
+        self.assertEqual(_common_prefix_length(command, 0, b'DRIVE1'), 6)
+        self.assertEqual(_common_prefix_length(command, 0, b'DRIX'), 3)
+        self.assertEqual(_common_prefix_length(command, 2, b'IVE'), 3)
+        self.assertEqual(_common_prefix_length(command, 2, b'X'), 0)
+        self.assertEqual(_common_prefix_length(command, 4, b'E1XX'), 2)
+        self.assertEqual(_common_prefix_length(command, 6, b'1'), 0)
+
+
+class TestEchoReconciler(unittest.TestCase):
+    def check(self, command, stream, chunks):
+        r = EchoReconciler(command)
+        for chunk in chunks:
+            r.feed(chunk)
+        echo = _process(stream)
+        confirmed = _prefix(echo, command)
+        self.assertEqual(r.echo, echo)
+        self.assertEqual(len(r), len(echo))
+        self.assertEqual(r.confirmed, confirmed)
+        self.assertEqual(r.done, echo == command)
+        for n in range(len(command) + 1):
+            self.assertEqual(r.matches(n), echo == command[:n])
+        if echo == command:
+            self.assertIsNone(r.next_byte())
+        elif confirmed == len(echo):
+            self.assertEqual(r.next_byte(),
+                             command[confirmed:(confirmed + 1)])
+        else:
+            self.assertEqual(r.next_byte(), b'\x08')
+
+    def test_clean(self):
+        self.check(b'DRIVE1', b'DRIVE1', [b'DRI', b'VE1'])
+
+    def test_dropped(self):
+        r = EchoReconciler(b'DRIVE1')
+        r.feed(b'DRVE1')
+        self.assertEqual(r.confirmed, 2)
+        self.assertFalse(r.done)
+        self.assertEqual(r.next_byte(), b'\x08')
+
+    def test_backspace_corrected(self):
+        self.check(b'DRIVE1', b'DRX\x08IVE1', [b'DR', b'X\x08', b'IVE1'])
+        self.check(b'DRIVE1', b'DRX\x08IVE1', [b'DRX', b'\x08IV', b'E1'])
+
+    def test_backspace_past_start(self):
+        self.check(b'D1', b'\x08\x08D1', [b'\x08', b'\x08D', b'1'])
+
+    def test_fixing(self):
+        # Writing what next_byte gives converges on the command no
+        # matter what was echoed first.
+        r = EchoReconciler(b'DRIVE1')
+        r.feed(b'DQXV')
+        for _ in range(20):
+            b = r.next_byte()
+            if b is None:
+                break
+            r.feed(b)
+        self.assertTrue(r.done)
+
+    def test_noisy_streams(self):
+        rng = random.Random(1234)
+        commands = [b'DRIVE1', b'!TAS', b'DEF PROG1',
+                    b'A' + b'1234567890' * 20]
+        for _ in range(200):
+            command = rng.choice(commands)
+            stream = _noisy_echo(command, rng)
+            for chunks in _splits(stream, rng):
+                self.check(command, stream, chunks)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,174 @@
+# Copyright 2014-2016 Freja Nordsiek
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+import unittest
+
+from GeminiMotorDrive import drivers, simulator
+from GeminiMotorDrive.drivers import _EORScanner
+
+
+def _scan(eor, chunks):
+    """ Scans a buffer growing by `chunks`, giving each result.
+    """
+    scanner = _EORScanner(eor)
+    buf = bytearray()
+    ends = []
+    for chunk in chunks:
+        buf += chunk
+        ends.append(scanner.scan(buf))
+    return ends
+
+
+class TestEORScanner(unittest.TestCase):
+    def test_whole(self):
+        self.assertEqual(_scan([b'\n'], [b'DRIVE1\r\r\n']), [9])
+        self.assertEqual(_scan([b'\n'], [b'DRIVE1\r']), [-1])
+
+    def test_split(self):
+        self.assertEqual(_scan([b'\r\n'], [b'ab\r', b'\n']), [-1, 4])
+        self.assertEqual(_scan([b'*END\n'],
+                               [b'*A1\n*E', b'N', b'D', b'\n']),
+                         [-1, -1, -1, 9])
+
+    def test_byte_at_a_time(self):
+        data = b'*A10\n*V2\n*END\n'
+        ends = _scan([b'*END\n'], [data[i:i + 1]
+                                   for i in range(len(data))])
+        self.assertEqual(ends, [-1] * (len(data) - 1) + [len(data)])
+
+    def test_first_position_wins(self):
+        self.assertEqual(_scan([b'*END\n', b'\n'], [b'a\n*END\n']), [2])
+        self.assertEqual(_scan([b'\n', b'*END\n'], [b'*END\na\n']), [5])
+
+    def test_tie_goes_to_first_given(self):
+        self.assertEqual(_scan([b'\n', b'\n- '], [b'V1\r\n- ']), [4])
+        self.assertEqual(_scan([b'\n- ', b'\n'], [b'V1\r\n- ']), [6])
+
+    def test_longer_eor_split_after_shorter(self):
+        # The shorter one given first is only there once the longer one
+        # has started arriving, and wins the tie.
+        self.assertEqual(_scan([b'\n', b'\n- '], [b'V1\r', b'\n', b'- ']),
+                         [-1, 4, 4])
+
+    def test_leftover(self):
+        self.assertEqual(_scan([b'\n'], [b'ok\r\nnext\r\n']), [4])
+
+    def test_empty_chunks(self):
+        self.assertEqual(_scan([b'\n'], [b'', b'a', b'', b'\n']),
+                         [-1, -1, -1, 2])
+
+
+class TestGetResponse(unittest.TestCase):
+    # The drive's output is queued to arrive at set times so that it
+    # gets read in several chunks.
+    background_reader = False
+
+    def setUp(self):
+        self.drive = simulator.SimulatedDrive()
+        self.ar = drivers.ASCII_RS232(
+            simulator.SimulatedSerial(self.drive), bulk_write=True,
+            background_reader=self.background_reader)
+
+    def tearDown(self):
+        self.ar.close()
+
+    def emit(self, *chunks):
+        """ Queues (delay, data) chunks of output from the drive.
+        """
+        now = time.monotonic()
+        for delay, data in chunks:
+            self.drive._emit(data, now + delay)
+
+    def test_split_eor(self):
+        self.emit((0.0, b'V1\r'), (0.05, b'\n'))
+        self.assertEqual(self.ar._get_response(timeout=1.0), 'V1\r\n')
+
+    def test_split_long_eor(self):
+        self.emit((0.0, b'RUN PROG1\r*A1\n*E'), (0.03, b'ND'),
+                  (0.06, b'\n'))
+        self.assertEqual(self.ar._get_response(timeout=1.0,
+                                               eor='*END\n'),
+                         'RUN PROG1\r*A1\n*END\n')
+
+    def test_eor_list(self):
+        self.emit((0.0, b'DEF PROG1\r\n- '))
+        self.assertEqual(self.ar._get_response(eor=['\n- ']),
+                         'DEF PROG1\r\n- ')
+        self.emit((0.0, b'DEF PROG1\r\n- '))
+        self.assertEqual(self.ar._get_response(eor=('\n', '\n- ')),
+                         'DEF PROG1\r\n')
+        self.ar._discard()
+
+    def test_leftover(self):
+        # What came after the EOR is not part of the response, and
+        # doesn't get mixed into the next one.
+        self.emit((0.0, b'V1\r\nV2\r\n'))
+        self.assertEqual(self.ar._get_response(timeout=1.0), 'V1\r\n')
+        response = self.ar.send_command('V3')
+        self.assertEqual(response.raw, 'V3\r\r\n')
+
+    def test_timeout(self):
+        self.emit((0.0, b'V1\r'), (0.5, b'\n'))
+        start = time.monotonic()
+        self.assertEqual(self.ar._get_response(timeout=0.1), 'V1\r')
+        self.assertLess(time.monotonic() - start, 0.4)
+        time.sleep(0.5)
+        self.ar._discard()
+
+    def test_idle(self):
+        # Each piece arrives within the idle timeout of the last, but
+        # the whole response takes longer than it.
+        self.emit(*[(0.05 * i, b'*A1\n') for i in range(6)]
+                  + [(0.3, b'*END\n')])
+        response = self.ar._get_response(timeout=0.15, eor='*END\n',
+                                         idle=True)
+        self.assertTrue(response.endswith('*END\n'))
+        self.assertEqual(response.count('*A1\n'), 6)
+
+    def test_idle_quiet(self):
+        self.emit((0.0, b'*A1\n'), (0.05, b'*A2\n'), (0.6, b'*END\n'))
+        start = time.monotonic()
+        response = self.ar._get_response(timeout=0.1, eor='*END\n',
+                                         idle=True)
+        self.assertEqual(response, '*A1\n*A2\n')
+        self.assertLess(time.monotonic() - start, 0.45)
+        time.sleep(0.6)
+        self.ar._discard()
+
+    def test_idle_deadline(self):
+        # The overall deadline isn't pushed back by the drive talking.
+        self.emit(*[(0.05 * i, b'*A1\n') for i in range(10)])
+        start = time.monotonic()
+        self.ar._get_response(timeout=0.1, eor='*END\n', idle=True,
+                              deadline=start + 0.2)
+        self.assertLess(time.monotonic() - start, 0.35)
+        time.sleep(0.3)
+        self.ar._discard()
+
+
+class TestGetResponseReader(TestGetResponse):
+    background_reader = True
+
+    def test_leftover(self):
+        # The background reader keeps what came after the EOR, which
+        # becomes unsolicited data when discarded.
+        self.emit((0.0, b'V1\r\nV2\r\n'))
+        self.assertEqual(self.ar._get_response(timeout=1.0), 'V1\r\n')
+        self.ar._discard()
+        self.assertEqual(self.ar.read_unsolicited()[0], 'V2\r\n')
+
+
+if __name__ == '__main__':
+    unittest.main()
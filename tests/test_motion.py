@@ -0,0 +1,102 @@
+# Copyright 2014-2016 Freja Nordsiek
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+import unittest
+from unittest import mock
+
+import GeminiMotorDrive
+from GeminiMotorDrive import GeminiG6, simulator
+
+from fakes import FakeClock, RecordingDriver
+
+
+# A move of one revolution taking 0.25 s.
+MOVE = {'A': 100.0, 'AD': 0.0, 'V': 5.0, 'D': 4000, 'ERES': 4000}
+
+
+class TestWaitForMotionComplete(unittest.TestCase):
+    def setUp(self):
+        # The drive and wait_for_motion_complete use the fake clock,
+        # which starts at the real time so that the driver's own
+        # deadlines (on the real clock) are not passed.
+        self.clock = FakeClock(time.monotonic())
+        self.drive = simulator.SimulatedDrive(clock=self.clock)
+        self.driver = RecordingDriver(drive=self.drive)
+        self.g = GeminiG6(self.driver)
+        self.patch = mock.patch.object(GeminiMotorDrive, 'time',
+                                       self.clock)
+        self.patch.start()
+
+    def tearDown(self):
+        self.patch.stop()
+        self.driver.close()
+
+    def go(self, move=MOVE):
+        self.driver.send_commands(['DRIVE1', 'A' + str(move['A']),
+                                   'AD' + str(move['AD']),
+                                   'V' + str(move['V']),
+                                   'D' + str(move['D']), 'GO'])
+        self.clock.sleeps = []
+        del self.driver.commands[:]
+        return self.clock.now
+
+    def test_lead_time_sleep(self):
+        started = self.go()
+        self.assertTrue(self.g.wait_for_motion_complete(
+            timeout=5.0, move=MOVE, started=started))
+        # Nothing is sent till shortly before the expected end.
+        self.assertAlmostEqual(self.clock.sleeps[0],
+                               0.25 - 0.02 - 0.1 * 0.25)
+        self.assertLess(len(self.driver.sent('TAS')), 10)
+        self.assertLessEqual(self.clock.now - self.drive._move_end,
+                             0.002 + 1e-9)
+
+    def test_overdue_polls_fast(self):
+        started = self.go()
+        self.assertTrue(self.g.wait_for_motion_complete(
+            timeout=5.0, expected=0.1, started=started))
+        overdue = [d for d in self.clock.sleeps[1:]
+                   if d == self.clock.sleeps[-1]]
+        self.assertGreater(len(overdue), 10)
+        self.assertEqual(self.clock.sleeps[-1], 0.002)
+        self.assertLessEqual(self.clock.now - self.drive._move_end,
+                             0.002 + 1e-9)
+
+    def test_no_estimate_backs_off_to_max_interval(self):
+        move = dict(MOVE, D=40000)
+        self.go(move)
+        self.assertTrue(self.g.wait_for_motion_complete(timeout=10.0))
+        self.assertEqual(max(self.clock.sleeps), 0.02)
+        self.assertLessEqual(self.clock.now - self.drive._move_end,
+                             0.02 + 1e-9)
+
+    def test_deadline(self):
+        self.go(dict(MOVE, D=40000))
+        start = self.clock.now
+        self.assertFalse(self.g.wait_for_motion_complete(timeout=0.3))
+        self.assertAlmostEqual(self.clock.now - start, 0.3)
+
+    def test_clock_moving_during_lead_time(self):
+        # The expected end is just far enough off that the lead time
+        # sleep is half a clock step in the future when first checked.
+        started = self.go()
+        self.clock.step = 0.001
+        self.assertTrue(self.g.wait_for_motion_complete(
+            expected=(0.02 + 0.0005) / 0.9, started=started,
+            deadline=started + 5.0))
+
+
+if __name__ == '__main__':
+    unittest.main()
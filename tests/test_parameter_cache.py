@@ -0,0 +1,138 @@
+# Copyright 2014-2016 Freja Nordsiek
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import unittest
+from unittest import mock
+
+from GeminiMotorDrive import GeminiG6, utilities
+from GeminiMotorDrive.utilities import ParameterCache, \
+    PARAMETER_CACHE_POLICIES
+
+from fakes import FakeClock, RecordingDriver
+
+
+class TestParameterCache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.patch = mock.patch.object(utilities, 'time', self.clock)
+        self.patch.start()
+        self.cache = ParameterCache()
+
+    def tearDown(self):
+        self.patch.stop()
+
+    def test_configuration_cached_till_written(self):
+        self.cache.store('ERES', 4000)
+        self.clock.advance(1e6)
+        self.assertEqual(self.cache.lookup('ERES'), 4000)
+        self.cache.store('ERES', 8000)
+        self.assertEqual(self.cache.lookup('ERES'), 8000)
+
+    def test_drive_ttl(self):
+        self.assertEqual(PARAMETER_CACHE_POLICIES['DRIVE'], 0.25)
+        self.cache.store('DRIVE', True)
+        self.clock.advance(0.24)
+        self.assertTrue(self.cache.lookup('DRIVE'))
+        self.clock.advance(0.01)
+        self.assertIsNone(self.cache.lookup('DRIVE'))
+        # Storing it again starts a new time to live.
+        self.cache.store('DRIVE', False)
+        self.clock.advance(0.2)
+        self.assertIs(self.cache.lookup('DRIVE'), False)
+
+    def test_uncached(self):
+        self.cache.store('V', 5.0)
+        self.assertIsNone(self.cache.lookup('V'))
+        cache = ParameterCache(policies={}, default=None)
+        cache.store('V', 5.0)
+        self.assertEqual(cache.lookup('V'), 5.0)
+
+    def test_invalidate(self):
+        self.cache.store('ERES', 4000)
+        self.cache.store('DMEPIT', 42.0)
+        self.cache.invalidate('ERES')
+        self.assertIsNone(self.cache.lookup('ERES'))
+        self.assertEqual(self.cache.lookup('DMEPIT'), 42.0)
+        self.cache.invalidate('ERES')
+        self.cache.invalidate()
+        self.assertIsNone(self.cache.lookup('DMEPIT'))
+
+    def test_hit_rate(self):
+        self.assertEqual(self.cache.hit_rate, 0.0)
+        self.cache.lookup('ERES')
+        self.cache.store('ERES', 4000)
+        for i in range(3):
+            self.cache.lookup('ERES')
+        self.assertEqual((self.cache.hits, self.cache.misses), (3, 1))
+        self.assertEqual(self.cache.hit_rate, 0.75)
+        self.cache.reset_stats()
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 0))
+        self.assertEqual(self.cache.hit_rate, 0.0)
+
+
+class TestGeminiG6Cache(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.patch = mock.patch.object(utilities, 'time', self.clock)
+        self.patch.start()
+        self.driver = RecordingDriver()
+        self.g = GeminiG6(self.driver, parameter_cache=ParameterCache())
+
+    def tearDown(self):
+        self.patch.stop()
+        self.driver.close()
+
+    def queries(self, name):
+        return len([c for c in self.driver.sent(name) if c == name])
+
+    def test_reads_cached(self):
+        for i in range(4):
+            self.assertEqual(self.g.encoder_resolution, 4000)
+        self.assertEqual(self.queries('ERES'), 1)
+        self.assertEqual(self.g.parameter_cache.hit_rate, 0.75)
+
+    def test_write_through(self):
+        self.g.energized = True
+        self.assertTrue(self.g.energized)
+        self.assertEqual(self.queries('DRIVE'), 0)
+        self.clock.advance(0.25)
+        self.assertTrue(self.g.energized)
+        self.assertEqual(self.queries('DRIVE'), 1)
+
+    def test_kill_invalidates(self):
+        self.g.encoder_resolution
+        self.g.kill()
+        self.g.encoder_resolution
+        self.assertEqual(self.queries('ERES'), 2)
+
+    def test_reset_invalidates(self):
+        # The reset de-energizes the drive, which must be read back.
+        self.g.energized = True
+        self.g.encoder_resolution
+        self.g.reset()
+        self.assertFalse(self.g.energized)
+        self.g.encoder_resolution
+        self.assertEqual(self.queries('DRIVE'), 1)
+        self.assertEqual(self.queries('ERES'), 2)
+
+    def test_run_program_profile_invalidates(self):
+        self.assertTrue(self.g.set_program_profile(1, ['ERES8000']))
+        self.assertEqual(self.g.encoder_resolution, 4000)
+        self.g.run_program_profile(1, timeout=1.0)
+        self.assertEqual(self.g.encoder_resolution, 8000)
+        self.assertEqual(self.queries('ERES'), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
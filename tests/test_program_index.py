@@ -0,0 +1,105 @@
+# Copyright 2014-2016 Freja Nordsiek
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from GeminiMotorDrive import GeminiG6, utilities
+
+from fakes import RecordingDriver
+
+
+PROGRAM = ['A10', 'V5', 'D4000', 'GO']
+
+
+class TestProgramIndex(unittest.TestCase):
+    def setUp(self):
+        self.driver = RecordingDriver()
+        self.index = utilities.ProgramIndex(max_age=60.0)
+        self.g = GeminiG6(self.driver, program_index=self.index,
+                          drive_id='axis1')
+        self.digest = utilities.program_hash(PROGRAM)
+
+    def tearDown(self):
+        self.driver.close()
+
+    def test_drive_id_required(self):
+        self.assertRaises(ValueError, GeminiG6, RecordingDriver(),
+                          program_index=self.index)
+
+    def test_miss_reads_back_and_stores(self):
+        self.assertTrue(self.g.set_program_profile(1, PROGRAM))
+        self.assertEqual(len(self.driver.sent('TPROG')), 1)
+        self.assertEqual(self.index.lookup('axis1', 'PROG1'),
+                         self.digest)
+        self.assertEqual(self.g.get_program(1), PROGRAM)
+
+    def test_hit_sends_nothing(self):
+        self.g.set_program_profile(1, PROGRAM)
+        del self.driver.commands[:]
+        self.assertTrue(self.g.set_program_profile(1, PROGRAM))
+        self.assertEqual(self.driver.commands, [])
+
+    def test_fresh_mismatch_uploads_without_readback(self):
+        self.g.set_program_profile(1, PROGRAM)
+        del self.driver.commands[:]
+        changed = PROGRAM[:-1] + ['GO0']
+        self.assertTrue(self.g.set_program_profile(1, changed))
+        self.assertEqual(self.driver.sent('TPROG'), [])
+        self.assertIn('DEF PROG1', self.driver.commands)
+        self.assertEqual(self.index.lookup('axis1', 'PROG1'),
+                         utilities.program_hash(changed))
+        self.assertEqual(self.g.get_program(1), changed)
+
+    def test_stale_entry_reads_back(self):
+        self.g.set_program_profile(1, PROGRAM)
+        self.index._entries['axis1']['PROG1'][1] -= 120.0
+        self.assertIsNone(self.index.lookup('axis1', 'PROG1'))
+        del self.driver.commands[:]
+        self.assertTrue(self.g.set_program_profile(1, PROGRAM))
+        self.assertEqual(len(self.driver.sent('TPROG')), 1)
+        self.assertNotIn('DEF PROG1', self.driver.commands)
+        self.assertEqual(self.index.lookup('axis1', 'PROG1'),
+                         self.digest)
+
+    def test_upload_failure_invalidates(self):
+        self.g.set_program_profile(1, PROGRAM)
+        self.driver.fail.add('END')
+        self.assertFalse(self.g.set_program_profile(1, ['D1', 'GO']))
+        self.assertIsNone(self.index.lookup('axis1', 'PROG1'))
+
+    def test_profile_hit(self):
+        self.assertTrue(self.g.set_program_profile(
+            2, PROGRAM, program_or_profile='profile'))
+        del self.driver.commands[:]
+        self.assertTrue(self.g.set_program_profile(
+            2, PROGRAM, program_or_profile='profile'))
+        self.assertEqual(self.driver.commands, [])
+
+    def test_persisted(self):
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, 'index.json')
+            index = utilities.ProgramIndex(path)
+            index.store('axis1', 'PROG1', self.digest)
+            self.assertEqual(utilities.ProgramIndex(path).lookup(
+                'axis1', 'PROG1'), self.digest)
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    unittest.main()
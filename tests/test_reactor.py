@@ -0,0 +1,64 @@
+# Copyright 2014-2016 Freja Nordsiek
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import unittest
+
+from GeminiMotorDrive import GeminiG6, simulator
+from GeminiMotorDrive.drivers import _COMMS_SETTINGS, \
+    _DEFAULT_COMMS_SETTINGS
+from GeminiMotorDrive.reactor import DriveReactor
+
+
+def _settings(commands):
+    """ Converts settings commands to the drive's comms_settings.
+    """
+    settings = dict()
+    for command in commands:
+        keyword = command.rstrip('0123456789,')
+        settings[keyword] = [int(v) for v in
+                             command[len(keyword):].split(',')]
+    return settings
+
+
+@unittest.skipUnless(os.name == 'posix', 'needs a pty')
+class TestReactorCommsSettings(unittest.TestCase):
+    def setUp(self):
+        self.pd = simulator.PtyDrive()
+        self.reactor = DriveReactor()
+
+    def tearDown(self):
+        self.reactor.close()
+        self.pd.close()
+
+    def test_add_drive_sets_comms_settings(self):
+        drive = self.reactor.add_drive(self.pd.port)
+        drive.send_command('DRIVE1', timeout=5.0)
+        self.assertEqual(self.pd.drive.comms_settings,
+                         _settings(_COMMS_SETTINGS))
+
+    def test_multiline_response(self):
+        g = GeminiG6(self.reactor.add_drive(self.pd.port))
+        self.assertTrue(g.set_program_profile(1, ['D5', 'GO']))
+        self.assertEqual(g.get_program(1), ['D5', 'GO'])
+
+    def test_close_restores_comms_settings(self):
+        drive = self.reactor.add_drive(self.pd.port)
+        drive.close().result(timeout=10.0)
+        self.assertEqual(self.pd.drive.comms_settings,
+                         _settings(_DEFAULT_COMMS_SETTINGS))
+
+
+if __name__ == '__main__':
+    unittest.main()
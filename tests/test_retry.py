@@ -0,0 +1,252 @@
+# Copyright 2014-2016 Freja Nordsiek
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+import unittest
+from unittest import mock
+
+import serial
+
+from GeminiMotorDrive import drivers, retry, simulator
+from GeminiMotorDrive.retry import RetryBudget, RetryPolicy, CLOSED, \
+    OPEN, HALF_OPEN
+
+from fakes import FakeClock
+
+
+class TestCircuitBreaker(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.patch = mock.patch.object(retry, 'time', self.clock)
+        self.patch.start()
+        self.policy = RetryPolicy(failure_threshold=3, reset_time=2.0)
+
+    def tearDown(self):
+        self.patch.stop()
+
+    def open(self):
+        for i in range(3):
+            self.assertTrue(self.policy.allow())
+            self.policy.record(False)
+        self.assertEqual(self.policy.state, OPEN)
+
+    def test_opens_at_threshold(self):
+        for i in range(2):
+            self.policy.record(False)
+            self.assertEqual(self.policy.state, CLOSED)
+            self.assertTrue(self.policy.allow())
+        self.policy.record(False)
+        self.assertEqual(self.policy.state, OPEN)
+        self.assertFalse(self.policy.allow())
+
+    def test_response_resets_count(self):
+        self.policy.record(False)
+        self.policy.record(False)
+        self.policy.record(True)
+        self.policy.record(False)
+        self.policy.record(False)
+        self.assertEqual(self.policy.state, CLOSED)
+
+    def test_half_open_then_closed(self):
+        self.open()
+        self.clock.advance(1.9)
+        self.assertFalse(self.policy.allow())
+        self.clock.advance(0.1)
+        self.assertTrue(self.policy.allow())
+        self.assertEqual(self.policy.state, HALF_OPEN)
+        # Only the one probe is let through.
+        self.assertFalse(self.policy.allow())
+        self.policy.record(True)
+        self.assertEqual(self.policy.state, CLOSED)
+        self.assertTrue(self.policy.allow())
+
+    def test_half_open_then_open(self):
+        self.open()
+        self.clock.advance(2.0)
+        self.assertTrue(self.policy.allow())
+        self.clock.advance(0.5)
+        # A single failed probe reopens it for another reset_time.
+        self.policy.record(False)
+        self.assertEqual(self.policy.state, OPEN)
+        self.clock.advance(1.9)
+        self.assertFalse(self.policy.allow())
+        self.clock.advance(0.1)
+        self.assertTrue(self.policy.allow())
+        self.assertEqual(self.policy.state, HALF_OPEN)
+
+    def test_unrecorded_probe_reprobed(self):
+        self.open()
+        self.clock.advance(2.0)
+        self.assertTrue(self.policy.allow())
+        self.clock.advance(1.9)
+        self.assertFalse(self.policy.allow())
+        self.clock.advance(0.1)
+        self.assertTrue(self.policy.allow())
+        self.assertEqual(self.policy.state, HALF_OPEN)
+        self.assertFalse(self.policy.allow())
+
+    def test_disabled(self):
+        policy = RetryPolicy(failure_threshold=None)
+        for i in range(100):
+            policy.record(False)
+        self.assertEqual(policy.state, CLOSED)
+        self.assertTrue(policy.allow())
+
+    def test_reset(self):
+        self.open()
+        self.policy.reset()
+        self.assertEqual(self.policy.state, CLOSED)
+        self.policy.record(False)
+        self.policy.record(False)
+        self.assertEqual(self.policy.state, CLOSED)
+
+    def test_get_deadline(self):
+        policy = RetryPolicy(max_elapsed=5.0)
+        now = self.clock.now
+        self.assertEqual(policy.get_deadline(), now + 5.0)
+        self.assertEqual(policy.get_deadline(now + 1.0), now + 1.0)
+        self.assertEqual(policy.get_deadline(now + 9.0), now + 5.0)
+        self.assertEqual(RetryPolicy().get_deadline(now + 9.0),
+                         now + 9.0)
+        self.assertIsNone(RetryPolicy().get_deadline())
+
+
+class TestBackoff(unittest.TestCase):
+    def test_exponential(self):
+        policy = RetryPolicy(delay=0.1, factor=2.0, max_delay=1.0,
+                             jitter=0.0)
+        self.assertEqual([policy.backoff(i) for i in range(1, 7)],
+                         [0.1, 0.2, 0.4, 0.8, 1.0, 1.0])
+
+    def test_jitter_bounds(self):
+        policy = RetryPolicy(delay=0.5, jitter=0.2)
+        for value, expected in ((0.0, 0.5), (0.5, 0.45),
+                                (0.999999, 0.4000001)):
+            with mock.patch.object(retry.random, 'random',
+                                   return_value=value):
+                self.assertAlmostEqual(policy.backoff(1), expected)
+        for i in range(1000):
+            self.assertTrue(0.4 <= policy.backoff(1) <= 0.5)
+
+    def test_jitter_clamped(self):
+        self.assertEqual(RetryPolicy(jitter=2.0).jitter, 1.0)
+        self.assertEqual(RetryPolicy(jitter=-1.0).jitter, 0.0)
+
+
+class TestBudget(unittest.TestCase):
+    def test_budget(self):
+        budget = RetryPolicy(budget=2).new_budget()
+        self.assertEqual(budget.remaining, 2)
+        self.assertTrue(budget.take())
+        self.assertTrue(budget.take())
+        self.assertFalse(budget.take())
+        self.assertEqual(budget.remaining, 0)
+
+    def test_unlimited(self):
+        budget = RetryBudget()
+        for i in range(100):
+            self.assertTrue(budget.take())
+        self.assertIsNone(budget.remaining)
+
+    def test_exhausted(self):
+        # Every command gets garbled, so each would be retried twice,
+        # but the call's budget only has one retry.
+        drive = simulator.SimulatedDrive()
+        ar = drivers.ASCII_RS232(simulator.SimulatedSerial(drive),
+                                 bulk_write=True, check_echo=False)
+        try:
+            ar.retry_policy = RetryPolicy(delay=0.0, budget=1)
+            drive._error_rate = 1.0
+            attempts = []
+            for i in range(2):
+                before = drive.commands
+                response = ar.send_command('V1', max_retries=2)
+                self.assertFalse(response.ok)
+                attempts.append(drive.commands - before)
+            drive._error_rate = 0.0
+        finally:
+            ar.close()
+        # Each call gets its own budget.
+        self.assertEqual(attempts, [2, 2])
+
+
+class SilentSerial(simulator.SimulatedSerial):
+    """ Simulated port that can be made to lose or fail all writes.
+    """
+    silent = False
+    broken = False
+
+    def write(self, data):
+        if self.broken:
+            raise serial.SerialException('Port broke.')
+        if self.silent:
+            return len(data)
+        return simulator.SimulatedSerial.write(self, data)
+
+
+class TestDriverProbe(unittest.TestCase):
+    # A probe that doesn't finish must not leave the circuit stuck
+    # half-open.
+    def setUp(self):
+        self.ser = SilentSerial()
+        self.ar = drivers.ASCII_RS232(self.ser, bulk_write=True,
+                                      check_echo=False)
+        self.policy = RetryPolicy(delay=0.0, failure_threshold=2,
+                                  reset_time=0.1)
+        self.ar.retry_policy = self.policy
+
+    def tearDown(self):
+        self.ser.silent = False
+        self.ser.broken = False
+        self.ar.close()
+
+    def open(self):
+        self.ser.silent = True
+        self.ar.send_command('V1', timeout=0.02, max_retries=1)
+        self.assertEqual(self.policy.state, OPEN)
+
+    def test_open_fails_fast(self):
+        self.open()
+        self.ser.silent = False
+        before = self.ser.drive.commands
+        response = self.ar.send_command('V1')
+        self.assertFalse(response.ok)
+        self.assertEqual(self.ser.drive.commands, before)
+
+    def test_probe_cut_short(self):
+        self.open()
+        time.sleep(0.1)
+        self.ar.send_command('V1', deadline=time.monotonic() + 0.02)
+        self.assertEqual(self.policy.state, OPEN)
+        self.ser.silent = False
+        time.sleep(0.1)
+        self.assertTrue(self.ar.send_command('V2').ok)
+        self.assertEqual(self.policy.state, CLOSED)
+
+    def test_probe_raises(self):
+        self.open()
+        time.sleep(0.1)
+        self.ser.broken = True
+        self.assertRaises(serial.SerialException, self.ar.send_command,
+                          'V1')
+        self.assertEqual(self.policy.state, OPEN)
+        self.ser.broken = False
+        self.ser.silent = False
+        time.sleep(0.1)
+        self.assertTrue(self.ar.send_command('V2').ok)
+        self.assertEqual(self.policy.state, CLOSED)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,252 @@
+# Copyright 2014-2016 Freja Nordsiek
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import time
+import asyncio
+import unittest
+
+from GeminiMotorDrive import GeminiG6, drivers, simulator
+from GeminiMotorDrive.drivers import _COMMS_SETTINGS, \
+    _DEFAULT_COMMS_SETTINGS
+
+
+def _settings(commands):
+    """ Converts settings commands to the drive's comms_settings.
+    """
+    settings = dict()
+    for command in commands:
+        keyword = command.rstrip('0123456789,')
+        settings[keyword] = [int(v) for v in
+                             command[len(keyword):].split(',')]
+    return settings
+
+
+class DriverTestCase(unittest.TestCase):
+    """ Base for the tests with an ASCII_RS232 on a simulated drive.
+    """
+    drive_options = dict()
+    driver_options = dict(bulk_write=True)
+
+    def setUp(self):
+        self.drive = simulator.SimulatedDrive(**self.drive_options)
+        self.ser = simulator.SimulatedSerial(self.drive)
+        self.ar = drivers.ASCII_RS232(self.ser, **self.driver_options)
+
+    def tearDown(self):
+        self.ar.close()
+
+
+class TestProtocol(DriverTestCase):
+    def test_comms_settings(self):
+        self.assertEqual(self.drive.comms_settings,
+                         _settings(_COMMS_SETTINGS))
+        self.ar.close()
+        self.assertEqual(self.drive.comms_settings,
+                         _settings(_DEFAULT_COMMS_SETTINGS))
+
+    def test_echo(self):
+        response = self.ar.send_command('DRIVE1')
+        self.assertEqual(response.echo, 'DRIVE1')
+        self.assertTrue(response.ok)
+        self.assertEqual(self.drive.parameters['DRIVE'], 1)
+        response = self.ar.send_command('DRIVE0', immediate=True)
+        self.assertEqual(response.echo, '!DRIVE0')
+
+    def test_trev(self):
+        response = self.ar.send_command('TREV', immediate=True)
+        self.assertTrue(response.ok)
+        self.assertEqual(len(response.lines), 1)
+        self.assertTrue(response.lines[0].startswith('*TREV-GV6'))
+
+    def test_error(self):
+        response = self.ar.send_command('NOTACOMMAND')
+        self.assertFalse(response.ok)
+        self.assertEqual(response.error, 'UNDEFINED_LABEL')
+        self.assertTrue(self.ar.command_error(response))
+
+    def test_program_round_trip(self):
+        responses = self.ar.send_commands(
+            ['DEL PROG3', 'DEF PROG3', 'A10', 'V2', 'END'],
+            eor=['\n', '\n- ', '\n- ', '\n- ', '\n'])
+        self.assertTrue(all(r.ok for r in responses))
+        self.assertEqual(self.drive.programs['PROG3'], ['A10', 'V2'])
+        response = self.ar.send_command('TPROG PROG3', eor='*END\n')
+        self.assertEqual(response.lines, ['*A10', '*V2', '*END'])
+
+    def test_tas(self):
+        g = GeminiG6(self.ar)
+        self.assertFalse(g.axis_status.moving)
+        self.ar.send_commands(['DRIVE1', 'A100', 'AD0', 'V5',
+                               'D40000', 'GO'])
+        status = g.axis_status
+        self.assertTrue(status.moving)
+        self.assertFalse(status.negative)
+        self.ar.send_command('K', immediate=True)
+        self.assertFalse(g.axis_status.moving)
+
+
+class TestGeminiG6(DriverTestCase):
+    def test_parameters(self):
+        g = GeminiG6(self.ar)
+        self.assertEqual(g.encoder_resolution, 4000)
+        g.energized = True
+        self.assertTrue(g.energized)
+        self.assertEqual(self.drive.parameters['DRIVE'], 1)
+
+    def test_program_round_trip(self):
+        g = GeminiG6(self.ar)
+        commands = ['A100', 'V5', 'D4000', 'GO']
+        self.assertTrue(g.set_program_profile(1, commands))
+        self.assertEqual(g.get_program(1), commands)
+        self.assertEqual(self.drive.programs['PROG1'], commands)
+
+
+class TestNoisyLine(DriverTestCase):
+    # Bulk writes with echo checking fix the mistakes (user-001).
+    drive_options = dict(error_rate=0.05, seed=5)
+
+    def test_echo_checking_fixes_mistakes(self):
+        for i in range(30):
+            response = self.ar.send_command('D' + str(1000 + i),
+                                            max_retries=3)
+            self.assertTrue(response.ok)
+            self.assertEqual(self.drive.parameters['D'], 1000 + i)
+
+
+class TestAdaptiveEcho(DriverTestCase):
+    # Adaptive echo checking stops checking on a clean line and goes
+    # back to it after a mistake (user-018).
+    driver_options = dict(bulk_write=True, check_echo='adaptive',
+                          adaptive_threshold=3)
+
+    def test_adaptive(self):
+        for i in range(5):
+            self.assertTrue(self.ar.send_command('V' + str(i)).ok)
+        self.assertGreaterEqual(self.ar._clean_commands, 3)
+        self.drive._error_rate = 1.0
+        self.ar.send_command('V9', max_retries=0)
+        self.assertEqual(self.ar._clean_commands, 0)
+        self.drive._error_rate = 0.0
+        self.assertTrue(self.ar.send_command('V7').ok)
+        self.assertEqual(self.drive.parameters['V'], 7.0)
+
+
+class TestTiming(DriverTestCase):
+    # Responses are read as they arrive (user-002), and the commands of
+    # a sequence follow each other as soon as the response arrives
+    # (user-005). The drive only gets slow after connecting so that
+    # setting up the comms stays quick.
+    def setUp(self):
+        DriverTestCase.setUp(self)
+        self.drive._response_time = 0.05
+
+    def tearDown(self):
+        self.drive._response_time = 0.0
+        DriverTestCase.tearDown(self)
+
+    def test_response_time(self):
+        start = time.monotonic()
+        self.assertTrue(self.ar.send_command('DRIVE1').ok)
+        self.assertLess(time.monotonic() - start, 0.2)
+
+    def test_timeout(self):
+        # The echo comes straight back but the end of the response
+        # does not, so the read gives up at the timeout without it.
+        self.drive._response_time = 0.5
+        start = time.monotonic()
+        response = self.ar.send_command('DRIVE1', timeout=0.05,
+                                        max_retries=0)
+        self.assertLess(time.monotonic() - start, 0.4)
+        self.assertEqual(response.echo, 'DRIVE1')
+        self.assertFalse(response.raw.endswith('\n'))
+
+    def test_response_pacing(self):
+        start = time.monotonic()
+        responses = self.ar.send_commands(['V1'] * 10)
+        self.assertEqual(len(responses), 10)
+        self.assertTrue(all(r.ok for r in responses))
+        # Far less than the old fixed 0.25 s between commands.
+        self.assertLess(time.monotonic() - start, 1.5)
+
+
+class TestStreaming(DriverTestCase):
+    # iter_commands only sends commands as they are asked for
+    # (user-017), and responses are compact objects (user-016).
+    def test_lazy(self):
+        before = self.drive.commands
+        it = self.ar.iter_commands(['V1', 'V2', 'V3'])
+        self.assertEqual(self.drive.commands, before)
+        next(it)
+        self.assertEqual(self.drive.commands, before + 1)
+
+    def test_stops_at_error(self):
+        responses = list(self.ar.iter_commands(['V1', 'BAD', 'V3'],
+                                               max_retries=0))
+        self.assertEqual(len(responses), 2)
+        self.assertFalse(responses[-1].ok)
+
+    def test_short_eor_list(self):
+        # The commands before the one without an EOR are still sent.
+        before = self.drive.commands
+        it = self.ar.iter_commands(['V1', 'V2'], eor=['\n'])
+        self.assertTrue(next(it).ok)
+        self.assertRaises(ValueError, next, it)
+        self.assertEqual(self.drive.commands, before + 1)
+        self.assertRaises(ValueError, self.ar.send_commands,
+                          ['V1', 'V2'], eor=['\n'])
+
+    def test_short_eor_list_async(self):
+        async def run():
+            async with drivers.AsyncASCII_RS232(
+                    simulator.SimulatedSerial(), bulk_write=True) as ar:
+                await ar.send_commands(['V1', 'V2'], eor=['\n'])
+
+        self.assertRaises(ValueError, asyncio.run, run())
+
+    def test_response_object(self):
+        response = self.ar.send_command('DRIVE1')
+        self.assertFalse(hasattr(response, '__dict__'))
+        self.assertEqual(response[0], 'DRIVE1')
+        self.assertEqual(list(response), [response.command, response.raw,
+                                          response.echo, response.error,
+                                          response.lines])
+        self.assertEqual(response, list(response))
+
+
+class TestLoopURL(unittest.TestCase):
+    def test_loop(self):
+        # A loop:// port echoes everything back, which the driver can
+        # at least connect over and close.
+        ar = drivers.ASCII_RS232('loop://', check_echo=False,
+                                 restore_on_close=False)
+        self.assertFalse(ar.closed)
+        ar.close()
+        self.assertTrue(ar.closed)
+
+
+@unittest.skipUnless(os.name == 'posix', 'needs a pty')
+class TestPty(unittest.TestCase):
+    def test_pty(self):
+        with simulator.PtyDrive() as pd:
+            with drivers.ASCII_RS232(pd.port, bulk_write=True) as ar:
+                self.assertEqual(pd.drive.comms_settings,
+                                 _settings(_COMMS_SETTINGS))
+                g = GeminiG6(ar)
+                self.assertTrue(g.set_program_profile(2, ['D5', 'GO']))
+                self.assertEqual(g.get_program(2), ['D5', 'GO'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,65 @@
+# Copyright 2014-2016 Freja Nordsiek
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+import unittest
+
+from GeminiMotorDrive import GeminiG6, drivers, simulator
+from GeminiMotorDrive.status import StatusMonitor
+
+
+class TestStatusMonitor(unittest.TestCase):
+    def setUp(self):
+        self.ser = simulator.SimulatedSerial(simulator.SimulatedDrive(
+            char_time=0.0001, response_time=0.0005))
+        self.g = GeminiG6(drivers.ASCII_RS232(self.ser, bulk_write=True))
+
+    def tearDown(self):
+        self.g.driver.close()
+
+    def test_uses_driver_lock(self):
+        with StatusMonitor(self.g.driver) as monitor:
+            self.assertIs(monitor.lock, self.g.driver.lock)
+
+    def test_polls_dont_mix_with_other_commands(self):
+        program = ['A' + str(10 + i) for i in range(20)]
+        with StatusMonitor(self.g.driver, interval=0.002) as monitor:
+            for i in range(5):
+                commands = program[:len(program) - i % 2]
+                self.assertTrue(self.g.set_program_profile(1, commands))
+                self.assertEqual(self.g.get_program(1), commands)
+            self.assertGreater(monitor.polls, 0)
+            self.assertEqual(monitor.errors, 0)
+
+    def test_exception_doesnt_stop_polling(self):
+        errors = []
+        with StatusMonitor(self.g.driver, interval=0.002,
+                           on_error=errors.append) as monitor:
+            read = self.ser.read
+
+            def fail(*args, **keywords):
+                raise OSError('port gone')
+            self.ser.read = fail
+            time.sleep(0.05)
+            self.ser.read = read
+            polls = monitor.polls
+            time.sleep(0.05)
+            self.assertTrue(monitor.running)
+            self.assertGreater(monitor.polls, polls)
+            self.assertGreater(len(errors), 0)
+            self.assertIsInstance(monitor.last_error, OSError)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,160 @@
+# Copyright 2014-2016 Freja Nordsiek
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+import select
+import socket
+import unittest
+
+import serial
+
+from GeminiMotorDrive import GeminiG6, drivers, simulator, transports
+from GeminiMotorDrive.transports import SocketTransport
+
+
+def _received(conn, timeout=0.1):
+    """ Gets everything that arrives on a socket within `timeout`.
+    """
+    data = bytearray()
+    deadline = time.monotonic() + timeout
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0 \
+                or len(select.select([conn], [], [], remaining)[0]) == 0:
+            return bytes(data)
+        chunk = conn.recv(4096)
+        if len(chunk) == 0:
+            return bytes(data)
+        data += chunk
+
+
+class TestSocketTransport(unittest.TestCase):
+    # A bare listening socket stands in for the terminal server.
+    def setUp(self):
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen(1)
+        self.transport = SocketTransport(*self.server.getsockname(),
+                                         timeout=0.1)
+        self.conn = self.server.accept()[0]
+
+    def tearDown(self):
+        self.transport.close()
+        self.conn.close()
+        self.server.close()
+
+    def test_writes_batched(self):
+        self.transport.write(b'DRIVE1\r')
+        self.transport.write(b'GO\r')
+        self.assertEqual(_received(self.conn, 0.05), b'')
+        self.transport.flush()
+        self.assertEqual(_received(self.conn), b'DRIVE1\rGO\r')
+
+    def test_read_sends_batched_writes(self):
+        self.transport.write(b'TREV\r')
+        self.assertEqual(self.transport.read(1), b'')
+        self.assertEqual(_received(self.conn), b'TREV\r')
+
+    def test_full_batch_sent(self):
+        data = b'x' * transports._BATCH_SIZE
+        self.transport.write(data)
+        received = bytearray()
+        while len(received) < len(data):
+            chunk = _received(self.conn)
+            self.assertNotEqual(chunk, b'')
+            received += chunk
+        self.assertEqual(bytes(received), data)
+
+    def test_read_timeout(self):
+        self.conn.sendall(b'abc')
+        start = time.monotonic()
+        self.assertEqual(self.transport.read(5), b'abc')
+        elapsed = time.monotonic() - start
+        self.assertGreaterEqual(elapsed, 0.09)
+        self.assertLess(elapsed, 0.5)
+        self.conn.sendall(b'defg')
+        self.assertEqual(self.transport.read(3), b'def')
+        self.assertEqual(self.transport.in_waiting, 1)
+        self.transport.reset_input_buffer()
+        self.assertEqual(self.transport.in_waiting, 0)
+
+    def test_closed_by_server(self):
+        self.conn.close()
+        self.assertRaises(serial.SerialException, self.transport.read, 1)
+
+    def test_close_sends_batched_writes(self):
+        self.transport.write(b'K\r')
+        self.transport.close()
+        self.transport.close()
+        self.assertEqual(_received(self.conn), b'K\r')
+
+    def test_connect_refused(self):
+        address = self.server.getsockname()
+        self.server.close()
+        self.assertRaises(serial.SerialException, SocketTransport,
+                          *address, connect_timeout=1.0)
+
+
+class TestASCII_TCP(unittest.TestCase):
+    def setUp(self):
+        self.td = simulator.TcpDrive()
+
+    def tearDown(self):
+        self.td.close()
+
+    def test_commands(self):
+        with drivers.ASCII_TCP(*self.td.address) as ar:
+            self.assertEqual(self.td.drive.comms_settings['EOL'],
+                             [13, 0, 0])
+            self.assertTrue(ar.send_command('DRIVE1').ok)
+            g = GeminiG6(ar)
+            self.assertTrue(g.set_program_profile(1, ['A10', 'GO']))
+            self.assertEqual(g.get_program(1), ['A10', 'GO'])
+        self.assertEqual(self.td.drive.comms_settings['EOL'], [13, 10, 0])
+
+    def test_reconnect(self):
+        # The terminal server only takes one connection at a time, so
+        # the second only works if the first was really closed.
+        ar = drivers.ASCII_TCP(*self.td.address)
+        self.assertTrue(ar.send_command('DRIVE1').ok)
+        ar.close()
+        self.assertTrue(ar.closed)
+        ar.close()
+        with drivers.ASCII_TCP(*self.td.address,
+                               connect_timeout=1.0) as ar:
+            self.assertTrue(ar.send_command('DRIVE0').ok)
+        self.assertEqual(self.td.drive.parameters['DRIVE'], 0)
+
+    def test_connection_lost(self):
+        ar = drivers.ASCII_TCP(*self.td.address)
+        self.assertTrue(ar.send_command('DRIVE1').ok)
+        self.td.close()
+        self.assertRaises(serial.SerialException, ar.send_command,
+                          'DRIVE0')
+        # Closing can't restore the settings but must still close.
+        ar.close()
+        self.assertTrue(ar.closed)
+        self.assertTrue(ar._ser._closed)
+
+    def test_unreachable(self):
+        server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        server.bind(('127.0.0.1', 0))
+        address = server.getsockname()
+        server.close()
+        self.assertRaises(serial.SerialException, drivers.ASCII_TCP,
+                          *address, connect_timeout=1.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
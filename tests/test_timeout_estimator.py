@@ -0,0 +1,122 @@
+# Copyright 2014-2016 Freja Nordsiek
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import time
+import unittest
+
+from GeminiMotorDrive import drivers, simulator
+from GeminiMotorDrive.utilities import TimeoutEstimator
+
+
+class TestTimeoutEstimator(unittest.TestCase):
+    def setUp(self):
+        self.te = TimeoutEstimator(initial=1.0, minimum=0.05,
+                                   maximum=10.0)
+
+    def test_initial(self):
+        self.assertEqual(self.te.timeout('V'), 1.0)
+        self.assertIsNone(self.te.estimate('V'))
+
+    def test_first_observation(self):
+        self.te.observe('V', 0.1)
+        self.assertEqual(self.te.estimate('V'), (0.1, 0.05))
+        self.assertAlmostEqual(self.te.timeout('V'), 0.1 + 4 * 0.05)
+
+    def test_rfc6298_updates(self):
+        self.te.observe('V', 0.1)
+        self.te.observe('V', 0.3)
+        # RTTVAR is updated with the old SRTT before SRTT is.
+        rttvar = 0.75 * 0.05 + 0.25 * abs(0.1 - 0.3)
+        srtt = 0.875 * 0.1 + 0.125 * 0.3
+        self.assertAlmostEqual(self.te.estimate('V')[0], srtt)
+        self.assertAlmostEqual(self.te.estimate('V')[1], rttvar)
+        self.assertAlmostEqual(self.te.timeout('V'), srtt + 4 * rttvar)
+
+    def test_converges(self):
+        for i in range(200):
+            self.te.observe('V', 0.2)
+        srtt, rttvar = self.te.estimate('V')
+        self.assertAlmostEqual(srtt, 0.2)
+        self.assertLess(rttvar, 1e-6)
+        self.assertAlmostEqual(self.te.timeout('V'), 0.2, places=5)
+
+    def test_keys_separate(self):
+        self.te.observe('V', 0.1)
+        self.assertIsNone(self.te.estimate('A'))
+        self.assertEqual(self.te.timeout('A'), 1.0)
+
+    def test_minimum(self):
+        for i in range(50):
+            self.te.observe('V', 0.001)
+        self.assertEqual(self.te.timeout('V'), 0.05)
+        self.assertEqual(TimeoutEstimator(initial=0.0).timeout('V'),
+                         0.05)
+
+    def test_maximum(self):
+        self.te.observe('RUN', 20.0)
+        self.assertEqual(self.te.timeout('RUN'), 10.0)
+        self.assertEqual(TimeoutEstimator(initial=100.0).timeout('V'),
+                         60.0)
+
+    def test_backoff(self):
+        self.te.observe('V', 0.1)
+        base = self.te.timeout('V')
+        self.te.backoff('V')
+        self.assertAlmostEqual(self.te.timeout('V'), 2 * base)
+        self.te.backoff('V')
+        self.assertAlmostEqual(self.te.timeout('V'), 4 * base)
+        # Stops growing at the maximum.
+        for i in range(20):
+            self.te.backoff('V')
+        self.assertEqual(self.te.timeout('V'), 10.0)
+        self.assertLess(self.te._estimates['V'][2], 2**20)
+        # A measured round trip ends the backoff.
+        self.te.observe('V', 0.1)
+        self.assertAlmostEqual(self.te.timeout('V'),
+                               0.1 + 4 * self.te.estimate('V')[1])
+
+    def test_backoff_unmeasured(self):
+        self.te.backoff('V')
+        self.assertEqual(self.te.timeout('V'), 1.0)
+        self.assertIsNone(self.te.estimate('V'))
+
+    def test_reset(self):
+        self.te.observe('V', 0.1)
+        self.te.reset()
+        self.assertIsNone(self.te.estimate('V'))
+
+
+class TestAutoTimeout(unittest.TestCase):
+    def test_driver(self):
+        # Round trips of automatic timeout commands get measured by
+        # command name, and the timeouts come down from the initial
+        # 1 s to just above the drive's response time.
+        drive = simulator.SimulatedDrive()
+        with drivers.ASCII_RS232(simulator.SimulatedSerial(drive),
+                                 bulk_write=True) as ar:
+            drive._response_time = 0.05
+            for i in range(10):
+                self.assertTrue(ar.send_command('V' + str(i),
+                                                timeout='auto').ok)
+            te = ar.timeout_estimator
+            srtt = te.estimate('V')[0]
+            self.assertGreaterEqual(srtt, 0.04)
+            self.assertLess(srtt, 0.2)
+            self.assertLess(te.timeout('V'), 0.5)
+            self.assertIsNone(te.estimate('A'))
+            drive._response_time = 0.0
+
+
+if __name__ == '__main__':
+    unittest.main()